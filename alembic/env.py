@@ -8,6 +8,8 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 from sqlmodel import SQLModel
 from app.models.user import User  # Import all models here to register them
+from app.models import blog  # noqa: F401
+from app.models import upload  # noqa: F401
 from app.core.config import get_settings
 
 settings = get_settings()
@@ -18,7 +20,8 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-if config.config_file_name is not None:
+# (not when app.db.init_db runs the migrations: the app's logging is already set up)
+if config.config_file_name is not None and "url" not in config.attributes:
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -31,7 +34,9 @@ target_metadata = SQLModel.metadata
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
-config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+# app.db.init_db passes the URL of the engine it was given. ConfigParser
+# treats % as interpolation, and URL-encoded passwords and paths contain it
+config.set_main_option("sqlalchemy.url", config.attributes.get("url", settings.DATABASE_URL).replace("%", "%%"))
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -0,0 +1,56 @@
+"""Indexes for hot queries
+
+Revision ID: a1c3e5f7b901
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c3e5f7b901'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, partial-index predicate)
+INDEXES = [
+    ("ix_post_published_published_at", "post", ["published_at"], "published"),
+    ("ix_post_author_id_published_at", "post", ["author_id", "published_at"], "published"),
+    ("ix_postlike_post_id_user_id", "postlike", ["post_id", "user_id"], None),
+    ("ix_postshare_post_id", "postshare", ["post_id"], None),
+    ("ix_postcomment_post_id_parent_id_created_at", "postcomment", ["post_id", "parent_id", "created_at"], None),
+    ("ix_postcomment_parent_id_created_at", "postcomment", ["parent_id", "created_at"], None),
+    ("ix_notification_user_id_created_at", "notification", ["user_id", "created_at"], None),
+    ("ix_notification_created_at", "notification", ["created_at"], None),
+    ("ix_posttag_tag_id", "posttag", ["tag_id"], None),
+    ("ix_postcategory_category_id", "postcategory", ["category_id"], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block and
+    # doesn't lock out writes while it builds
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
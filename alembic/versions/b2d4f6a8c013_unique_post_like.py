@@ -0,0 +1,71 @@
+"""Unique (post_id, user_id) on postlike
+
+Revision ID: b2d4f6a8c013
+Revises: a1c3e5f7b901
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d4f6a8c013'
+down_revision: Union[str, Sequence[str], None] = 'a1c3e5f7b901'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Concurrent double-clicks may already have stored duplicates; keep the oldest
+    op.execute(
+        """
+        DELETE FROM postlike newer
+        USING postlike older
+        WHERE newer.post_id = older.post_id
+          AND newer.user_id = older.user_id
+          AND newer.id > older.id
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "uq_postlike_post_id_user_id",
+            "postlike",
+            ["post_id", "user_id"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    # Promote the index to a constraint without another table scan (databases
+    # created by create_all already have the constraint)
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_postlike_post_id_user_id') THEN
+                ALTER TABLE postlike ADD CONSTRAINT uq_postlike_post_id_user_id
+                    UNIQUE USING INDEX uq_postlike_post_id_user_id;
+            END IF;
+        END $$
+        """
+    )
+    with op.get_context().autocommit_block():
+        # The unique index covers every lookup the plain one served
+        op.drop_index("ix_postlike_post_id_user_id", table_name="postlike", postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_postlike_post_id_user_id",
+            "postlike",
+            ["post_id", "user_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.drop_constraint("uq_postlike_post_id_user_id", "postlike", type_="unique")
@@ -0,0 +1,35 @@
+"""Image variant columns on post and user
+
+Revision ID: c3e5a7b9d024
+Revises: b2d4f6a8c013
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e5a7b9d024'
+down_revision: Union[str, Sequence[str], None] = 'b2d4f6a8c013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable without a default: no table rewrite. Databases created by
+    # create_all after the models gained these columns already have them.
+    inspector = sa.inspect(op.get_bind())
+    for table, column in (('post', 'image_variants'), ('user', 'profile_image_variants')):
+        if column not in {c['name'] for c in inspector.get_columns(table)}:
+            op.add_column(table, sa.Column(column, sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user', 'profile_image_variants')
+    op.drop_column('post', 'image_variants')
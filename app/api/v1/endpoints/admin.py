@@ -3,7 +3,7 @@ from typing import List, Annotated
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
 
-from app.db.session import get_session
+from app.db.session import get_session, pool_stats
 from app.models.user import User, Role
 from app.schemas.user import UserRead
 from app.api.v1.endpoints.users import get_current_user
@@ -22,3 +22,8 @@ async def read_users(
 ):
     users = await session.exec(select(User))
     return users.all()
+
+@router.get("/db-pool")
+async def read_db_pool_stats(current_user: User = Depends(get_current_admin)):
+    """Connection pool saturation and checkout wait times for this worker."""
+    return pool_stats()
@@ -1,17 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Body
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form, Body
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from typing import Optional
 from datetime import datetime
-import os
-import uuid
 
+from app.core.rate_limit import rate_limit
+from app.core.responses import APIResponse
 from app.db.session import get_session
+from app.db.replicas import get_read_session
 from app.models.blog import Post, Category, Tag, PostCategory, PostTag, PostComment, PostLike, PostShare, Notification
 from app.models.user import User
 from app.api.v1.endpoints.users import get_current_user
 from app.services.redis_service import broadcaster
-from app.utils.upload_helper import get_user_post_upload_path
+from app.services import posts as post_service
+from app.services import images
+from app.services.uploads import purge_released, release_upload, save_upload
 
 router = APIRouter()
 
@@ -21,7 +24,8 @@ async def list_posts(
     skip: int = 0,
     limit: int = 20,
     published_only: bool = True,
-    session: AsyncSession = Depends(get_session),
+    image_size: Optional[str] = "medium",
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     query = select(Post)
@@ -60,7 +64,9 @@ async def list_posts(
             "id": post.id,
             "title": post.title,
             "summary": post.summary,
-            "image_url": post.image_url,
+            "image_url": images.pick_image(post.image_url, post.image_variants, image_size),
+            "original_image_url": post.image_url,
+            "image_variants": post.image_variants,
             "author_id": post.author_id,
             "published": post.published,
             "created_at": post.created_at.isoformat(),
@@ -71,18 +77,20 @@ async def list_posts(
             "tags": tags
         })
     
-    return {
+    # Returned as a response so the listing skips jsonable_encoder
+    return APIResponse({
         "total": total,
         "skip": skip,
         "limit": limit,
         "posts": posts_data
-    }
+    })
 
 # GET /api/v1/posts/{post_id} - Get single post with details
 @router.get("/{post_id}")
 async def get_post(
     post_id: int,
-    session: AsyncSession = Depends(get_session),
+    image_size: Optional[str] = "large",
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     post = await session.get(Post, post_id)
@@ -150,11 +158,14 @@ async def get_post(
     like_count = len(likes)
     user_liked = any(like.user_id == current_user.id for like in likes)
     
-    return {
+    # The comment tree is the largest payload we build; skip jsonable_encoder
+    return APIResponse({
         "id": post.id,
         "title": post.title,
         "summary": post.summary,
-        "image_url": post.image_url,
+        "image_url": images.pick_image(post.image_url, post.image_variants, image_size),
+        "original_image_url": post.image_url,
+        "image_variants": post.image_variants,
         "author_id": post.author_id,
         "author_name": author.full_name if author else "Unknown",
         "author_email": author.email if author else None,
@@ -168,11 +179,12 @@ async def get_post(
         "like_count": like_count,
         "user_liked": user_liked,
         "comment_count": len(comments_raw)
-    }
+    })
 
 # POST /api/v1/posts/ - Create post
 @router.post("/")
 async def create_post(
+    background_tasks: BackgroundTasks,
     title: str = Form(...),
     summary: str = Form(...),
     category: str = Form(...),
@@ -181,78 +193,34 @@ async def create_post(
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    # Create post first without image
-    new_post = Post(
-        author_id=current_user.id,
-        title=title,
-        summary=summary,
-        image_url=None,  # Will update after we have post_id
-        published=True,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow(),
-        published_at=datetime.utcnow()
-    )
-    
-    session.add(new_post)
-    await session.commit()
-    await session.refresh(new_post)
-    
-    # Now handle image upload with post_id
-    image_url = None
-    if image and image.filename:
-        file_extension = os.path.splitext(image.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        
-        # Use structured upload path
-        file_path, url_path = get_user_post_upload_path(
-            current_user.id, 
-            new_post.id, 
-            unique_filename
+    # Everything below happens in one transaction: a failure leaves no
+    # half-created post, category or tag links behind
+    stored = None
+    try:
+        new_post = await post_service.create_post(
+            session,
+            author_id=current_user.id,
+            title=title,
+            summary=summary,
+            category=category,
+            tags=post_service.parse_tags(tags),
         )
         
-        with open(file_path, "wb") as f:
-            content = await image.read()
-            f.write(content)
+        # Handle image upload now that we have post_id
+        if image and image.filename:
+            stored = await save_upload(session, image, "post_image")
+            new_post.image_url = stored.url
         
-        image_url = url_path
-        
-        # Update post with image URL
-        new_post.image_url = image_url
-        session.add(new_post)
         await session.commit()
+    except Exception:
+        # The object's reference count rolls back with the post; a file written
+        # for it is left for the next identical upload to reuse
+        await session.rollback()
+        raise
     
-    # Handle category
-    cat_slug = category.lower().replace(" ", "-")
-    cat_result = await session.execute(select(Category).where(Category.slug == cat_slug))
-    cat_obj = cat_result.scalars().first()
-    
-    if not cat_obj:
-        cat_obj = Category(title=category, slug=cat_slug)
-        session.add(cat_obj)
-        await session.commit()
-        await session.refresh(cat_obj)
-    
-    link = PostCategory(post_id=new_post.id, category_id=cat_obj.id)
-    session.add(link)
-    
-    # Handle tags
-    if tags:
-        tag_list = [t.strip() for t in tags.split(",") if t.strip()]
-        for tag_title in tag_list:
-            tag_slug = tag_title.lower().replace(" ", "-")
-            tag_result = await session.execute(select(Tag).where(Tag.slug == tag_slug))
-            tag_obj = tag_result.scalars().first()
-            
-            if not tag_obj:
-                tag_obj = Tag(title=tag_title, slug=tag_slug)
-                session.add(tag_obj)
-                await session.commit()
-                await session.refresh(tag_obj)
-            
-            link = PostTag(post_id=new_post.id, tag_id=tag_obj.id)
-            session.add(link)
-    
-    await session.commit()
+    if stored:
+        # Resized copies are produced after the response is sent
+        background_tasks.add_task(images.process_post_image, new_post.id, stored.key, stored.url)
     
     return {
         "id": new_post.id,
@@ -265,47 +233,17 @@ async def create_post(
     }
 
 # POST /api/v1/posts/{post_id}/like - Like/unlike post
-@router.post("/{post_id}/like")
+@router.post("/{post_id}/like", dependencies=[rate_limit("toggle_like")])
 async def toggle_like(
     post_id: int,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    like_query = select(PostLike).where(
-        PostLike.post_id == post_id,
-        PostLike.user_id == current_user.id
-    )
-    result = await session.execute(like_query)
-    existing_like = result.scalars().first()
-    
-    if existing_like:
-        await session.delete(existing_like)
-        await session.commit()
-        liked = False
-    else:
-        new_like = PostLike(post_id=post_id, user_id=current_user.id)
-        session.add(new_like)
-        await session.commit()
-        liked = True
-        
-        # Create notification
-        post = await session.get(Post, post_id)
-        if post and post.author_id != current_user.id:
-            notification = Notification(
-                user_id=post.author_id,
-                actor_id=current_user.id,
-                type="like",
-                content=f"{current_user.full_name} liked your post",
-                post_id=post_id
-            )
-            session.add(notification)
-            await session.commit()
-    
-    count_query = select(func.count()).select_from(PostLike).where(PostLike.post_id == post_id)
-    count_result = await session.execute(count_query)
-    like_count = count_result.scalar()
+    state = await post_service.toggle_like(session, post_id, current_user.id, current_user.full_name)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Post not found")
     
-    return {"liked": liked, "like_count": like_count}
+    return {"liked": state.liked, "like_count": state.like_count}
 
 # POST /api/v1/posts/{post_id}/share - Share post
 @router.post("/{post_id}/share")
@@ -332,7 +270,7 @@ async def share_post(
     return {"message": "Post shared successfully"}
 
 # POST /api/v1/posts/{post_id}/comments - Add comment
-@router.post("/{post_id}/comments")
+@router.post("/{post_id}/comments", dependencies=[rate_limit("add_comment")])
 async def add_comment(
     post_id: int,
     data: dict = Body(...),
@@ -409,8 +347,10 @@ async def delete_post(
     if current_user.role != "admin" and post.author_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    await release_upload(session, post.image_url)
     await session.delete(post)
     await session.commit()
+    await purge_released(session)
     
     return {"message": "Post deleted successfully"}
 
@@ -419,7 +359,7 @@ async def delete_post(
 async def get_notifications(
     skip: int = 0,
     limit: int = 50,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role == "admin":
@@ -1,21 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from typing import Annotated
-import shutil
-import os
+from typing import Annotated, Optional
 from pathlib import Path
 
 from app.db.session import get_session
+from app.db.replicas import get_read_session
 from app.models.user import User
 from app.schemas.user import UserCreate, UserRead, UserUpdate
-from app.services.auth import get_password_hash, verify_password, create_access_token, create_refresh_token
+from app.services.auth import get_password_hash_async, verify_password_async, create_access_token, create_refresh_token
 from app.services.otp import create_otp, verify_otp
 from app.core.config import get_settings
+from app.core.rate_limit import rate_limit
 from jose import JWTError, jwt
 from pydantic import BaseModel
-from app.utils.upload_helper import get_user_profile_upload_path
+from app.services import images
+from app.services.uploads import purge_released, release_upload, save_upload
 
 router = APIRouter()
 settings = get_settings()
@@ -49,7 +50,7 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], sessio
         raise credentials_exception
     return user
 
-@router.post("/register", response_model=UserRead)
+@router.post("/register", response_model=UserRead, dependencies=[rate_limit("register")])
 async def register(user: UserCreate, session: AsyncSession = Depends(get_session)):
     result = await session.exec(select(User).where(User.email == user.email))
     if result.first():
@@ -59,7 +60,7 @@ async def register(user: UserCreate, session: AsyncSession = Depends(get_session
     db_user = User(
         email=user.email,
         full_name=user.full_name,
-        hashed_password=get_password_hash(user.password),
+        hashed_password=await get_password_hash_async(user.password),
         role=user.role if hasattr(user, 'role') else "user"
     )
     session.add(db_user)
@@ -67,11 +68,11 @@ async def register(user: UserCreate, session: AsyncSession = Depends(get_session
     await session.refresh(db_user)
     return db_user
 
-@router.post("/login")
+@router.post("/login", dependencies=[rate_limit("login")])
 async def login(response: Response, form_data: Annotated[OAuth2PasswordRequestForm, Depends()], session: AsyncSession = Depends(get_session)):
     result = await session.execute(select(User).where(User.email == form_data.username))
     user = result.scalars().first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     
     access_token = create_access_token(data={"sub": user.email})
@@ -126,10 +127,10 @@ async def change_password(
     current_user: Annotated[User, Depends(get_current_user)],
     session: AsyncSession = Depends(get_session)
 ):
-    if not verify_password(request.old_password, current_user.hashed_password):
+    if not await verify_password_async(request.old_password, current_user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect old password")
     
-    current_user.hashed_password = get_password_hash(request.new_password)
+    current_user.hashed_password = await get_password_hash_async(request.new_password)
     session.add(current_user)
     await session.commit()
     
@@ -139,7 +140,7 @@ async def change_password(
 async def read_users_me(current_user: Annotated[User, Depends(get_current_user)]):
     return current_user
 
-@router.post("/forgot-password")
+@router.post("/forgot-password", dependencies=[rate_limit("forgot_password")])
 async def forgot_password(request: ForgotPasswordRequest, session: AsyncSession = Depends(get_session)):
     result = await session.execute(select(User).where(User.email == request.email))
     user = result.scalars().first()
@@ -149,7 +150,7 @@ async def forgot_password(request: ForgotPasswordRequest, session: AsyncSession
     await create_otp(request.email)
     return {"message": "OTP sent"}
 
-@router.post("/reset-password")
+@router.post("/reset-password", dependencies=[rate_limit("reset_password")])
 async def reset_password(request: ResetPasswordRequest, session: AsyncSession = Depends(get_session)):
     if not await verify_otp(request.email, request.otp):
         raise HTTPException(status_code=400, detail="Invalid OTP")
@@ -159,7 +160,7 @@ async def reset_password(request: ResetPasswordRequest, session: AsyncSession =
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.hashed_password = get_password_hash(request.new_password)
+    user.hashed_password = await get_password_hash_async(request.new_password)
     session.add(user)
     await session.commit()
     return {"message": "Password reset successfully"}
@@ -181,29 +182,31 @@ async def update_profile(
 
 @router.post("/me/avatar", response_model=UserRead)
 async def upload_avatar(
+    background_tasks: BackgroundTasks,
     current_user: Annotated[User, Depends(get_current_user)],
     session: AsyncSession = Depends(get_session),
     file: UploadFile = File(...)
 ):
-    # Use structured upload path
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"avatar{file_extension}"
+    # Take the new reference before dropping the old one: re-uploading the
+    # same image must not delete it
+    stored = await save_upload(session, file, "avatar")
+    await release_upload(session, current_user.profile_image_url)
     
-    file_path, url_path = get_user_profile_upload_path(current_user.id, unique_filename)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    current_user.profile_image_url = url_path
+    if stored.url != current_user.profile_image_url:
+        current_user.profile_image_url = stored.url
+        current_user.profile_image_variants = None
     session.add(current_user)
     await session.commit()
+    await purge_released(session)
     await session.refresh(current_user)
+    if not current_user.profile_image_variants:
+        background_tasks.add_task(images.process_avatar, current_user.id, stored.key, stored.url)
     return current_user
 
 @router.get("/profile/{user_id}")
 async def get_user_profile_by_id(
     user_id: int,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Get user profile by user ID"""
     # Find user by ID
@@ -232,6 +235,7 @@ async def get_user_profile_by_id(
         "full_name": user.full_name,
         "bio": user.bio,
         "profile_image_url": user.profile_image_url,
+        "profile_image_variants": user.profile_image_variants,
         "role": user.role,
 
         "post_count": post_count
@@ -242,7 +246,8 @@ async def get_user_posts_by_id(
     user_id: int,
     skip: int = 0,
     limit: int = 12,
-    session: AsyncSession = Depends(get_session)
+    image_size: Optional[str] = "thumb",
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Get user's posts by user ID with pagination (for profile feed)"""
     # Find user by ID
@@ -291,7 +296,9 @@ async def get_user_posts_by_id(
             "id": post.id,
             "title": post.title,
             "summary": post.summary,
-            "image_url": post.image_url,
+            "image_url": images.pick_image(post.image_url, post.image_variants, image_size),
+            "original_image_url": post.image_url,
+            "image_variants": post.image_variants,
             "published_at": post.published_at.isoformat() if post.published_at else None,
             "like_count": like_count,
             "comment_count": comment_count
@@ -1,3 +1,4 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from typing import Optional
@@ -12,15 +13,125 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = "postgres"
     POSTGRES_PASSWORD: str = "postgres"
     POSTGRES_DB: str = "insightblog"
-    
+    # Overrides the POSTGRES_* settings; also takes sqlite+aiosqlite:///path.db,
+    # or sqlite+aiosqlite:// for an in-memory database (tests, benchmarks)
+    DATABASE_URL: str = ""
+
+    # Database engine / connection pool
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements per connection
+    DB_PGBOUNCER: bool = False  # transaction-pooling mode: no prepared statement reuse, no startup params
+    DB_STATEMENT_TIMEOUT_MS: int = 15000
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS: int = 60000
+    DB_SLOW_CHECKOUT_MS: float = 100.0  # log pool checkouts that wait longer than this
+    DB_INIT_ON_STARTUP: bool = True  # create tables and seed the admin in every worker; off when app.db.init_db runs at deploy time
+    WARMUP_ON_STARTUP: bool = True  # open pool connections, compile hot queries and load clients before /readyz passes
+    DB_WARMUP_CONNECTIONS: int = 4  # per engine, capped at DB_POOL_SIZE
+    READINESS_CACHE_SECONDS: float = 2.0  # /readyz reuses dependency checks this long
+    READINESS_TIMEOUT_SECONDS: float = 1.0  # per dependency check
+    READINESS_DRAIN_SECONDS: float = 5.0  # after SIGTERM, /readyz reports draining this long before the server stops accepting connections
+
+    # Query accounting
+    DB_QUERY_HEADERS: bool = False  # X-DB-Queries / X-DB-Time on every response (dev)
+    DB_N_PLUS_ONE_THRESHOLD: int = 0  # warn when one statement repeats more than this per request; 0 = off
+    DB_SLOW_QUERY_MS: float = 500.0  # log statements slower than this; 0 = off
+    DB_SLOW_QUERY_EXPLAIN: bool = True  # include the EXPLAIN plan in the slow query log
+
+    # Read replicas
+    DB_REPLICA_URLS: str = ""  # comma-separated async database URLs; empty = primary only
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0  # reads stay on the primary this long after a write
+    DB_REPLICA_RETRY_SECONDS: float = 30.0  # how long an unreachable replica is skipped
+
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
+    REDIS_MAX_CONNECTIONS: int = 0  # per worker, shared by all callers; 0 = no cap
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # seconds idle before a pooled connection is pinged on checkout
+
+    # Realtime notifications (app.services.realtime)
+    REALTIME_PRESENCE_TTL_SECONDS: float = 30.0  # a worker's presence entries outlive its last heartbeat by this much
+    REALTIME_HEARTBEAT_SECONDS: float = 10.0
+    REALTIME_SEND_QUEUE_SIZE: int = 100  # messages buffered per socket; a slow reader loses the oldest
     
     # Vespa
     VESPA_HOST: str = "localhost"
     VESPA_PORT: int = 8080
 
+    # Embeddings
+    EMBEDDING_MODEL: str = "text-embedding-ada-002"
+    EMBEDDING_DIM: int = 1536
+    EMBEDDING_CACHE_TTL: int = 7 * 24 * 3600  # seconds, 0 disables the Redis cache
+    EMBEDDING_QUANTIZATION: str = "none"  # "none" or "int8" for the vector store
+    EMBEDDING_PCA_PATH: Optional[str] = None  # .npz produced by PCAReducer.save
+
+    # Uploads
+    UPLOAD_CHUNK_SIZE: int = 256 * 1024
+    UPLOAD_MAX_POST_IMAGE_BYTES: int = 20 * 1024 * 1024
+    UPLOAD_MAX_AVATAR_BYTES: int = 5 * 1024 * 1024
+    UPLOAD_FORM_OVERHEAD_BYTES: int = 64 * 1024  # multipart bodies may exceed the largest file limit by this much
+
+    # Response compression
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # bytes; smaller bodies aren't worth the CPU
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Static assets
+    ASSETS_BUILD_ON_STARTUP: bool = False  # build_assets.py runs at deploy time; turn on only for a single dev process
+
+    # Upload storage
+    STORAGE_BACKEND: str = "local"  # "local" or "s3"
+    STORAGE_LOCAL_ROOT: str = "static/uploads"  # also holds the staging dir for either backend
+    STORAGE_PUBLIC_URL: str = ""  # URL prefix objects are served from; default depends on the backend. Local storage serves its path, so a CDN URL must map to the same path on the app
+    S3_BUCKET: str = "insightblog-uploads"
+    S3_ENDPOINT_URL: str = ""  # e.g. http://localhost:9000 for MinIO; empty = AWS
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    S3_MULTIPART_CHUNK_SIZE: int = 8 * 1024 * 1024
+    S3_MULTIPART_CONCURRENCY: int = 4
+
+    # Image variants
+    IMAGE_WORKERS: int = 2  # processes resizing uploads
+    IMAGE_WEBP_QUALITY: int = 80
+    IMAGE_JPEG_QUALITY: int = 82
+
+    # Metrics
+    METRICS_ENABLED: bool = True
+    METRICS_DIR: str = ""  # per-worker snapshots for multi-process /metrics; empty = this process only
+    METRICS_FLUSH_INTERVAL: float = 5.0  # seconds between snapshot writes
+
+    # Tracing
+    TRACING_EXPORTER: str = ""  # "", "file" or "otlp"
+    TRACING_SAMPLE_RATE: float = 0.01  # fraction of requests traced when no traceparent decides
+    TRACING_FILE: str = "logs/traces.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_SERVICE_NAME: str = "insightblog"
+
+    # Production server (python -m app.server)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0  # 0 = one per CPU available to the process
+    SERVER_LOOP: str = "auto"  # "auto" (uvloop when installed), "uvloop" or "asyncio"
+    SERVER_HTTP: str = "auto"  # "auto" (httptools when installed), "httptools" or "h11"
+    SERVER_KEEPALIVE_SECONDS: int = 75  # longer than the load balancer's idle timeout, so it closes first
+    SERVER_BACKLOG: int = 2048  # pending connections per listening socket (capped by net.core.somaxconn)
+    SERVER_MAX_REQUESTS: int = 0  # restart a worker after this many requests; 0 = never
+    SERVER_MAX_REQUESTS_JITTER: int = 0  # random extra requests, so workers don't restart together
+    SERVER_GRACEFUL_TIMEOUT: int = 30  # seconds in-flight requests get to finish on shutdown
+
+    # Rate limiting and load shedding (app.core.rate_limit)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: str = "login=10/60,register=5/3600,forgot_password=5/3600,reset_password=10/3600,toggle_like=120/60,add_comment=20/60"  # route=burst/seconds to refill it, comma-separated
+    RATE_LIMIT_LEASE: int = 4  # tokens a worker may take at once while a bucket is over half full; 0 = ask Redis every time
+    RATE_LIMIT_LEASE_SECONDS: float = 1.0  # unspent leased tokens lapse after this
+    PASSWORD_HASH_CONCURRENCY: int = 2  # argon2 hashes/verifications per worker at once, in threads
+    PASSWORD_HASH_QUEUE: int = 32  # callers waiting beyond this get 503
+
     # Auth
     SECRET_KEY: str = "supersecretkeychangeinproduction"
     ALGORITHM: str = "HS256"
@@ -37,10 +148,20 @@ class Settings(BaseSettings):
     LOG_FILENAME: str = "app.log"
     LOG_MAX_BYTES: int = 10 * 1024 * 1024  # 10 MB
     LOG_BACKUP_COUNT: int = 10
+    LOG_FORMAT: str = "text"  # "text" or "json"
+    LOG_QUEUE_SIZE: int = 10000  # records buffered for the writer thread; overflow is dropped and counted
+    LOG_SAMPLING: str = "app.health=0.01"  # logger=fraction of sub-WARNING records kept, comma-separated
+    LOG_COMPRESS_ROTATED: bool = True  # gzip rotated files in the background
+
+    @model_validator(mode="after")
+    def default_database_url(self):
+        if not self.DATABASE_URL:
+            self.DATABASE_URL = f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+        return self
 
     @property
-    def DATABASE_URL(self) -> str:
-        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+    def REPLICA_URLS(self) -> list[str]:
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
 
     @property
     def REDIS_URL(self) -> str:
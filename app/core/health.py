@@ -0,0 +1,114 @@
+"""
+Liveness and readiness.
+
+/livez only shows that the worker's event loop answers. /readyz also checks
+the dependencies (database, Redis), but each check runs through a
+CachedProbe: its result is reused for READINESS_CACHE_SECONDS and concurrent
+probes wait for the one check in flight, so however many load balancers
+poll, a worker runs at most one SELECT 1 and one PING per interval.
+
+A worker reports not ready until its startup warmup has finished, and again
+once it starts draining for shutdown. Draining starts on SIGTERM, while the
+worker still serves: the signal reaches the server READINESS_DRAIN_SECONDS
+later, and only then does it stop accepting connections. That delay gives
+load balancers time to see the 503 and stop sending new requests.
+"""
+import asyncio
+import signal
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.logging import logger
+
+settings = get_settings()
+
+
+class CachedProbe:
+    def __init__(self, name: str, check: Callable[[], Awaitable[object]], ttl: float, timeout: float):
+        self.name = name
+        self.check = check
+        self.ttl = ttl
+        self.timeout = timeout
+        self.runs = 0
+        self._result: Optional[dict] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._result is not None and time.monotonic() - self._checked_at < self.ttl
+
+    async def run(self) -> dict:
+        if self._fresh():
+            return self._result
+        async with self._lock:
+            if self._fresh():  # refreshed while we waited for the lock
+                return self._result
+            self.runs += 1
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self.check(), self.timeout)
+                result = {"ok": True}
+            except asyncio.TimeoutError:
+                result = {"ok": False, "error": f"timed out after {self.timeout:g}s"}
+            except Exception as e:
+                result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            self._result, self._checked_at = result, time.monotonic()
+        return result
+
+
+class Readiness:
+    def __init__(self):
+        self.probes: Dict[str, CachedProbe] = {}
+        self.started = False
+        self.draining = False
+
+    def add(self, name: str, check: Callable[[], Awaitable[object]]):
+        self.probes[name] = CachedProbe(name, check, settings.READINESS_CACHE_SECONDS, settings.READINESS_TIMEOUT_SECONDS)
+
+    def drain_on_sigterm(self, delay: float):
+        """
+        Report draining as soon as SIGTERM arrives and pass the signal on to
+        the server's handler `delay` seconds later. A second SIGTERM passes
+        it on at once. Call from the lifespan, after the server has installed
+        its handlers.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return  # signals can only be handled there
+        server_handler = signal.getsignal(signal.SIGTERM)
+        if not callable(server_handler):
+            return
+        loop = asyncio.get_running_loop()
+        pending = []
+
+        def stop_later(sig, frame):
+            pending.append(loop.call_later(delay, server_handler, sig, frame))
+
+        def handle(sig, frame):
+            if self.draining or delay <= 0:
+                for timer in pending:
+                    timer.cancel()
+                self.draining = True
+                server_handler(sig, frame)
+                return
+            self.draining = True
+            logger.info("SIGTERM: draining for %gs before shutting down", delay)
+            loop.call_soon_threadsafe(stop_later, sig, frame)
+
+        signal.signal(signal.SIGTERM, handle)
+
+    async def report(self) -> Tuple[bool, dict]:
+        """(ready, body for /readyz)"""
+        if self.draining:
+            return False, {"status": "draining"}
+        if not self.started:
+            return False, {"status": "starting"}
+        results = await asyncio.gather(*(probe.run() for probe in self.probes.values()))
+        checks = dict(zip(self.probes, results))
+        ready = all(result["ok"] for result in results)
+        return ready, {"status": "ready" if ready else "unavailable", "checks": checks}
+
+
+readiness = Readiness()
@@ -1,22 +1,202 @@
 import sys
+import atexit
+import gzip
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+import orjson
+
 from app.core.config import get_settings
 from app.core.context import request_id_context
 
 settings = get_settings()
 
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
 class RequestIdFilter(logging.Filter):
     def filter(self, record):
         record.request_id = request_id_context.get()
         return True
 
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the records below WARNING from chosen loggers.
+
+    `rates` maps logger names to the fraction kept ({"app.health": 0.01});
+    a rate applies to the logger's children too. Warnings and errors are
+    always kept.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if not self.rates or record.levelno >= logging.WARNING:
+            return True
+        name = record.name
+        while name:
+            rate = self.rates.get(name)
+            if rate is not None:
+                return random.random() < rate
+            name = name.rpartition(".")[0]
+        return True
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """"app.health=0.01,uvicorn.access=0.1" -> {"app.health": 0.01, "uvicorn.access": 0.1}"""
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the caller: when the bounded queue is full
+    the record is dropped and counted, and a warning with the count is queued
+    once there is room again.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        # Render the message and traceback now (the arguments may change once
+        # we return) but keep the record's other fields for the formatter
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        if self.dropped:
+            with self._lock:
+                dropped, self.dropped = self.dropped, 0
+            notice = logging.makeLogRecord({
+                "name": "app.logging", "levelno": logging.WARNING, "levelname": "WARNING",
+                "msg": f"Log queue full: dropped {dropped} records", "request_id": "N/A",
+            })
+            try:
+                self.queue.put_nowait(notice)
+            except queue.Full:
+                with self._lock:
+                    self.dropped += dropped
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra=` fields included."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "message": record.getMessage(),
+            "location": f"{record.funcName}:{record.lineno}",
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        return orjson.dumps(entry, default=str).decode()
+
+class GzipRotatingFileHandler(RotatingFileHandler):
+    """
+    Rotated files are gzipped (app.log.1.gz) on a separate thread; the
+    rollover itself is just a rename. A rollover waits for the previous
+    file's compression, since it is about to shift the backups.
+    """
+
+    _compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-gzip")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending: Optional[Future] = None
+
+    def rotation_filename(self, default_name: str) -> str:
+        return default_name + ".gz"
+
+    def rotate(self, source: str, dest: str):
+        staged = dest.removesuffix(".gz")
+        os.replace(source, staged)
+        self._pending = self._compressor.submit(self._compress, staged, dest)
+
+    @staticmethod
+    def _compress(source: str, dest: str):
+        try:
+            with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(source)
+        except OSError as e:
+            print(f"Log rotation: compressing {source} failed: {e}", file=sys.stderr)
+
+    def wait_compressed(self):
+        if self._pending is not None:
+            self._pending.result()
+            self._pending = None
+
+    def doRollover(self):
+        self.wait_compressed()
+        super().doRollover()
+
+    def close(self):
+        self.wait_compressed()
+        super().close()
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room: a put_nowait would fail on a full queue at shutdown
+        self.queue.put(self._sentinel)
+
+_listener: Optional[QueueListener] = None
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, QueueHandler):
+                root.removeHandler(handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(shutdown_logging)
+
 def setup_logging():
+    global _listener
     # Ensure logs directory exists
     if not os.path.exists(settings.LOG_DIR):
         os.makedirs(settings.LOG_DIR)
 
+    shutdown_logging()
+
     # Get root logger (or specific app logger)
     # We will configure the root logger to capture everything including Uvicorn
     logger = logging.getLogger()
@@ -27,30 +207,38 @@ def setup_logging():
         logger.handlers.clear()
 
     # Formatter
-    formatter = logging.Formatter(
-        "%(asctime)s | %(levelname)-8s | %(name)s:%(funcName)s:%(lineno)d | %(request_id)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
-
-    # Filter
-    request_id_filter = RequestIdFilter()
+    if settings.LOG_FORMAT == "json":
+        formatter = JsonFormatter(datefmt="%Y-%m-%dT%H:%M:%S%z")
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s | %(levelname)-8s | %(name)s:%(funcName)s:%(lineno)d | %(request_id)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
+        )
 
     # Console Handler
     console_handler = logging.StreamHandler(sys.stderr)
     console_handler.setFormatter(formatter)
-    console_handler.addFilter(request_id_filter)
-    logger.addHandler(console_handler)
 
     # File Handler
     log_path = os.path.join(settings.LOG_DIR, settings.LOG_FILENAME)
-    file_handler = RotatingFileHandler(
-        log_path, 
-        maxBytes=settings.LOG_MAX_BYTES, 
+    file_handler_class = GzipRotatingFileHandler if settings.LOG_COMPRESS_ROTATED else RotatingFileHandler
+    file_handler = file_handler_class(
+        log_path,
+        maxBytes=settings.LOG_MAX_BYTES,
         backupCount=settings.LOG_BACKUP_COUNT
     )
     file_handler.setFormatter(formatter)
-    file_handler.addFilter(request_id_filter)
-    logger.addHandler(file_handler)
+
+    # The handlers above do blocking I/O (and rotation) on the listener's
+    # thread; callers only pay for a put_nowait. Filters run on the calling
+    # side so the request id contextvar is still set and sampled-out
+    # records never reach the queue.
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(SamplingFilter(parse_sampling(settings.LOG_SAMPLING)))
+    queue_handler.addFilter(RequestIdFilter())
+    logger.addHandler(queue_handler)
+    _listener = _Listener(queue_handler.queue, console_handler, file_handler, respect_handler_level=True)
+    _listener.start()
 
     # Specific configuration for Uvicorn to ensure it propagates or uses our handlers
     # access logs might use a different format, but we force ours here for consistency
@@ -0,0 +1,421 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Counters, gauges and histograms are plain dicts keyed by label tuples and
+are only touched from the event loop thread, so recording a sample is a
+dict lookup and an add: no locks, no I/O.
+
+With several uvicorn workers each process only sees its own samples. When
+METRICS_DIR is set every worker writes a JSON snapshot of its registry to
+`METRICS_DIR/<pid>-<start>.json` every METRICS_FLUSH_INTERVAL seconds (and
+on shutdown), and /metrics merges the live registry with the other workers'
+snapshots. The worker answering a scrape writes its own snapshot first and
+reads it back with the others, so totals don't depend on which worker
+answers.
+
+Counters and histograms must never go down, or Prometheus would read a
+reset on every worker recycle (SERVER_MAX_REQUESTS) or crash. So, as in
+prometheus_client's multiprocess mode, an exited worker's counters and
+histograms are folded into `retired.json`, which is summed with the live
+workers, and its gauges are dropped. A worker has exited when its pid is
+gone or now belongs to a process with a different start time (a reused
+pid). Folding happens under a file lock, and the aggregate records which
+files it absorbed, so a snapshot is counted exactly once even if two
+workers scrape at the same time or one dies mid-fold. Point METRICS_DIR at
+a directory that is emptied on deploy.
+"""
+import asyncio
+import bisect
+import glob
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from app.core.config import get_settings
+from app.core.logging import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: exited workers' files are left in place
+    fcntl = None
+
+settings = get_settings()
+
+# Seconds; tuned for request latencies and backend calls
+INF = float("inf")
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, INF)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Labels, object] = {}
+
+    def samples(self) -> Dict[Labels, object]:
+        return self.values
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        values = self.values
+        values[labels] = values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1):
+        values = self.values
+        values[labels] = values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        values = self.values
+        values[labels] = values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str):
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) if buckets[-1] == INF else tuple(buckets) + (INF,)
+
+    def observe(self, value: float, *labels: str):
+        # [count per bucket..., sum]; cumulative counts are built at render time
+        row = self.values.get(labels)
+        if row is None:
+            row = self.values[labels] = [0] * len(self.buckets) + [0.0]
+        row[bisect.bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+
+class CallbackMetric(Metric):
+    """Values read from elsewhere (pool stats, connection maps) at collection time."""
+
+    def __init__(self, name: str, documentation: str, type: str, labelnames: Iterable[str], callback: Callable[[], Dict[Labels, object]], buckets=()):
+        super().__init__(name, documentation, labelnames)
+        self.type = type
+        self.callback = callback
+        # Histograms return [count per bucket..., sum] rows, like Histogram.values
+        self.buckets = tuple(buckets)
+
+    def samples(self) -> Dict[Labels, object]:
+        try:
+            return self.callback()
+        except Exception as e:
+            logger.warning("Metrics callback %s failed: %s", self.name, e)
+            return {}
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # Modules may be imported more than once under test; keep the first
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, type: str, labelnames: Iterable[str], callback, buckets=()) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, type, labelnames, callback, buckets))
+
+    def snapshot(self) -> dict:
+        return {
+            **_identity(),
+            "metrics": {
+                name: {
+                    "type": metric.type,
+                    "help": metric.documentation,
+                    "labelnames": list(metric.labelnames),
+                    # JSON has no infinity; the +Inf bucket is implied
+                    "buckets": list(getattr(metric, "buckets", ())[:-1]),
+                    "samples": [[list(labels), value] for labels, value in metric.samples().items()],
+                }
+                for name, metric in self.metrics.items()
+            },
+        }
+
+
+REGISTRY = Registry()
+
+
+RETIRED = "retired.json"
+_LOCK = ".retire.lock"
+
+
+def _process_start(pid: int) -> Optional[str]:
+    """When the process started (clock ticks since boot, Linux), to tell a reused pid apart."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+_identities: Dict[int, dict] = {}
+
+
+def _identity() -> dict:
+    pid = os.getpid()
+    if pid not in _identities:  # per pid: a forked child is a new worker
+        _identities[pid] = {"pid": pid, "start": _process_start(pid) or secrets.token_hex(4)}
+    return _identities[pid]
+
+
+def _snapshot_path(directory: str) -> str:
+    identity = _identity()
+    return os.path.join(directory, f"{identity['pid']}-{identity['start']}.json")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _exited(snapshot: dict) -> bool:
+    pid = snapshot.get("pid")
+    if not _pid_alive(pid):
+        return True
+    start = _process_start(pid)
+    # Without /proc a reused pid looks alive until its new owner exits
+    return start is not None and start != snapshot.get("start")
+
+
+def _load(path: str) -> Optional[dict]:
+    try:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Skipping metrics snapshot %s: %s", path, e)
+        return None
+
+
+def _dump(path: str, data: dict):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(orjson.dumps(data))
+    os.replace(tmp, path)
+
+
+def _retire(directory: str, retired: dict, paths: List[str]) -> dict:
+    """Fold exited workers' counters and histograms into RETIRED and delete their files."""
+    # Files folded before a crash kept them from being deleted
+    folded = {name for name in retired["folded"] if os.path.exists(os.path.join(directory, name))}
+    snapshots = [retired]
+    for path in paths:
+        name = os.path.basename(path)
+        snapshot = None if name in folded else _load(path)
+        if snapshot is not None:
+            snapshots.append({"metrics": {
+                metric_name: metric for metric_name, metric in snapshot["metrics"].items() if metric["type"] != "gauge"
+            }})
+            folded.add(name)
+    merged = merge(snapshots)
+    for metric in merged.values():
+        metric["samples"] = [[list(labels), value] for labels, value in metric["samples"].items()]
+    retired = {"metrics": merged, "folded": sorted(folded)}
+    # Recorded before the files go, so a crash in between can't count them twice
+    _dump(os.path.join(directory, RETIRED), retired)
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return retired
+
+
+def _read_snapshots(directory: str) -> List[dict]:
+    """
+    Every worker's snapshot plus the retired aggregate, exited workers folded
+    into it first. Runs under a file lock, so a concurrent fold can't make a
+    worker's samples show up twice or not at all.
+    """
+    with open(os.path.join(directory, _LOCK), "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        snapshots, exited = [], []
+        for path in glob.glob(os.path.join(directory, "*-*.json")):
+            snapshot = _load(path)
+            if snapshot is None:
+                continue
+            if fcntl is not None and _exited(snapshot):
+                exited.append(path)
+            else:
+                snapshots.append(snapshot)
+        retired = _load(os.path.join(directory, RETIRED)) or {"metrics": {}, "folded": []}
+        if exited:
+            retired = _retire(directory, retired, exited)
+    return [*snapshots, retired]
+
+
+def merge(snapshots: List[dict]) -> Dict[str, dict]:
+    merged: Dict[str, dict] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot["metrics"].items():
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            samples = target["samples"]
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = samples.get(key)
+                if current is None:
+                    samples[key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    samples[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    samples[key] = current + value
+    return merged
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == INF:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def render(merged: Dict[str, dict]) -> str:
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        names = metric["labelnames"]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in sorted(metric["samples"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_labels(names, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*metric["buckets"], INF], value):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{name}_bucket{_labels(names, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, labels)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_labels(names, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_latest(registry: Registry = REGISTRY, directory: Optional[str] = None) -> str:
+    """Prometheus text for this process plus, with a directory, every other worker."""
+    directory = settings.METRICS_DIR if directory is None else directory
+    if not directory:
+        return render(merge([registry.snapshot()]))
+    # This worker's samples come from its file too, freshly written: every
+    # file only grows, so whichever worker answers, totals never go down
+    os.makedirs(directory, exist_ok=True)
+    write_snapshot(registry, directory)
+    return render(merge(_read_snapshots(directory)))
+
+
+def write_snapshot(registry: Registry = REGISTRY, directory: Optional[str] = None):
+    directory = directory or settings.METRICS_DIR
+    if not directory:
+        return
+    _dump(_snapshot_path(directory), registry.snapshot())
+
+
+_flusher: Optional[asyncio.Task] = None
+
+
+async def _flush_forever(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            write_snapshot()
+        except OSError as e:
+            logger.warning("Metrics snapshot failed: %s", e)
+
+
+def start_flusher():
+    """Start writing this worker's snapshot to METRICS_DIR in the background."""
+    global _flusher
+    if not settings.METRICS_DIR or _flusher is not None:
+        return
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    write_snapshot()
+    _flusher = asyncio.get_running_loop().create_task(_flush_forever(settings.METRICS_FLUSH_INTERVAL))
+
+
+async def stop_flusher():
+    global _flusher
+    if _flusher is None:
+        return
+    _flusher.cancel()
+    try:
+        await _flusher
+    except asyncio.CancelledError:
+        pass
+    _flusher = None
+    # The last samples: the next scrape after this process exits folds them into RETIRED
+    try:
+        write_snapshot()
+    except OSError as e:
+        logger.warning("Metrics snapshot failed: %s", e)
+
+
+# Metrics shared across modules
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+HTTP_DURATION = REGISTRY.histogram("http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"))
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests currently being served.")
+REDIS_DURATION = REGISTRY.histogram("redis_command_duration_seconds", "Redis command latency.", ("command",))
+REDIS_ERRORS = REGISTRY.counter("redis_command_errors_total", "Redis commands that raised.", ("command",))
+VESPA_DURATION = REGISTRY.histogram("vespa_request_duration_seconds", "Vespa call latency.", ("operation",))
+EMBEDDING_CACHE = REGISTRY.counter("embedding_cache_requests_total", "Embedding cache lookups.", ("result",))
+WEBSOCKET_CONNECTIONS = REGISTRY.gauge("websocket_connections", "Open websocket connections.", ("endpoint",))
+WEBSOCKET_OPENED = REGISTRY.counter("websocket_connections_opened_total", "Websocket connections accepted.", ("endpoint",))
+RATE_LIMIT_DECISIONS = REGISTRY.counter(
+    "rate_limit_decisions_total", "Rate limiter decisions, and whether Redis or the local cache made them.", ("route", "result", "source")
+)
+LOAD_SHED = REGISTRY.counter("load_shed_total", "Calls rejected because too many were already queued.", ("work",))
+WEBSOCKET_DROPPED = REGISTRY.counter("websocket_messages_dropped_total", "Messages dropped because a socket's send queue was full.", ("endpoint",))
@@ -0,0 +1,231 @@
+"""
+Rate limiting and load shedding for the expensive endpoints.
+
+Rate limits are token buckets in Redis, one per route and client: the
+verified token subject when the request is authenticated, otherwise the
+client IP (behind a proxy, set FORWARDED_ALLOW_IPS to the proxy's address
+so uvicorn reports the real client). RATE_LIMITS sets each route's bucket as
+`route=burst/seconds`: `login=10/60` allows a burst of 10 logins, refilled
+at 10 per minute. A single Lua script refills and takes tokens atomically,
+on the Redis clock, so every worker and node shares one budget.
+
+Two local shortcuts keep Redis off the path of traffic whose answer is
+already known:
+
+* Leases. While a bucket is more than half full the script hands the
+  calling worker up to RATE_LIMIT_LEASE extra tokens. The worker spends
+  them locally for RATE_LIMIT_LEASE_SECONDS, then lets them lapse. Tokens
+  are taken from Redis before they are spent, so a lease never admits more
+  than the bucket holds; at worst the limit is a little stricter.
+* Denials. A rejected client is rejected locally until its Retry-After
+  passes. Tokens only come back with time, so the answer can't change
+  sooner, and a flood of blocked requests costs no Redis calls.
+
+If Redis is unreachable, requests are let through for the next
+REDIS_RETRY_SECONDS without trying it again (the failure is logged and
+counted in redis_command_errors_total): an outage shouldn't lock everyone
+out of logging in, nor add a failed connection attempt to every request.
+
+Load shedding: LoadShedder caps concurrent CPU-heavy work (argon2) per
+worker and answers 503 with Retry-After when too many callers are queued,
+instead of letting latency grow for everyone.
+"""
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, Request, status
+from jose import JWTError, jwt
+from redis.commands.core import AsyncScript
+
+from app.core.config import get_settings
+from app.core.logging import logger
+from app.core.metrics import LOAD_SHED, RATE_LIMIT_DECISIONS
+from app.core.redis import get_redis_client
+
+settings = get_settings()
+
+MAX_LOCAL_KEYS = 10000  # leases and denials kept per worker before expired ones are pruned
+REDIS_RETRY_SECONDS = 5.0
+
+# KEYS[1]: bucket; ARGV: capacity, refill per ms, max lease. Returns {allowed, leased, retry_ms}.
+TOKEN_BUCKET = AsyncScript(None, b"""
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+if tokens < 1 then
+    -- Nothing to store: the stored state refills to the same value
+    return {0, 0, math.ceil((1 - tokens) / rate)}
+end
+tokens = tokens - 1
+-- Lease only from the top half, so one worker's lease can't starve the others
+local leased = math.max(0, math.min(tonumber(ARGV[3]), math.floor(tokens - capacity / 2)))
+tokens = tokens - leased
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+-- A missing bucket is a full one
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1000)
+return {1, leased, 0}
+""")
+
+
+@dataclass(frozen=True)
+class Rule:
+    capacity: int
+    period: float  # seconds to refill an empty bucket
+
+    @property
+    def rate_per_ms(self) -> float:
+        return self.capacity / (self.period * 1000)
+
+
+def parse_rules(spec: str) -> Dict[str, Rule]:
+    """"login=10/60,register=5/3600" -> {"login": Rule(10, 60.0), "register": Rule(5, 3600.0)}"""
+    rules = {}
+    for item in spec.split(","):
+        if "=" in item:
+            route, limit = item.split("=", 1)
+            capacity, period = limit.split("/", 1)
+            rules[route.strip()] = Rule(int(capacity), float(period))
+    return rules
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    retry_after: float = 0.0  # seconds
+
+
+ALLOWED = Decision(True)
+
+
+class TokenBucketLimiter:
+    def __init__(self, rules: Dict[str, Rule], redis=None, lease: Optional[int] = None, lease_seconds: Optional[float] = None):
+        self.rules = rules
+        self._redis = redis
+        self.lease = settings.RATE_LIMIT_LEASE if lease is None else lease
+        self.lease_seconds = settings.RATE_LIMIT_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self._leases: Dict[str, List[float]] = {}  # key -> [tokens, expires]
+        self._blocked: Dict[str, float] = {}  # key -> denied until
+        self.unavailable_until = 0.0
+
+    @property
+    def redis(self):
+        return self._redis or get_redis_client()
+
+    async def hit(self, route: str, client: str) -> Decision:
+        """Take one token from the route's bucket for `client`."""
+        rule = self.rules.get(route)
+        if rule is None:
+            return ALLOWED
+        key = f"ratelimit:{route}:{client}"
+        now = time.monotonic()
+
+        blocked_until = self._blocked.get(key)
+        if blocked_until is not None:
+            if blocked_until > now:
+                RATE_LIMIT_DECISIONS.inc(route, "denied", "local")
+                return Decision(False, blocked_until - now)
+            del self._blocked[key]
+        lease = self._leases.get(key)
+        if lease is not None:
+            if lease[0] >= 1 and lease[1] > now:
+                lease[0] -= 1
+                RATE_LIMIT_DECISIONS.inc(route, "allowed", "local")
+                return ALLOWED
+            del self._leases[key]
+
+        allowed, leased, retry_ms = await self._take(key, rule)
+        self._prune(now)
+        if allowed:
+            if leased:
+                self._leases[key] = [leased, now + self.lease_seconds]
+            RATE_LIMIT_DECISIONS.inc(route, "allowed", "redis")
+            return ALLOWED
+        retry_after = retry_ms / 1000
+        self._blocked[key] = now + retry_after
+        RATE_LIMIT_DECISIONS.inc(route, "denied", "redis")
+        return Decision(False, retry_after)
+
+    async def _take(self, key: str, rule: Rule) -> tuple:
+        """(allowed, leased tokens, retry after ms) from the Redis bucket."""
+        return await TOKEN_BUCKET([key], [rule.capacity, repr(rule.rate_per_ms), self.lease], client=self.redis)
+
+    def _prune(self, now: float):
+        if len(self._leases) + len(self._blocked) < MAX_LOCAL_KEYS:
+            return
+        self._leases = {key: lease for key, lease in self._leases.items() if lease[1] > now}
+        self._blocked = {key: until for key, until in self._blocked.items() if until > now}
+        if len(self._blocked) >= MAX_LOCAL_KEYS:
+            # Many clients blocked at once (a botnet): let Redis answer for them
+            self._blocked.clear()
+
+
+def client_key(request: Request) -> str:
+    """The verified token subject when there is one, else the client IP."""
+    token = request.headers.get("authorization") or request.cookies.get("access_token")
+    if token:
+        try:
+            subject = jwt.decode(token.removeprefix("Bearer ").strip(), settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+            if subject:
+                return f"user:{subject}"
+        except JWTError:
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+limiter = TokenBucketLimiter(parse_rules(settings.RATE_LIMITS))
+
+
+def rate_limit(route: str):
+    """Route dependency: `@router.post(..., dependencies=[rate_limit("login")])`."""
+    async def check(request: Request):
+        if not settings.RATE_LIMIT_ENABLED or limiter.unavailable_until > time.monotonic():
+            return
+        try:
+            decision = await limiter.hit(route, client_key(request))
+        except Exception as e:
+            limiter.unavailable_until = time.monotonic() + REDIS_RETRY_SECONDS
+            logger.warning("Rate limiter unavailable, allowing requests for %.0fs: %s", REDIS_RETRY_SECONDS, e)
+            return
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))},
+            )
+
+    return Depends(check)
+
+
+class LoadShedder:
+    """At most `limit` calls run at once (in threads) and `queue` wait; beyond that, 503."""
+
+    def __init__(self, name: str, limit: int, queue: int):
+        self.name = name
+        self.queue = queue
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def run(self, func: Callable, *args):
+        if self._semaphore.locked() and self.waiting >= self.queue:
+            LOAD_SHED.inc(self.name)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            return await asyncio.to_thread(func, *args)
+        finally:
+            self._semaphore.release()
@@ -1,9 +1,60 @@
+import time
+from typing import Optional
+
 import redis.asyncio as redis
+from redis.client import NEVER_DECODE
+from app.core import tracing
 from app.core.config import get_settings
+from app.core.metrics import REDIS_DURATION, REDIS_ERRORS
 
 settings = get_settings()
 
-redis_client = redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
 
-async def get_redis_client():
-    return redis_client
+class InstrumentedRedis(redis.Redis):
+    """Records every command in redis_command_duration_seconds and as a trace span."""
+
+    async def execute_command(self, *args, **options):
+        command = str(args[0]).upper()
+        start = time.perf_counter()
+        with tracing.span(f"redis {command}", tracing.CLIENT):
+            try:
+                return await super().execute_command(*args, **options)
+            except Exception:
+                REDIS_ERRORS.inc(command)
+                raise
+            finally:
+                REDIS_DURATION.observe(time.perf_counter() - start, command)
+
+
+    async def get_bytes(self, key: str) -> Optional[bytes]:
+        """GET without decoding, for binary values (cached embedding buffers) on this str client."""
+        return await self.execute_command("GET", key, **{NEVER_DECODE: True})
+
+
+_client: Optional[InstrumentedRedis] = None
+
+
+def get_redis_client() -> InstrumentedRedis:
+    """
+    The worker's one Redis client and connection pool, shared by every caller.
+
+    Created on first use (no connection is made until a command runs); the
+    app lifespan closes it on shutdown.
+    """
+    global _client
+    if _client is None:
+        _client = InstrumentedRedis.from_url(
+            settings.REDIS_URL,
+            encoding="utf-8",
+            decode_responses=True,
+            max_connections=settings.REDIS_MAX_CONNECTIONS or None,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+    return _client
+
+
+async def close_redis_client():
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
@@ -0,0 +1,340 @@
+"""
+Minimal tracing: spans with W3C trace context, exported as OTLP/JSON.
+
+TracingMiddleware opens a server span per request, continuing the trace
+from an incoming `traceparent` header when there is one; the DB, Redis,
+Vespa and embedding layers open child spans under whatever span is current
+(a ContextVar, so it follows the request through awaits and tasks just like
+request_id_context). Spans carry the request id, which links them to the
+log lines of the same request.
+
+Sampling is decided once per trace, at the root (head-based): an unsampled
+request sets a non-recording span and every child span under it is a shared
+no-op object, so the cost is a ContextVar lookup. Without a parent no child
+span is started at all; background work isn't traced unless it opens its
+own root with `span(..., root=True)`.
+
+Finished spans are batched on a background thread and written as OTLP/JSON
+(the format of the OpenTelemetry collector's file exporter and of its
+OTLP/HTTP receiver), so any collector or viewer that speaks OTLP can read
+them:
+
+    TRACING_EXPORTER=file   one ExportTraceServiceRequest per line in TRACING_FILE
+    TRACING_EXPORTER=otlp   POST to TRACING_OTLP_ENDPOINT (e.g. http://localhost:4318/v1/traces)
+"""
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+
+import orjson
+
+from app.core.config import get_settings
+from app.core.context import request_id_context
+
+settings = get_settings()
+logger = logging.getLogger("app.tracing")
+
+INTERNAL, SERVER, CLIENT = 1, 2, 3  # OTLP SpanKind
+STATUS_OK, STATUS_ERROR = 1, 2
+
+_random = random.Random()
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "end_time", "attributes", "status", "status_message", "_token")
+
+    sampled = True
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int = INTERNAL, attributes: Optional[dict] = None):
+        self.trace_id = trace_id
+        self.span_id = f"{_random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end_time = None
+        self.attributes = attributes or {}
+        self.status = 0
+        self.status_message = ""
+        self._token = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def end(self):
+        if self.end_time is None:
+            self.end_time = time.time_ns()
+            if _processor is not None:
+                _processor.submit(self)
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def __enter__(self):
+        self._token = current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        current_span.reset(self._token)
+        if exc is not None:
+            self.record_exception(exc)
+        self.end()
+        return False
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end_time),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status, "message": self.status_message} if self.status else {},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class NonRecordingSpan:
+    """Carries an unsampled trace's context (so it propagates) without recording anything."""
+
+    sampled = False
+
+    def __init__(self, trace_id: str = "0" * 32, span_id: str = "0" * 16):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self._token = None
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def record_exception(self, exc: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-00"
+
+    def __enter__(self):
+        self._token = current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        current_span.reset(self._token)
+        return False
+
+
+class _NoopSpan(NonRecordingSpan):
+    # Shared by every child of an unsampled span: entering it changes nothing
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+current_span: ContextVar[Optional[object]] = ContextVar("current_span", default=None)
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def parse_traceparent(header: Optional[str]):
+    """(trace_id, parent_span_id, sampled) from a W3C traceparent header, or None if invalid."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[0] == "ff":
+        return None
+    trace_id, span_id, flags = parts[1], parts[2], parts[3]
+    try:
+        int(trace_id + span_id, 16)
+        sampled = bool(int(flags[:2], 16) & 1)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id.lower(), span_id.lower(), sampled
+
+
+def new_trace_id() -> str:
+    return f"{_random.getrandbits(128):032x}"
+
+
+def enabled() -> bool:
+    return _processor is not None
+
+
+def start_root(name: str, traceparent: Optional[str] = None, kind: int = SERVER, attributes: Optional[dict] = None):
+    """Root span of a request or job; applies head sampling unless the caller already decided."""
+    if _processor is None:
+        return NOOP_SPAN
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id = new_trace_id(), None
+        sampled = _random.random() < settings.TRACING_SAMPLE_RATE
+    if not sampled:
+        return NonRecordingSpan(trace_id, f"{_random.getrandbits(64):016x}")
+    attributes = attributes or {}
+    attributes["request.id"] = request_id_context.get()
+    return Span(name, trace_id, parent_id, kind, attributes)
+
+
+def start_span(name: str, kind: int = INTERNAL, attributes: Optional[dict] = None):
+    """Child of the current span; a no-op outside a sampled trace. Call .end() when done."""
+    parent = current_span.get()
+    if parent is None or not parent.sampled:
+        return NOOP_SPAN
+    return Span(name, parent.trace_id, parent.span_id, kind, attributes)
+
+
+def span(name: str, kind: int = INTERNAL, root: bool = False, **attributes):
+    """`with span("vespa.query", hits=10):` makes a child of the current span (or a root)."""
+    if root:
+        return start_root(name, kind=kind, attributes=attributes)
+    return start_span(name, kind, attributes)
+
+
+def traceparent() -> Optional[str]:
+    """Header value for outgoing calls, continuing the current trace."""
+    parent = current_span.get()
+    return parent.traceparent() if parent is not None else None
+
+
+class FileExporter:
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, payload: bytes):
+        with open(self.path, "ab") as f:
+            f.write(payload + b"\n")
+
+    def close(self):
+        pass
+
+
+class OTLPHttpExporter:
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        import httpx
+
+        self.endpoint = endpoint
+        self.client = httpx.Client(timeout=timeout)
+
+    def export(self, payload: bytes):
+        response = self.client.post(self.endpoint, content=payload, headers={"Content-Type": "application/json"})
+        response.raise_for_status()
+
+    def close(self):
+        self.client.close()
+
+
+class BatchSpanProcessor:
+    """Queues finished spans and exports whatever has accumulated from a daemon thread."""
+
+    def __init__(self, exporter, service_name: str, max_queue: int = 2048, batch_size: int = 512):
+        self.exporter = exporter
+        self.service_name = service_name
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span):
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            # Block for the first span, then take whatever else is already queued
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:  # shutdown sentinel; spans queued before it are in this batch
+                batch.remove(None)
+                stopping = True
+            if batch:
+                self.export(batch)
+
+    def export(self, spans: List[Span]):
+        payload = orjson.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": [s.to_otlp() for s in spans]}],
+            }]
+        })
+        try:
+            self.exporter.export(payload)
+        except Exception as e:
+            logger.warning("Exporting %d spans failed: %s", len(spans), e)
+        if self.dropped:
+            logger.warning("Span queue full: dropped %d spans", self.dropped)
+            self.dropped = 0
+
+    def shutdown(self, timeout: float = 5.0):
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=timeout)
+        self.exporter.close()
+
+
+_processor: Optional[BatchSpanProcessor] = None
+
+
+def setup_tracing(exporter=None):
+    """Start exporting per TRACING_EXPORTER (or to `exporter`, in tests). No-op when unset."""
+    global _processor
+    shutdown_tracing()
+    if exporter is None:
+        if settings.TRACING_EXPORTER == "file":
+            exporter = FileExporter(settings.TRACING_FILE)
+        elif settings.TRACING_EXPORTER == "otlp":
+            exporter = OTLPHttpExporter(settings.TRACING_OTLP_ENDPOINT)
+        elif settings.TRACING_EXPORTER:
+            raise ValueError(f"Unknown TRACING_EXPORTER {settings.TRACING_EXPORTER!r}")
+        else:
+            return
+    _processor = BatchSpanProcessor(exporter, settings.TRACING_SERVICE_NAME)
+
+
+def shutdown_tracing():
+    """Export what's queued and stop the exporter thread."""
+    global _processor
+    if _processor is not None:
+        processor, _processor = _processor, None
+        processor.shutdown()
@@ -0,0 +1,47 @@
+"""
+The places where our SQL differs between Postgres and SQLite.
+
+Production runs on Postgres; DATABASE_URL=sqlite+aiosqlite://... runs the
+same code on SQLite for tests and laptop benchmarks. Both speak INSERT ...
+ON CONFLICT and RETURNING, so upserts only need the dialect's insert()
+construct. Statements SQLite can't express (data-modifying CTEs) branch on
+`is_sqlite` next to the Postgres version.
+"""
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+
+
+def dialect_name(session) -> str:
+    return session.get_bind().dialect.name
+
+
+def is_sqlite(session) -> bool:
+    return dialect_name(session) == "sqlite"
+
+
+def insert(session, model):
+    """INSERT for the session's database, with .on_conflict_do_update/do_nothing() and .excluded."""
+    if is_sqlite(session):
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def is_memory_sqlite(url: str) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def configure_sqlite(engine):
+    """
+    Let SQLAlchemy issue BEGIN itself. The sqlite3 driver otherwise starts
+    transactions lazily, at the first write, which breaks SAVEPOINT (and so
+    begin_nested and the rolled-back test sessions).
+    """
+    @event.listens_for(engine.sync_engine, "connect")
+    def _autocommit_driver(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
@@ -1,39 +1,78 @@
+"""
+One-shot database setup: bring the schema to the latest migration and seed
+the admin user.
+
+With DB_INIT_ON_STARTUP (the default, for development) every worker creates
+missing tables as it boots. Production turns that off and runs this once per
+deploy, before the workers start:
+
+    python -m app.db.init_db
+
+This is the only command a deploy needs; don't also run `alembic upgrade
+head`, this does it. An empty database gets every table from the models and
+is stamped at the latest revision (the migrations only evolve an existing
+schema). Any other database is upgraded to head. Databases created by
+create_all before migrations were tracked start from the first revision,
+whose steps skip what is already there. It also deletes uploads left
+unreferenced by a worker that died before purging them.
+"""
 import asyncio
-from sqlmodel import select
-from app.db.session import init_db, get_session, engine
-from app.models.user import User, Role
-from app.services.auth import get_password_hash
-from sqlalchemy.orm import sessionmaker
-from sqlmodel.ext.asyncio.session import AsyncSession
+import logging
+from pathlib import Path
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import SQLModel
 
-from app.core.config import get_settings
+from app.db.seed import seed_admin_user
+from app.db.session import async_session_factory, engine, init_db
+from app.services.uploads import sweep_released
+
+logger = logging.getLogger("app.db.init_db")
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
 
-settings = get_settings()
 
 async def create_initial_data():
+    """Missing tables and the admin user; what DB_INIT_ON_STARTUP runs in each worker."""
     await init_db()
-    
-    async_session = sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
-    
-    async with async_session() as session:
-        result = await session.exec(select(User).where(User.email == settings.ADMIN_EMAIL))
-        user = result.first()
-        
-        if not user:
-            admin_user = User(
-                email=settings.ADMIN_EMAIL,
-                full_name="Admin User",
-                hashed_password=get_password_hash(settings.ADMIN_PASSWORD),
-                role=Role.ADMIN,
-                is_active=True
-            )
-            session.add(admin_user)
-            await session.commit()
-            print("Admin user created")
-        else:
-            print("Admin user already exists")
+
+    async with async_session_factory() as session:
+        await seed_admin_user(session)
+
+
+async def migrate(db_engine: AsyncEngine = engine):
+    """Create or upgrade the schema and record it in alembic_version."""
+    # Imported here: workers import this module for create_initial_data
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["url"] = db_engine.url.render_as_string(hide_password=False)
+    async with db_engine.connect() as conn:
+        tables = await conn.run_sync(lambda sync_conn: set(inspect(sync_conn).get_table_names()))
+
+    # Alembic's env.py runs its own event loop, so it gets a thread without one
+    if tables - {"alembic_version"}:
+        logger.info("Upgrading the schema to the latest migration")
+        await asyncio.to_thread(command.upgrade, config, "head")
+    else:
+        logger.info("Empty database: creating tables and stamping the latest migration")
+        async with db_engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        await asyncio.to_thread(command.stamp, config, "head")
+
+
+async def main():
+    try:
+        await migrate()
+        async with async_session_factory() as session:
+            await seed_admin_user(session)
+            await sweep_released(session)
+    finally:
+        await engine.dispose()
+
 
 if __name__ == "__main__":
-    asyncio.run(create_initial_data())
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+Connection pool instrumentation: checkout wait time and saturation.
+"""
+import bisect
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import get_settings
+from app.core.logging import logger
+
+settings = get_settings()
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+CHECKOUT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+class PoolMetrics:
+    """Checkout wait histogram shared by every pool generation of one engine."""
+
+    def __init__(self, name: str = "primary"):
+        self.name = name
+        self.bucket_counts = [0] * len(CHECKOUT_BUCKETS)
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.bucket_counts[bisect.bisect_left(CHECKOUT_BUCKETS, seconds)] += 1
+            self.checkouts += 1
+            self.wait_total += seconds
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def quantile(self, q: float) -> float:
+        """Bucket upper bound below which a fraction `q` of checkouts completed."""
+        target = q * self.checkouts
+        seen = 0
+        for bound, count in zip(CHECKOUT_BUCKETS, self.bucket_counts):
+            seen += count
+            if seen >= target and count:
+                return min(bound, self.wait_max)
+        return 0.0
+
+    def snapshot(self, pool) -> dict:
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        return {
+            "name": self.name,
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": checked_out,
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "saturation": round(checked_out / capacity, 4) if capacity > 0 else None,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_total, 6),
+            "wait_seconds_max": round(self.wait_max, 6),
+            "wait_seconds_p50": self.quantile(0.5),
+            "wait_seconds_p99": self.quantile(0.99),
+            "wait_buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(CHECKOUT_BUCKETS, self.bucket_counts)
+            },
+        }
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that times how long each checkout waits for a connection."""
+
+    def __init__(self, *args, metrics: PoolMetrics = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics or PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            logger.error("DB pool %s exhausted: %s", self.metrics.name, self.status())
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.metrics.observe(waited)
+            if waited * 1000 > settings.DB_SLOW_CHECKOUT_MS:
+                logger.warning("Slow DB pool checkout on %s: waited %.1f ms (%s)", self.metrics.name, waited * 1000, self.status())
+
+    def recreate(self):
+        # dispose() swaps in a fresh pool; keep the counters across generations
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def stats(self) -> dict:
+        return self.metrics.snapshot(self)
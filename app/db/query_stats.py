@@ -0,0 +1,113 @@
+"""
+Per-request SQL accounting: query count, DB time, repeated statements, slow queries.
+
+Cursor events on every Engine add each statement's duration to the
+QueryStats of the current request (a ContextVar set by QueryStatsMiddleware;
+SQLAlchemy runs the sync engine in a greenlet that inherits the task's
+context). Statements are counted by their SQL text, which is already
+parameterized, so the same query for twenty different posts is one shape
+seen twenty times: an N+1.
+
+Statements slower than DB_SLOW_QUERY_MS are logged with their EXPLAIN plan
+whether or not a request is being tracked.
+"""
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+from app.core.logging import logger
+
+settings = get_settings()
+
+_EXPLAINABLE = ("select", "with")
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists and VALUES rows vary in length with the data
+_PARAM_LIST = re.compile(r"(\$\d+|\?|%s|%\(\w+\)s)(\s*,\s*(\$\d+|\?|%s|%\(\w+\)s))+")
+
+
+def statement_shape(statement: str) -> str:
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    return _PARAM_LIST.sub("?, ...", shape)
+
+
+class QueryStats:
+    """Queries issued while a request (or a query_budget block) was active."""
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float):
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.seconds += seconds
+            stats.statements[statement] += 1
+            stats = stats.parent
+
+    def repeated(self, threshold: int) -> List[tuple]:
+        """(shape, count) for statements run more than `threshold` times, most frequent first."""
+        shapes: Counter = Counter()
+        for statement, count in self.statements.items():
+            shapes[statement_shape(statement)] += count
+        return [(shape, count) for shape, count in shapes.most_common() if count > threshold]
+
+
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _explain(conn, cursor, statement: str, parameters) -> str:
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    # Separate cursor: the original one may still hold rows the caller hasn't fetched
+    explain_cursor = conn.connection.cursor()
+    try:
+        explain_cursor.execute(prefix + statement, parameters)
+        return "\n".join(" ".join(str(col) for col in row) for row in explain_cursor.fetchall())
+    finally:
+        explain_cursor.close()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+    if settings.DB_SLOW_QUERY_MS and elapsed * 1000 > settings.DB_SLOW_QUERY_MS:
+        plan = ""
+        if settings.DB_SLOW_QUERY_EXPLAIN and not executemany and statement.lstrip().lower().startswith(_EXPLAINABLE):
+            try:
+                plan = _explain(conn, cursor, statement, parameters)
+            except Exception as e:
+                plan = f"(EXPLAIN failed: {e})"
+        logger.warning("Slow query (%.1f ms): %s\n%s", elapsed * 1000, statement_shape(statement), plan)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # after_cursor_execute doesn't fire for failed statements
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+
+def warn_repeated(stats: QueryStats, label: str, threshold: int = None):
+    threshold = settings.DB_N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+    if not threshold:
+        return
+    for shape, count in stats.repeated(threshold):
+        logger.warning("Possible N+1 in %s: statement ran %d times: %s", label, count, shape)
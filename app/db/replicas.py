@@ -0,0 +1,174 @@
+"""
+Read-replica routing.
+
+`get_read_session` hands read-only endpoints a session bound to one of the
+configured replicas (round robin), except:
+
+* the caller wrote through the primary within DB_READ_YOUR_WRITES_SECONDS
+  (tracked per token subject in this worker and via a short-lived cookie,
+  so the next request on another worker also sees its own write; the
+  commit only flags the request and ReadYourWritesMiddleware sets the
+  cookie on whatever response the endpoint returns), or
+* no replica can be reached, in which case the primary is used and the
+  failing replica is skipped for DB_REPLICA_RETRY_SECONDS.
+"""
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional
+
+from fastapi import Request
+from jose import jwt
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_settings
+from app.core.logging import logger
+from app.db.session import async_session_factory, create_engine_from_settings
+
+settings = get_settings()
+
+WRITE_COOKIE = "db_rw_until"
+# request.state attribute holding the end of the window, for the middleware
+WRITE_STATE = "db_rw_until"
+
+
+def principal_from_request(request: Optional[Request]) -> Optional[str]:
+    """Token subject used to key the read-your-writes window.
+
+    Signature checks happen in the auth dependencies; a forged token here can
+    only route that caller's reads to the primary.
+    """
+    if request is None:
+        return None
+    token = request.headers.get("authorization") or request.cookies.get("access_token")
+    if not token:
+        return None
+    token = token.removeprefix("Bearer ").strip()
+    try:
+        return jwt.get_unverified_claims(token).get("sub")
+    except Exception:
+        return None
+
+
+class ReplicaSet:
+    def __init__(self, urls: List[str], engine_factory: Callable[..., AsyncEngine] = create_engine_from_settings):
+        self.engines = [engine_factory(url, name=f"replica{i}") for i, url in enumerate(urls)]
+        self.retry_seconds = settings.DB_REPLICA_RETRY_SECONDS
+        self._counter = itertools.count()
+        self._down_until: dict[int, float] = {}
+
+    def candidates(self) -> List[AsyncEngine]:
+        """Healthy replicas, rotated so successive calls start at the next one."""
+        if not self.engines:
+            return []
+        start = next(self._counter) % len(self.engines)
+        rotated = self.engines[start:] + self.engines[:start]
+        now = time.monotonic()
+        return [engine for engine in rotated if self._down_until.get(id(engine), 0.0) <= now]
+
+    def mark_down(self, engine: AsyncEngine, error: Exception):
+        logger.warning("Read replica %s unavailable, skipping for %.0fs: %s", engine.url.render_as_string(hide_password=True), self.retry_seconds, error)
+        self._down_until[id(engine)] = time.monotonic() + self.retry_seconds
+
+    async def dispose(self):
+        for engine in self.engines:
+            await engine.dispose()
+
+
+class RecentWriters:
+    """Subjects that wrote within the last `window` seconds (this worker only)."""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._until: dict[str, float] = {}
+
+    def record(self, principal: str):
+        now = time.monotonic()
+        if len(self._until) > 10000:
+            self._until = {key: until for key, until in self._until.items() if until > now}
+        self._until[principal] = now + self.window
+
+    def active(self, principal: str) -> bool:
+        until = self._until.get(principal)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            self._until.pop(principal, None)
+            return False
+        return True
+
+
+class ReadRouter:
+    def __init__(self, primary_factory: async_sessionmaker, replicas: Optional[ReplicaSet], window: float):
+        self.primary_factory = primary_factory
+        self.replicas = replicas
+        self.window = window
+        self.recent_writers = RecentWriters(window)
+        self.replica_factory = async_sessionmaker(class_=AsyncSession, expire_on_commit=False)
+
+    def record_write(self, request: Optional[Request]):
+        principal = principal_from_request(request)
+        if principal:
+            self.recent_writers.record(principal)
+        if request is not None:
+            setattr(request.state, WRITE_STATE, time.time() + self.window)
+
+    def must_use_primary(self, request: Optional[Request]) -> bool:
+        if not self.replicas:
+            return True
+        if request is None:
+            return False
+        principal = principal_from_request(request)
+        if principal and self.recent_writers.active(principal):
+            return True
+        try:
+            return float(request.cookies.get(WRITE_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    @asynccontextmanager
+    async def session(self, request: Optional[Request] = None) -> AsyncIterator[AsyncSession]:
+        if not self.must_use_primary(request):
+            for engine in self.replicas.candidates():
+                try:
+                    # Check out eagerly so an unreachable replica falls back before the endpoint runs
+                    connection = await engine.connect()
+                except (exc.DBAPIError, OSError, TimeoutError) as e:
+                    self.replicas.mark_down(engine, e)
+                    continue
+                try:
+                    async with self.replica_factory(bind=connection) as session:
+                        session.info["replica"] = True
+                        yield session
+                except exc.DBAPIError as e:
+                    if e.connection_invalidated:
+                        self.replicas.mark_down(engine, e)
+                    raise
+                finally:
+                    await connection.close()
+                return
+
+        async with self.primary_factory() as session:
+            yield session
+
+
+read_router = ReadRouter(
+    async_session_factory,
+    ReplicaSet(settings.REPLICA_URLS) if settings.REPLICA_URLS else None,
+    settings.DB_READ_YOUR_WRITES_SECONDS,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_write(session: Session):
+    # Only sessions handed out by get_session carry the request
+    if "request" in session.info:
+        read_router.record_write(session.info["request"])
+
+
+async def get_read_session(request: Request) -> AsyncSession:
+    async with read_router.session(request) as session:
+        yield session
@@ -1,20 +1,111 @@
-from sqlalchemy.ext.asyncio import create_async_engine
+import uuid
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel
 from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+from app.db.pool import CHECKOUT_BUCKETS, InstrumentedAsyncQueuePool, PoolMetrics
+from app.db.dialect import configure_sqlite, is_memory_sqlite
+from app.db import query_stats, tracing  # noqa: F401  (register the query accounting and tracing events)
 
 settings = get_settings()
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
+def engine_options(url: str) -> dict:
+    """Keyword arguments for create_async_engine built from Settings."""
+    options = {
+        "echo": settings.DB_ECHO,
+        "future": True,
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if is_memory_sqlite(url):
+        # Each connection to sqlite:// is its own database: keep exactly one open
+        options.update(pool_size=1, max_overflow=0, pool_recycle=-1, pool_pre_ping=False)
+    if make_url(url).get_driver_name() != "asyncpg":
+        return options
 
-async def get_session() -> AsyncSession:
-    async_session = sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
-    async with async_session() as session:
+    if settings.DB_PGBOUNCER:
+        # PgBouncer in transaction mode may hand each transaction a different
+        # server connection, so prepared statements must not be cached or reuse
+        # names, and it rejects startup parameters it doesn't know (timeouts
+        # then belong on the database role: ALTER ROLE ... SET statement_timeout).
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    else:
+        options["connect_args"] = {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": {
+                "application_name": "insightblog",
+                "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS),
+                "idle_in_transaction_session_timeout": str(settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS),
+            },
+        }
+    return options
+
+# Every engine created here (primary and replicas), for the metrics endpoint
+engines = []
+
+def create_engine_from_settings(url: str, name: str = "primary"):
+    engine = create_async_engine(url, **engine_options(url))
+    engine.sync_engine.pool.metrics = PoolMetrics(name)
+    if engine.dialect.name == "sqlite":
+        configure_sqlite(engine)
+    engines.append(engine)
+    return engine
+
+engine = create_engine_from_settings(settings.DATABASE_URL)
+
+async_session_factory = async_sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
+
+async def get_session(request: Request = None) -> AsyncSession:
+    async with async_session_factory() as session:
+        # Lets commit hooks (read-your-writes routing) see who wrote
+        session.info["request"] = request
         yield session
 
+async def ping_database():
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+def pool_stats() -> dict:
+    return engine.sync_engine.pool.stats()
+
+def _pool_samples(field: str):
+    def collect():
+        samples = {}
+        for pool_engine in engines:
+            pool = pool_engine.sync_engine.pool
+            if field == "wait_buckets":
+                metrics = pool.metrics
+                samples[(metrics.name,)] = [*metrics.bucket_counts, metrics.wait_total]
+            else:
+                stats = pool.stats()
+                samples[(stats["name"],)] = stats[field]
+        return samples
+    return collect
+
+REGISTRY.callback("db_pool_size", "Configured pool size.", "gauge", ("pool",), _pool_samples("pool_size"))
+REGISTRY.callback("db_pool_checked_out", "Connections currently checked out.", "gauge", ("pool",), _pool_samples("checked_out"))
+REGISTRY.callback("db_pool_idle", "Open connections waiting in the pool.", "gauge", ("pool",), _pool_samples("checked_in"))
+REGISTRY.callback("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection.", "counter", ("pool",), _pool_samples("timeouts"))
+REGISTRY.callback(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pool connection.", "histogram", ("pool",),
+    _pool_samples("wait_buckets"), buckets=CHECKOUT_BUCKETS,
+)
+
 async def init_db():
     async with engine.begin() as conn:
         # await conn.run_sync(SQLModel.metadata.drop_all)
@@ -0,0 +1,33 @@
+"""
+Client spans around SQL statements, under the request's current span.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import tracing
+from app.db.query_stats import statement_shape
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_span(conn, cursor, statement, parameters, context, executemany):
+    span = tracing.start_span("db.query", tracing.CLIENT)
+    if span.sampled:
+        span.set_attribute("db.system", conn.dialect.name)
+        span.set_attribute("db.statement", statement_shape(statement))
+        if executemany:
+            span.set_attribute("db.executemany", True)
+    conn.info.setdefault("query_span", []).append(span)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_span(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_span"].pop().end()
+
+
+@event.listens_for(Engine, "handle_error")
+def _fail_span(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_span"):
+        span = connection.info["query_span"].pop()
+        span.record_exception(exception_context.original_exception)
+        span.end()
@@ -0,0 +1,51 @@
+"""
+Database warmup for a freshly started worker.
+
+Without it the first requests pay for opening pool connections (TCP, auth,
+server settings), for SQLAlchemy compiling each ORM statement and, on
+asyncpg, for preparing it on each connection. warm_engine opens several pool
+connections at once and runs the hot read statements on each, through a
+session as the endpoints do, so their compiled forms land in the engine's
+compiled cache and in asyncpg's per-connection statement cache. The
+statements look up ids that don't exist: a few index probes per connection.
+"""
+import asyncio
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.blog import Category, Notification, Post, PostCategory, PostComment, PostLike, PostTag, Tag
+from app.models.user import User
+
+MISSING = -1
+
+# Shaped like the statements the posts, users and notifications endpoints issue
+HOT_QUERIES = [
+    select(User).where(User.email == ""),
+    select(func.count()).select_from(Post).where(Post.published == True),
+    select(Post).where(Post.published == True).order_by(Post.published_at.desc()).offset(0).limit(0),
+    select(func.count()).select_from(PostLike).where(PostLike.post_id == MISSING),
+    select(func.count()).select_from(PostComment).where(PostComment.post_id == MISSING),
+    select(Category).join(PostCategory).where(PostCategory.post_id == MISSING),
+    select(Tag).join(PostTag).where(PostTag.post_id == MISSING),
+    select(PostComment).where(PostComment.post_id == MISSING, PostComment.parent_id == None).order_by(PostComment.created_at.desc()),
+    select(PostComment).where(PostComment.parent_id == MISSING).order_by(PostComment.created_at),
+    select(PostLike).where(PostLike.post_id == MISSING),
+    select(Notification).where(Notification.user_id == MISSING).order_by(Notification.created_at.desc()).offset(0).limit(50),
+]
+
+
+async def _warm_connection(engine: AsyncEngine):
+    async with engine.connect() as conn:
+        async with AsyncSession(bind=conn) as session:
+            for statement in HOT_QUERIES:
+                await session.execute(statement)
+
+
+async def warm_engine(engine: AsyncEngine, connections: int) -> int:
+    """Open up to `connections` pooled connections (at most the pool size) and run HOT_QUERIES on each."""
+    count = max(min(connections, engine.sync_engine.pool.size()), 1)
+    # All checked out at once, so the pool has to open `count` of them
+    await asyncio.gather(*(_warm_connection(engine) for _ in range(count)))
+    return count
@@ -1,44 +1,177 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.staticfiles import StaticFiles
 from app.api.v1.api import api_router
 from app.web.routes import router as web_router
 from app.api.v1.endpoints.websocket import router as ws_router
 from app.core.config import get_settings
-from app.core.logging import setup_logging
-from app.db.session import init_db, get_session
-from app.db.seed import seed_admin_user
+from app.core.logging import setup_logging, shutdown_logging
+from app.core import metrics, tracing
+from app.core.health import readiness
+from app.core.redis import close_redis_client, get_redis_client
+from app.db import session as db_session
+from app.db.init_db import create_initial_data
+from app.db.replicas import read_router
+from app.db.warmup import warm_engine
+from app.services.feed import feed_service
+from app.services.realtime import manager as realtime_manager
+from app.services.vector_codec import get_vector_codec
+from app.services.vespa_app import vespa_service
+from app.services.images import shutdown_pool as shutdown_image_pool
+from app.services.storage import LocalStorage, get_storage
+from app.utils.assets import build_assets, load_manifest
+from app.utils.static_files import IMMUTABLE, CachedStaticFiles, PrecompressedStaticFiles
+from app.utils.upload_helper import ensure_upload_directories
 
 settings = get_settings()
 
 from app.middlwares.logger import RequestMiddleware
+from app.middlwares.negotiation import ContentNegotiationMiddleware
+from app.middlwares.compression import CompressionMiddleware
+from app.middlwares.metrics import MetricsMiddleware
+from app.middlwares.query_stats import QueryStatsMiddleware
+from app.middlwares.read_your_writes import ReadYourWritesMiddleware
+from app.middlwares.upload_limit import UploadLimitMiddleware
+from app.middlwares.tracing import TracingMiddleware
+from app.core.responses import APIResponse
 
 # ...
 
-app = FastAPI(title="InsightBlog Gen-AI Feed")
+import logging
 
-app.add_middleware(RequestMiddleware)
+logger = logging.getLogger("app.startup")
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+async def warm_up():
+    """Pay the first-request costs before /readyz lets traffic in."""
+    start = time.perf_counter()
+    steps = {
+        "database": lambda: asyncio.gather(*(warm_engine(engine, settings.DB_WARMUP_CONNECTIONS) for engine in db_session.engines)),
+        "redis": lambda: get_redis_client().ping(),
+        "caches": lambda: asyncio.to_thread(lambda: (load_manifest(), get_vector_codec())),
+        # SDK imports and client construction happen on first use; keep them off the loop
+        "clients": lambda: asyncio.to_thread(lambda: (feed_service.embedding_service, vespa_service.client)),
+    }
+    for name, step in steps.items():
+        try:
+            await step()
+        except Exception as e:
+            # Not fatal: /readyz reports the dependencies that are really down
+            logger.warning("Warmup step %s failed: %s", name, e)
+    logger.info("Warmup finished in %.2fs", time.perf_counter() - start)
+    readiness.started = True
+
+readiness.add("database", db_session.ping_database)
+readiness.add("redis", lambda: get_redis_client().ping())
 
-@app.on_event("startup")
-async def on_startup():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     setup_logging()
-    await init_db()
-    
-    # Seed admin user
-    async for session in get_session():
-        await seed_admin_user(session)
-        break
+    tracing.setup_tracing()
+    ensure_upload_directories()
+    if settings.ASSETS_BUILD_ON_STARTUP:
+        build_assets()
+    if settings.DB_INIT_ON_STARTUP:
+        # Tables and admin user; production runs app.db.init_db once per deploy instead
+        await create_initial_data()
+    metrics.start_flusher()
+    # /livez answers straight away; /readyz waits for the warmup
+    warmup = None
+    if settings.WARMUP_ON_STARTUP:
+        warmup = asyncio.create_task(warm_up())
+    else:
+        readiness.started = True
+    # SIGTERM fails /readyz first and stops the server after the drain delay
+    readiness.drain_on_sigterm(settings.READINESS_DRAIN_SECONDS)
 
-from app.core.logging import logger
+    yield
 
-# ...
+    # Already set after SIGTERM; any other shutdown (Ctrl+C) ends here
+    readiness.draining = True
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+        await asyncio.gather(warmup, return_exceptions=True)
+    shutdown_image_pool()
+    await metrics.stop_flusher()
+    # Before the Redis client closes: publishers stop routing to this worker
+    await realtime_manager.stop()
+    await close_redis_client()
+    if read_router.replicas:
+        await read_router.replicas.dispose()
+    await db_session.engine.dispose()
+    tracing.shutdown_tracing()
+    await storage.close()
+    shutdown_logging()
+
+app = FastAPI(title="InsightBlog Gen-AI Feed", default_response_class=APIResponse, lifespan=lifespan)
+
+# Last added runs first: RequestMiddleware sees (and times) everything below it
+app.add_middleware(
+    UploadLimitMiddleware,
+    max_body=max(settings.UPLOAD_MAX_POST_IMAGE_BYTES, settings.UPLOAD_MAX_AVATAR_BYTES) + settings.UPLOAD_FORM_OVERHEAD_BYTES,
+)
+app.add_middleware(ReadYourWritesMiddleware, window=settings.DB_READ_YOUR_WRITES_SECONDS)
+app.add_middleware(ContentNegotiationMiddleware)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+if settings.DB_QUERY_HEADERS or settings.DB_N_PLUS_ONE_THRESHOLD:
+    app.add_middleware(
+        QueryStatsMiddleware,
+        headers=settings.DB_QUERY_HEADERS,
+        detect_repeats=bool(settings.DB_N_PLUS_ONE_THRESHOLD),
+    )
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if settings.TRACING_EXPORTER:
+    app.add_middleware(TracingMiddleware)
+app.add_middleware(RequestMiddleware)
+
+# Content-addressed uploads never change, so browsers and CDNs may cache them
+# forever. With STORAGE_BACKEND=s3 they are served by the bucket instead.
+storage = get_storage()
+if isinstance(storage, LocalStorage):
+    app.mount(
+        storage.mount_path,
+        CachedStaticFiles(directory=storage.path("objects"), check_dir=False, cache_control=IMMUTABLE),
+        name="uploads",
+    )
+# Fingerprinted build output (app.utils.assets): hashed names, precompressed variants
+app.mount(
+    "/static/dist",
+    PrecompressedStaticFiles(directory="static/dist", check_dir=False, cache_control=IMMUTABLE),
+    name="dist",
+)
+app.mount("/static", StaticFiles(directory="static"), name="static")
+
+# Sampled via LOG_SAMPLING: probes hit this every few seconds
+health_logger = logging.getLogger("app.health")
 
 @app.get("/health")
 async def health_check():
-    logger.info("Health check called")
+    health_logger.info("Health check called")
     return {"status": "ok"}
 
+@app.get("/livez", include_in_schema=False)
+async def livez():
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    ready, body = await readiness.report()
+    return APIResponse(body, status_code=200 if ready else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(metrics.generate_latest(), media_type=metrics.CONTENT_TYPE)
+
 app.include_router(api_router, prefix="/api/v1")
 app.include_router(web_router)
 app.include_router(ws_router, prefix="/api/v1")
@@ -0,0 +1,134 @@
+"""
+gzip/brotli compression of dynamic responses.
+
+Picks brotli when the client accepts it, gzip otherwise, and only for
+compressible content types at least `minimum_size` bytes long. Responses
+that already carry a Content-Encoding (the precompressed static assets) and
+event streams pass through untouched. Streaming responses are compressed
+chunk by chunk without buffering. A strong ETag on a compressed body is
+weakened: the bytes differ from the identity encoding, but W/ still lets
+If-None-Match revalidate.
+"""
+import gzip
+import zlib
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.static_files import accepted_encodings
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/msgpack",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        # Low brotli qualities are as fast as gzip -6 and still smaller; 11 is for build-time assets
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accepted = accepted_encodings(scope)
+        if "br" in accepted:
+            encoding = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+        responder = _Responder(send, encoding, self)
+        await self.app(scope, receive, responder.send)
+
+
+class _Responder:
+    def __init__(self, send: Send, encoding: str, config: CompressionMiddleware):
+        self._send = send
+        self.encoding = encoding
+        self.config = config
+        self.start_message: Message = None
+        self.compressor = None
+        self.passthrough = False
+
+    def _compressor(self):
+        if self.encoding == "br":
+            return brotli.Compressor(quality=self.config.brotli_quality)
+        return zlib.compressobj(self.config.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def _compress_all(self, body: bytes) -> bytes:
+        if self.encoding == "br":
+            return brotli.compress(body, quality=self.config.brotli_quality)
+        return gzip.compress(body, compresslevel=self.config.gzip_level, mtime=0)
+
+    def _should_compress(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        if content_type.startswith("text/event-stream"):
+            return False
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _encode_headers(self, headers: MutableHeaders):
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            self.passthrough = not self._should_compress(Headers(raw=message["headers"]))
+            if self.passthrough:
+                await self._send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(raw=self.start_message["headers"])
+
+        if self.compressor is None:
+            if not more_body:
+                # Whole body in one message
+                if len(body) < self.config.minimum_size:
+                    self.passthrough = True
+                    await self._send(self.start_message)
+                    await self._send(message)
+                    return
+                compressed = self._compress_all(body)
+                self._encode_headers(headers)
+                headers["Content-Length"] = str(len(compressed))
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+
+            self.compressor = self._compressor()
+            self._encode_headers(headers)
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self._send(self.start_message)
+
+        if self.encoding == "br":
+            chunk = self.compressor.process(body)
+            if not more_body:
+                chunk += self.compressor.finish()
+        else:
+            chunk = self.compressor.compress(body)
+            if not more_body:
+                chunk += self.compressor.flush()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
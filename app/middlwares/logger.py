@@ -1,33 +1,58 @@
 import time
 import uuid
-from contextvars import ContextVar
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
 from app.core.logging import logger
 from app.core.context import request_id_context
 
-# Context variable to store request ID
-# request_id_context is now imported from app.core.context
 
-class RequestMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+class RequestMiddleware:
+    """
+    Request ID, timing headers and one log line per request or websocket.
+
+    Pure ASGI: headers are added to the response start message as it passes
+    through, so the body is never wrapped or buffered and the app runs in
+    the same task (no BaseHTTPMiddleware call_next stream).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        scope_type = scope["type"]
+        if scope_type not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
         # Generate Request ID
         request_id = str(uuid.uuid4())
-        request_id_context.set(request_id)
-        
-        # Start Timer
-        start_time = time.time()
-        
-        # Process Request
-        response = await call_next(request)
-        
-        # Calculate Duration
-        process_time = time.time() - start_time
-        
-        # Add Headers
-        response.headers["X-Request-ID"] = request_id
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        logger.info(f"Request: {request.method} {request.url.path} | Status: {response.status_code} | Time: {process_time:.4f}s")
-        
-        return response
+        token = request_id_context.set(request_id)
+        start = time.perf_counter_ns()
+        status_code = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", request_id)
+                # Time to first byte of the response
+                headers.append("X-Process-Time", f"{(time.perf_counter_ns() - start) / 1e9:.6f}")
+            elif message_type == "websocket.accept":
+                status_code = 101
+                message.setdefault("headers", [])
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            elif message_type == "websocket.close" and status_code is None:
+                status_code = 403  # closed before accept
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = (time.perf_counter_ns() - start) / 1e9
+            method = scope.get("method", "WS")
+            logger.info("Request: %s %s | Status: %s | Time: %.4fs", method, scope["path"], status_code, elapsed)
+            request_id_context.reset(token)
@@ -0,0 +1,22 @@
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.responses import JSON, MSGPACK, response_format
+
+
+class ContentNegotiationMiddleware:
+    """Picks msgpack for clients that ask for it in Accept; JSON otherwise."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = Headers(scope=scope).get("accept", "")
+        token = response_format.set(MSGPACK if MSGPACK in accept else JSON)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            response_format.reset(token)
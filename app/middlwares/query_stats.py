@@ -0,0 +1,41 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db.query_stats import QueryStats, query_stats, warn_repeated
+
+
+class QueryStatsMiddleware:
+    """
+    Counts the SQL each request runs.
+
+    With `headers` set (dev), responses carry X-DB-Queries and X-DB-Time (the
+    totals when the response started); with `detect_repeats`, statements
+    repeated past DB_N_PLUS_ONE_THRESHOLD are logged once the request ends.
+    """
+
+    def __init__(self, app: ASGIApp, headers: bool = False, detect_repeats: bool = False):
+        self.app = app
+        self.headers = headers
+        self.detect_repeats = detect_repeats
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(parent=query_stats.get())
+        token = query_stats.set(stats)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and self.headers:
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Queries", str(stats.count))
+                headers.append("X-DB-Time", f"{stats.seconds:.6f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper if self.headers else send)
+        finally:
+            query_stats.reset(token)
+            if self.detect_repeats:
+                warn_repeated(stats, f"{scope['method']} {scope['path']}")
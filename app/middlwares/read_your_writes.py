@@ -0,0 +1,38 @@
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db.replicas import WRITE_COOKIE, WRITE_STATE
+
+
+class ReadYourWritesMiddleware:
+    """
+    Sets the read-your-writes cookie on responses to requests that committed.
+
+    The commit hook (app.db.replicas) only flags request.state: an endpoint
+    returning its own Response (a redirect, an APIResponse) discards the
+    response FastAPI injects into dependencies, so the cookie is added to the
+    one actually sent.
+    """
+
+    def __init__(self, app: ASGIApp, window: float):
+        self.app = app
+        self.max_age = max(int(window), 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Created here so the endpoint's Request shares this dict
+        state = scope.setdefault("state", {})
+
+        async def send_wrapper(message: Message):
+            until = state.get(WRITE_STATE)
+            if message["type"] == "http.response.start" and until is not None:
+                cookie = Response()
+                cookie.set_cookie(WRITE_COOKIE, f"{until:.3f}", max_age=self.max_age, httponly=True)
+                MutableHeaders(scope=message).append("set-cookie", cookie.headers["set-cookie"])
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,40 @@
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import tracing
+from app.middlwares.metrics import route_template
+
+
+class TracingMiddleware:
+    """Server span per request, continuing an incoming W3C traceparent."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not tracing.enabled():
+            await self.app(scope, receive, send)
+            return
+
+        root = tracing.start_root(scope["path"], Headers(scope=scope).get("traceparent"))
+        if not root.sampled:
+            with root:
+                await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    root.status = tracing.STATUS_ERROR
+            await send(message)
+
+        with root:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = route_template(scope)
+                root.name = f"{scope['method']} {route}"
+                root.set_attribute("http.method", scope["method"])
+                root.set_attribute("http.route", route)
+                root.set_attribute("url.path", scope["path"])
@@ -1,5 +1,6 @@
 from typing import List, Optional
 from datetime import datetime
+from sqlalchemy import JSON, Column, DateTime, Index, UniqueConstraint
 from sqlmodel import Field, SQLModel, Relationship
 from app.models.user import User
 
@@ -33,10 +34,12 @@ class Post(SQLModel, table=True):
     title: str = Field(max_length=200)
     summary: Optional[str] = None
     image_url: Optional[str] = None
+    # Resized copies of image_url, filled in by app.services.images
+    image_variants: Optional[dict] = Field(default=None, sa_column=Column(JSON))
     published: bool = Field(default=False)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
-    published_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
+    published_at: Optional[datetime] = Field(default=None, sa_type=DateTime)
     
     categories: List[Category] = Relationship(back_populates="posts", link_model=PostCategory)
     tags: List[Tag] = Relationship(back_populates="posts", link_model=PostTag)
@@ -45,10 +48,13 @@ class Post(SQLModel, table=True):
     shares: List["PostShare"] = Relationship(back_populates="post", sa_relationship_kwargs={"cascade": "all, delete"})
 
 class PostLike(SQLModel, table=True):
+    # One like per user per post; also the conflict target of the like toggle
+    __table_args__ = (UniqueConstraint("post_id", "user_id", name="uq_postlike_post_id_user_id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     post_id: int = Field(foreign_key="post.id")
     user_id: int = Field(foreign_key="user.id")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
     
     post: Post = Relationship(back_populates="likes")
 
@@ -56,7 +62,7 @@ class PostShare(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     post_id: int = Field(foreign_key="post.id")
     user_id: int = Field(foreign_key="user.id")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
     
     post: Post = Relationship(back_populates="shares")
 
@@ -66,8 +72,8 @@ class PostComment(SQLModel, table=True):
     user_id: int = Field(foreign_key="user.id")
     parent_id: Optional[int] = Field(default=None, foreign_key="postcomment.id")
     content: str
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
     
     post: Post = Relationship(back_populates="comments")
     children: List["PostComment"] = Relationship(
@@ -86,4 +92,16 @@ class Notification(SQLModel, table=True):
     post_id: Optional[int] = Field(default=None, foreign_key="post.id")
     comment_id: Optional[int] = Field(default=None, foreign_key="postcomment.id")
     read: bool = Field(default=False)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
+
+# Indexes for the hot queries (listing, profile feed, comment trees, like
+# counts, notifications). Shipped as a CONCURRENTLY migration in alembic/versions.
+Index("ix_post_published_published_at", Post.published_at, postgresql_where=Post.published)
+Index("ix_post_author_id_published_at", Post.author_id, Post.published_at, postgresql_where=Post.published)
+Index("ix_postshare_post_id", PostShare.post_id)
+Index("ix_postcomment_post_id_parent_id_created_at", PostComment.post_id, PostComment.parent_id, PostComment.created_at)
+Index("ix_postcomment_parent_id_created_at", PostComment.parent_id, PostComment.created_at)
+Index("ix_notification_user_id_created_at", Notification.user_id, Notification.created_at)
+Index("ix_notification_created_at", Notification.created_at)
+Index("ix_posttag_tag_id", PostTag.tag_id)
+Index("ix_postcategory_category_id", PostCategory.category_id)
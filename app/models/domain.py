@@ -1,14 +1,27 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import AfterValidator, BaseModel
+from typing import Annotated, List, Optional
+from app.core.config import get_settings
+from app.models.embedding import Embedding
+
+
+def check_dim(embedding: Embedding) -> Embedding:
+    """Vectors are ingested at the model's dimension; reduction happens later, in the codec."""
+    expected = get_settings().EMBEDDING_DIM
+    if embedding.dim != expected:
+        raise ValueError(f"Embedding has {embedding.dim} dimensions, expected {expected}")
+    return embedding
+
+
+ModelEmbedding = Annotated[Embedding, AfterValidator(check_dim)]
 
 class UserProfile(BaseModel):
     user_id: str
     interests: List[str]
-    embedding: Optional[List[float]] = None
+    embedding: Optional[ModelEmbedding] = None
 
 class ContentItem(BaseModel):
     content_id: str
     title: str
     body: str
     tags: List[str]
-    embedding: Optional[List[float]] = None
+    embedding: Optional[ModelEmbedding] = None
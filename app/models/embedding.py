@@ -0,0 +1,179 @@
+"""
+Compact embedding vectors.
+
+`Embedding` keeps a vector as a single little-endian float32 buffer instead of a
+list of Python floats (a 1536-dim vector is 6 KB instead of ~50 KB), converts to
+and from NumPy without copying and travels over the wire as base64.
+`QuantizedEmbedding` is the int8 form used for storage and ANN indexes.
+"""
+import base64
+from typing import Any, Iterable, Union
+
+import numpy as np
+from pydantic_core import core_schema
+
+FLOAT32 = np.dtype("<f4")
+INT8 = np.dtype("i1")
+
+
+class Embedding:
+    """Immutable float32 vector backed by a bytes-like buffer."""
+
+    __slots__ = ("_buffer",)
+
+    def __init__(self, buffer: Union[bytes, bytearray, memoryview]):
+        if len(buffer) % FLOAT32.itemsize:
+            raise ValueError("Embedding buffer length must be a multiple of 4 bytes")
+        self._buffer = buffer
+
+    @classmethod
+    def from_list(cls, values: Iterable[float]) -> "Embedding":
+        array = np.asarray(list(values), dtype=FLOAT32)
+        if array.ndim != 1:
+            raise ValueError("Embedding must be one-dimensional")
+        return cls(array.tobytes())
+
+    @classmethod
+    def from_numpy(cls, array: np.ndarray) -> "Embedding":
+        """Wrap a 1-d array. No copy is made if it is already contiguous float32."""
+        array = np.ascontiguousarray(array, dtype=FLOAT32)
+        if array.ndim != 1:
+            raise ValueError("Embedding must be one-dimensional")
+        return cls(memoryview(array).cast("B").toreadonly())
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview]) -> "Embedding":
+        return cls(data)
+
+    @classmethod
+    def from_base64(cls, data: Union[str, bytes]) -> "Embedding":
+        return cls(base64.b64decode(data, validate=True))
+
+    @property
+    def dim(self) -> int:
+        return len(self._buffer) // FLOAT32.itemsize
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._buffer)
+
+    def to_numpy(self) -> np.ndarray:
+        """Read-only float32 view over the underlying buffer (zero-copy)."""
+        return np.frombuffer(self._buffer, dtype=FLOAT32)
+
+    def to_bytes(self) -> bytes:
+        if isinstance(self._buffer, bytes):
+            return self._buffer
+        return bytes(self._buffer)
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self._buffer).decode("ascii")
+
+    def tolist(self) -> list[float]:
+        return self.to_numpy().tolist()
+
+    def quantize(self) -> "QuantizedEmbedding":
+        return QuantizedEmbedding.from_embedding(self)
+
+    def __len__(self) -> int:
+        return self.dim
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Embedding):
+            return NotImplemented
+        return self._buffer == other._buffer
+
+    def __repr__(self) -> str:
+        return f"Embedding(dim={self.dim})"
+
+    @classmethod
+    def coerce(cls, value: Any) -> "Embedding":
+        """
+        Accept an Embedding, a list of floats, a NumPy array, raw bytes or base64.
+
+        Anything else raises ValueError, which pydantic reports as a validation
+        error (a 422 from the API) rather than letting it escape as a 500.
+        """
+        if isinstance(value, Embedding):
+            return value
+        try:
+            if isinstance(value, np.ndarray):
+                return cls.from_numpy(value)
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                return cls.from_bytes(value)
+            if isinstance(value, str):
+                return cls.from_base64(value)
+            if isinstance(value, (list, tuple)):
+                return cls.from_list(value)
+        except TypeError as e:
+            # e.g. a list holding dicts
+            raise ValueError(f"Cannot build an Embedding: {e}") from e
+        raise ValueError(f"Cannot build an Embedding from {type(value).__name__}")
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type: Any, handler: Any) -> core_schema.CoreSchema:
+        # Python mode keeps the Embedding object, JSON mode emits base64
+        return core_schema.no_info_plain_validator_function(
+            cls.coerce,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda value: value.to_base64(), when_used="json"
+            ),
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, schema: Any, handler: Any) -> dict:
+        return {
+            "anyOf": [
+                {"type": "string", "contentEncoding": "base64", "description": "little-endian float32 vector"},
+                {"type": "array", "items": {"type": "number"}},
+            ]
+        }
+
+
+class QuantizedEmbedding:
+    """
+    Symmetric int8 scalar quantization: value ~= code * scale.
+
+    The scale is per vector, so angular/cosine ranking can use the codes directly.
+    """
+
+    __slots__ = ("codes", "scale")
+
+    def __init__(self, codes: bytes, scale: float):
+        self.codes = codes
+        self.scale = scale
+
+    @classmethod
+    def from_embedding(cls, embedding: Embedding) -> "QuantizedEmbedding":
+        values = embedding.to_numpy()
+        peak = float(np.max(np.abs(values))) if values.size else 0.0
+        scale = peak / 127.0 if peak else 1.0
+        codes = np.clip(np.rint(values / scale), -127, 127).astype(INT8)
+        return cls(codes.tobytes(), scale)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "QuantizedEmbedding":
+        """Inverse of `to_bytes`: a float32 scale followed by the int8 codes."""
+        scale = float(np.frombuffer(data[:4], dtype=FLOAT32)[0])
+        return cls(bytes(data[4:]), scale)
+
+    @property
+    def dim(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.codes) + FLOAT32.itemsize
+
+    def to_numpy(self) -> np.ndarray:
+        """Read-only int8 view over the codes (zero-copy)."""
+        return np.frombuffer(self.codes, dtype=INT8)
+
+    def to_bytes(self) -> bytes:
+        return np.float32(self.scale).astype(FLOAT32).tobytes() + self.codes
+
+    def dequantize(self) -> Embedding:
+        return Embedding.from_numpy(self.to_numpy().astype(FLOAT32) * np.float32(self.scale))
+
+    def __repr__(self) -> str:
+        return f"QuantizedEmbedding(dim={self.dim}, scale={self.scale:.6g})"
@@ -0,0 +1,12 @@
+from datetime import datetime
+from sqlalchemy import DateTime
+from sqlmodel import Field, SQLModel
+
+
+class StoredObject(SQLModel, table=True):
+    # One content-addressed upload file, shared by every row whose URL points at it
+    sha256: str = Field(primary_key=True, max_length=64)
+    content_type: str = Field(max_length=50)
+    size: int
+    ref_count: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_type=DateTime)
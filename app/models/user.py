@@ -1,4 +1,5 @@
 from typing import Optional
+from sqlalchemy import JSON, Column
 from sqlmodel import Field, SQLModel
 from enum import Enum
 
@@ -17,5 +18,7 @@ class UserBase(SQLModel):
 class User(UserBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     hashed_password: str
+    # Resized copies of profile_image_url, filled in by app.services.images
+    profile_image_variants: Optional[dict] = Field(default=None, sa_column=Column(JSON))
 
 
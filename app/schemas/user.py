@@ -8,6 +8,7 @@ class UserCreate(UserBase):
 class UserRead(UserBase):
     id: int
     profile_image_url: Optional[str] = None
+    profile_image_variants: Optional[dict] = None
     bio: Optional[str] = None
 
 class UserUpdate(SQLModel):
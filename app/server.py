@@ -0,0 +1,131 @@
+"""
+Production server:
+
+    python -m app.server
+
+main.py at the repository root is the development server (auto-reload, one
+worker). This runner instead:
+
+* uses uvloop and httptools when they are installed (`pip install
+  insightblog[server]`), falling back to asyncio and h11;
+* starts one worker per CPU the process may use (affinity mask and cgroup
+  quota, so a container limited to 2 CPUs gets 2 workers on a 64-core host)
+  unless SERVER_WORKERS is set;
+* takes keep-alive, listen backlog, max-requests recycling and the graceful
+  shutdown timeout from the SERVER_* settings;
+* turns off DB_INIT_ON_STARTUP and ASSETS_BUILD_ON_STARTUP in the workers,
+  so they don't all run DDL, seeding and the asset build at once. Run those
+  once per deploy instead (see ONE_SHOT_STEPS).
+
+Flags override the settings for one run, e.g. to compare event loops
+(benchmarks.loadtest.loops). With more than one worker, uvicorn's supervisor
+replaces workers that exit after SERVER_MAX_REQUESTS; a single worker just
+exits and relies on the process manager to restart it.
+"""
+import argparse
+import importlib.util
+import logging
+import math
+import os
+from typing import Optional
+
+import uvicorn
+
+from app.core.config import Settings, get_settings
+
+logger = logging.getLogger("app.server")
+
+# Startup work the workers must not repeat, and the deploy command that does it
+ONE_SHOT_STEPS = {
+    "DB_INIT_ON_STARTUP": "python -m app.db.init_db",
+    "ASSETS_BUILD_ON_STARTUP": "python build_assets.py",
+}
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on: the affinity mask, capped by a cgroup v2 quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS, Windows
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def resolve(choice: str, fast: str, fallback: str) -> str:
+    """"auto" means `fast` when its module is importable, else `fallback`."""
+    if choice != "auto":
+        return choice
+    return fast if importlib.util.find_spec(fast) else fallback
+
+
+def server_options(
+    settings: Settings,
+    workers: Optional[int] = None,
+    loop: Optional[str] = None,
+    http: Optional[str] = None,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+) -> dict:
+    """Keyword arguments for uvicorn.run from Settings, with per-run overrides."""
+    return {
+        "host": host or settings.SERVER_HOST,
+        "port": port or settings.SERVER_PORT,
+        "workers": workers or settings.SERVER_WORKERS or available_cpus(),
+        "loop": resolve(loop or settings.SERVER_LOOP, "uvloop", "asyncio"),
+        "http": resolve(http or settings.SERVER_HTTP, "httptools", "h11"),
+        "timeout_keep_alive": settings.SERVER_KEEPALIVE_SECONDS,
+        "backlog": settings.SERVER_BACKLOG,
+        "limit_max_requests": settings.SERVER_MAX_REQUESTS or None,
+        "limit_max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_TIMEOUT,
+        # RequestMiddleware already logs every request
+        "access_log": False,
+    }
+
+
+def disable_one_shot_steps(settings: Settings, environ=os.environ):
+    """Switch the one-shot startup steps off for the workers, which read settings from the environment."""
+    for name, command in ONE_SHOT_STEPS.items():
+        if getattr(settings, name):
+            logger.warning("%s is ignored by the production runner; run `%s` once per deploy", name, command)
+        environ[name] = "false"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--loop", choices=["auto", "uvloop", "asyncio"])
+    parser.add_argument("--http", choices=["auto", "httptools", "h11"])
+    args = parser.parse_args()
+
+    settings = get_settings()
+    options = server_options(settings, args.workers, args.loop, args.http, args.host, args.port)
+    workers = options["workers"]
+
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(levelname)s %(name)s: %(message)s")
+    logger.info(
+        "Starting %d worker(s) on %s:%d with loop=%s http=%s",
+        workers, options["host"], options["port"], options["loop"], options["http"],
+    )
+    logger.info(
+        "Up to %d database connections (%d workers x %d pool + %d overflow)",
+        workers * (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW), workers, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW,
+    )
+    if workers > 1 and settings.METRICS_ENABLED and not settings.METRICS_DIR:
+        logger.warning("METRICS_DIR is not set: /metrics only reports the worker that answers the scrape")
+    disable_one_shot_steps(settings)
+
+    uvicorn.run("app.main:app", **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,27 @@ from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import get_settings
+from app.core.rate_limit import LoadShedder
 
 settings = get_settings()
 
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
+# argon2 takes tens of milliseconds of CPU: run it off the event loop, a few at a time
+password_hashing = LoadShedder("password_hash", settings.PASSWORD_HASH_CONCURRENCY, settings.PASSWORD_HASH_QUEUE)
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password, hashed_password):
+    return await password_hashing.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await password_hashing.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
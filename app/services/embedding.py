@@ -1,34 +1,99 @@
 from abc import ABC, abstractmethod
-from typing import List
-import openai
+import hashlib
+import numpy as np
+from app.core import tracing
 from app.core.config import get_settings
+from app.core.logging import logger
+from app.core.metrics import EMBEDDING_CACHE
+from app.core.redis import get_redis_client
+from app.models.embedding import Embedding, FLOAT32
 
 settings = get_settings()
 
 class EmbeddingService(ABC):
+    model: str = "unknown"
+
     @abstractmethod
-    async def embed_text(self, text: str) -> List[float]:
+    async def embed_text(self, text: str) -> Embedding:
         pass
 
 class OpenAIEmbeddingService(EmbeddingService):
     def __init__(self):
+        # The SDK is slow to import (its type modules alone take most of a
+        # second); only load it when a real client is built
+        import openai
+
         openai.api_key = settings.OPENAI_API_KEY
+        self.openai = openai
+        self.model = settings.EMBEDDING_MODEL
 
-    async def embed_text(self, text: str) -> List[float]:
+    async def embed_text(self, text: str) -> Embedding:
         # In a real app, handle async properly or use async client
-        response = openai.embeddings.create(
-            input=text,
-            model="text-embedding-ada-002"
-        )
-        return response.data[0].embedding
+        # base64 skips building a list of Python floats on both sides
+        with tracing.span("embedding.create", tracing.CLIENT, model=self.model):
+            response = self.openai.embeddings.create(
+                input=text,
+                model=self.model,
+                encoding_format="base64"
+            )
+        return Embedding.coerce(response.data[0].embedding)
 
 class MockEmbeddingService(EmbeddingService):
-    async def embed_text(self, text: str) -> List[float]:
+    model = "mock"
+
+    async def embed_text(self, text: str) -> Embedding:
         # Return a random vector of size 1536 (Ada-002 size)
-        import random
-        return [random.random() for _ in range(1536)]
+        rng = np.random.default_rng()
+        return Embedding.from_numpy(rng.random(settings.EMBEDDING_DIM, dtype=FLOAT32))
+
+class CachedEmbeddingService(EmbeddingService):
+    """Caches raw float32 buffers in Redis, keyed by model and text hash."""
+
+    def __init__(self, inner: EmbeddingService, redis=None, ttl: int = settings.EMBEDDING_CACHE_TTL):
+        self.inner = inner
+        self.model = inner.model
+        self._redis = redis
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def redis(self):
+        return self._redis or get_redis_client()
+
+    def cache_key(self, text: str) -> str:
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        return f"emb:{self.model}:{digest}"
+
+    async def embed_text(self, text: str) -> Embedding:
+        with tracing.span("embedding.embed_text", model=self.model) as span:
+            key = self.cache_key(text)
+            try:
+                cached = await self.redis.get_bytes(key)
+            except Exception as e:
+                logger.warning("Embedding cache read failed: %s", e)
+                cached = None
+
+            span.set_attribute("cache.hit", bool(cached))
+            if cached:
+                self.hits += 1
+                EMBEDDING_CACHE.inc("hit")
+                return Embedding.from_bytes(cached)
+
+            self.misses += 1
+            EMBEDDING_CACHE.inc("miss")
+            embedding = await self.inner.embed_text(text)
+            try:
+                await self.redis.set(key, embedding.to_bytes(), ex=self.ttl)
+            except Exception as e:
+                logger.warning("Embedding cache write failed: %s", e)
+            return embedding
 
 def get_embedding_service() -> EmbeddingService:
     if settings.OPENAI_API_KEY == "sk-placeholder":
-        return MockEmbeddingService()
-    return OpenAIEmbeddingService()
+        service = MockEmbeddingService()
+    else:
+        service = OpenAIEmbeddingService()
+    if settings.EMBEDDING_CACHE_TTL > 0:
+        return CachedEmbeddingService(service)
+    return service
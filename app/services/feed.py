@@ -6,7 +6,14 @@ from app.models.domain import ContentItem
 class FeedService:
     def __init__(self):
         self.vespa = vespa_service
-        self.embedding_service = get_embedding_service()
+        self._embedding_service = None
+
+    @property
+    def embedding_service(self):
+        # Built on first use so importing the routers doesn't load the OpenAI SDK
+        if self._embedding_service is None:
+            self._embedding_service = get_embedding_service()
+        return self._embedding_service
 
     async def get_feed_for_user(self, user_id: str, user_interests: str) -> List[ContentItem]:
         # 1. Generate embedding for user interests
@@ -30,16 +37,16 @@ class FeedService:
         return items
 
     async def ingest_content(self, content: ContentItem):
-        # 1. Generate embedding
-        text_to_embed = f"{content.title} {content.body}"
-        embedding = await self.embedding_service.embed_text(text_to_embed)
-        content.embedding = embedding
+        # 1. Generate embedding, unless the caller already sent one
+        if content.embedding is None:
+            text_to_embed = f"{content.title} {content.body}"
+            content.embedding = await self.embedding_service.embed_text(text_to_embed)
 
         # 2. Feed to Vespa
         await self.vespa.feed_content(content.content_id, {
             "title": content.title,
             "body": content.body,
-            "embedding": embedding
+            "embedding": self.vespa.encode_embedding(content.embedding)
         })
         return content
 
@@ -0,0 +1,152 @@
+"""
+Resized WebP/JPEG variants of post images and avatars.
+
+Uploads are stored as-is; after the response is sent a background task hands
+a local copy to a process pool (decoding and resampling hold the GIL), puts
+the variants into storage next to the original and records their URLs on
+the row. Until that lands, and if it fails, the API keeps serving the
+original.
+"""
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from sqlalchemy import update
+
+from app.core.config import get_settings
+from app.core.logging import logger
+from app.services.storage import get_storage
+
+settings = get_settings()
+
+# Variant name -> bounding box edge in pixels. Avatars are cropped square.
+# Files are named <stem>_<kind>_<name>: the same upload can be both a post
+# image and an avatar, and its variants are served as immutable.
+VARIANT_SIZES = {
+    "post_image": {"thumb": 320, "medium": 800, "large": 1600},
+    "avatar": {"small": 64, "medium": 160},
+}
+FORMATS = ("webp", "jpeg")
+
+# {"thumb": {"webp": url, "jpeg": url, "width": 320, "height": 180}, ...}
+Variants = Dict[str, Dict[str, object]]
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def render_variants(source_path: str, out_dir: str, stem: str, kind: str, webp_quality: int, jpeg_quality: int) -> Variants:
+    """Write every variant into out_dir and return their file names. Runs in a worker process."""
+    from PIL import Image, ImageOps
+
+    variants = {}
+    with Image.open(source_path) as original:
+        original = ImageOps.exif_transpose(original)
+        # Composite transparency onto white: JPEG has no alpha, and it keeps both formats identical
+        if original.mode in ("RGBA", "LA", "P"):
+            rgba = original.convert("RGBA")
+            original = Image.new("RGB", rgba.size, (255, 255, 255))
+            original.paste(rgba, mask=rgba.getchannel("A"))
+        elif original.mode != "RGB":
+            original = original.convert("RGB")
+
+        for name, edge in VARIANT_SIZES[kind].items():
+            if kind == "avatar":
+                image = ImageOps.fit(original, (edge, edge), Image.Resampling.LANCZOS)
+            else:
+                image = original.copy()
+                # Never upscale: small originals get a re-encoded copy at their own size
+                image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+
+            variant = {"width": image.width, "height": image.height}
+            for fmt in FORMATS:
+                out_name = f"{stem}_{kind}_{name}.{'jpg' if fmt == 'jpeg' else fmt}"
+                out_path = os.path.join(out_dir, out_name)
+                if fmt == "webp":
+                    image.save(out_path, "WEBP", quality=webp_quality, method=4)
+                else:
+                    image.save(out_path, "JPEG", quality=jpeg_quality, optimize=True, progressive=True)
+                variant[fmt] = out_name
+            variants[name] = variant
+    return variants
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs an event loop and DB pools is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def generate_variants(source_key: str, kind: str) -> Variants:
+    storage = get_storage()
+    loop = asyncio.get_running_loop()
+    prefix, filename = source_key.rsplit("/", 1)
+    stem = os.path.splitext(filename)[0]
+    with tempfile.TemporaryDirectory(dir=storage.workdir()) as workdir:
+        source_path = await storage.fetch(source_key, workdir)
+        variants = await loop.run_in_executor(
+            get_pool(), render_variants, source_path, workdir, stem, kind,
+            settings.IMAGE_WEBP_QUALITY, settings.IMAGE_JPEG_QUALITY,
+        )
+        puts = []
+        for variant in variants.values():
+            for fmt in FORMATS:
+                key = f"{prefix}/{variant[fmt]}"
+                puts.append(storage.put_file(os.path.join(workdir, variant[fmt]), key, f"image/{fmt}"))
+                variant[fmt] = storage.url(key)
+        await asyncio.gather(*puts)
+    return variants
+
+
+async def _store_variants(model, image_column, variants_column, row_id: int, source_key: str, source_url: str, kind: str):
+    from app.db.session import async_session_factory
+
+    try:
+        variants = await generate_variants(source_key, kind)
+    except Exception as e:
+        logger.warning("Image variants failed for %s: %s", source_key, e)
+        return
+
+    async with async_session_factory() as session:
+        # Skip if the image was replaced while we were resizing
+        await session.execute(
+            update(model)
+            .where(model.id == row_id, image_column == source_url)
+            .values({variants_column: variants})
+        )
+        await session.commit()
+
+
+async def process_post_image(post_id: int, source_key: str, source_url: str):
+    """Background task run after a post image upload."""
+    from app.models.blog import Post
+
+    await _store_variants(Post, Post.image_url, Post.image_variants, post_id, source_key, source_url, "post_image")
+
+
+async def process_avatar(user_id: int, source_key: str, source_url: str):
+    """Background task run after an avatar upload."""
+    from app.models.user import User
+
+    await _store_variants(User, User.profile_image_url, User.profile_image_variants, user_id, source_key, source_url, "avatar")
+
+
+def pick_image(url: Optional[str], variants: Optional[Variants], size: Optional[str], fmt: str = "webp") -> Optional[str]:
+    """URL of the requested variant, falling back to the original until variants exist."""
+    if not size or not variants or size not in variants:
+        return url
+    return variants[size].get(fmt) or url
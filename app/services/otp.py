@@ -1,6 +1,6 @@
 import random
 import string
-from app.core.redis import redis_client
+from app.core.redis import get_redis_client
 from app.core.config import get_settings
 from app.core.logging import logger
 
@@ -13,7 +13,7 @@ def generate_otp(length=6) -> str:
 
 async def create_otp(email: str) -> str:
     otp = generate_otp()
-    await redis_client.setex(f"otp:{email}", OTP_EXPIRY, otp)
+    await get_redis_client().setex(f"otp:{email}", OTP_EXPIRY, otp)
     
     if settings.ENV == "dev":
         logger.info(f"OTP for {email}: {otp}")
@@ -21,6 +21,7 @@ async def create_otp(email: str) -> str:
     return otp
 
 async def verify_otp(email: str, otp: str) -> bool:
+    redis_client = get_redis_client()
     stored_otp = await redis_client.get(f"otp:{email}")
     if stored_otp and stored_otp == otp:
         await redis_client.delete(f"otp:{email}")
@@ -0,0 +1,193 @@
+"""
+Post write paths shared by the API and web routers.
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional, Type, Union
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import dialect
+from app.models.blog import Category, Notification, Post, PostCategory, PostLike, PostTag, Tag
+
+@lru_cache(maxsize=4096)
+def slugify(title: str) -> str:
+    """
+    Slug for category/tag titles: lower case, each space becomes '-'.
+
+    Existing rows were created with this exact rule, so it must not change
+    without a migration rewriting their slugs.
+    """
+    return title.lower().replace(" ", "-")
+
+
+def parse_tags(tags: Optional[str]) -> List[str]:
+    """Split the comma-separated tag field, dropping blanks."""
+    if not tags:
+        return []
+    return [t.strip() for t in tags.split(",") if t.strip()]
+
+
+async def upsert_by_slug(session: AsyncSession, model: Union[Type[Category], Type[Tag]], titles: Iterable[str]) -> List[int]:
+    """
+    Insert missing categories/tags and return the ids of all of them.
+
+    DO NOTHING leaves existing rows unlocked and unwritten (a no-op DO UPDATE
+    would rewrite and lock every one), but RETURNING then only has the new
+    rows; the rest are read back by slug in a second statement, skipped when
+    everything was new.
+    """
+    by_slug = {}
+    for title in titles:
+        by_slug.setdefault(slugify(title), title.strip())
+    if not by_slug:
+        return []
+
+    # Sorted so concurrent inserts wait on each other in the same order
+    stmt = dialect.insert(session, model).values([
+        {"title": title, "slug": slug} for slug, title in sorted(by_slug.items())
+    ])
+    stmt = stmt.on_conflict_do_nothing(index_elements=[model.slug]).returning(model.slug, model.id)
+    ids = dict((await session.execute(stmt)).all())
+
+    existing = [slug for slug in by_slug if slug not in ids]
+    if existing:
+        result = await session.execute(select(model.slug, model.id).where(model.slug.in_(existing)))
+        ids.update(result.all())
+    return [ids[slug] for slug in sorted(by_slug)]
+
+
+async def create_post(
+    session: AsyncSession,
+    author_id: int,
+    title: str,
+    summary: Optional[str],
+    category: str,
+    tags: Iterable[str] = (),
+    image_url: Optional[str] = None,
+    published: bool = True,
+) -> Post:
+    """
+    Insert a post with its category and tags in the caller's transaction.
+
+    Nothing is committed, so callers can attach more work (an uploaded image)
+    and importers can batch many posts per transaction.
+    """
+    now = datetime.utcnow()
+    post = Post(
+        author_id=author_id,
+        title=title,
+        summary=summary,
+        image_url=image_url,
+        published=published,
+        created_at=now,
+        updated_at=now,
+        published_at=now if published else None,
+    )
+    session.add(post)
+    await session.flush()
+
+    category_ids = await upsert_by_slug(session, Category, [category])
+    tag_ids = await upsert_by_slug(session, Tag, tags)
+
+    await session.execute(insert(PostCategory), [
+        {"post_id": post.id, "category_id": category_id} for category_id in category_ids
+    ])
+    if tag_ids:
+        await session.execute(insert(PostTag), [
+            {"post_id": post.id, "tag_id": tag_id} for tag_id in tag_ids
+        ])
+    return post
+
+
+# One statement toggles the like, notifies the author on a new like and returns
+# the new state and count. Every CTE sees the same pre-statement snapshot, so
+# the count is corrected by the rows removed/added here. When a concurrent
+# click wins the insert, ON CONFLICT leaves its like in place and we report
+# liked = true.
+TOGGLE_LIKE_SQL = text("""
+WITH target AS (
+    SELECT id, author_id FROM post WHERE id = :post_id
+), removed AS (
+    DELETE FROM postlike
+    WHERE post_id = :post_id AND user_id = :user_id
+    RETURNING id
+), added AS (
+    INSERT INTO postlike (post_id, user_id, created_at)
+    SELECT id, :user_id, :now FROM target
+    WHERE NOT EXISTS (SELECT 1 FROM removed)
+    ON CONFLICT (post_id, user_id) DO NOTHING
+    RETURNING id
+), notified AS (
+    INSERT INTO notification (user_id, actor_id, type, content, post_id, read, created_at)
+    SELECT author_id, :user_id, 'like', :content, id, false, :now FROM target
+    WHERE author_id <> :user_id AND EXISTS (SELECT 1 FROM added)
+    RETURNING id
+)
+SELECT
+    EXISTS (SELECT 1 FROM target) AS post_exists,
+    NOT EXISTS (SELECT 1 FROM removed) AS liked,
+    (SELECT count(*) FROM postlike WHERE post_id = :post_id)
+        - (SELECT count(*) FROM removed)
+        + (SELECT count(*) FROM added) AS like_count
+""")
+
+
+class LikeState(NamedTuple):
+    liked: bool
+    like_count: int
+
+
+class _ToggleResult(NamedTuple):
+    post_exists: bool
+    liked: bool
+    like_count: int
+
+
+async def _toggle_like_sqlite(session: AsyncSession, params: dict) -> _ToggleResult:
+    # SQLite has no data-modifying CTEs. It runs one writer at a time, so the
+    # same steps as separate statements in this transaction are just as safe.
+    post_id, user_id = params["post_id"], params["user_id"]
+    target = (await session.execute(select(Post.author_id).where(Post.id == post_id))).first()
+    if target is None:
+        return _ToggleResult(False, False, 0)
+    removed = (await session.execute(
+        delete(PostLike.__table__)
+        .where(PostLike.post_id == post_id, PostLike.user_id == user_id)
+        .returning(PostLike.id)
+    )).first()
+    if removed is None:
+        added = (await session.execute(
+            dialect.insert(session, PostLike.__table__)
+            .values(post_id=post_id, user_id=user_id, created_at=params["now"])
+            .on_conflict_do_nothing()
+            .returning(PostLike.id)
+        )).first()
+        if added is not None and target.author_id != user_id:
+            await session.execute(insert(Notification.__table__).values(
+                user_id=target.author_id, actor_id=user_id, type="like", content=params["content"],
+                post_id=post_id, read=False, created_at=params["now"],
+            ))
+    like_count = (await session.execute(
+        select(func.count()).select_from(PostLike).where(PostLike.post_id == post_id)
+    )).scalar_one()
+    return _ToggleResult(True, removed is None, like_count)
+
+
+async def toggle_like(session: AsyncSession, post_id: int, user_id: int, user_name: Optional[str]) -> Optional[LikeState]:
+    """Like or unlike a post (in one round trip on Postgres). Returns None if the post doesn't exist."""
+    params = {
+        "post_id": post_id,
+        "user_id": user_id,
+        "content": f"{user_name} liked your post",
+        "now": datetime.utcnow(),
+    }
+    if dialect.is_sqlite(session):
+        row = await _toggle_like_sqlite(session, params)
+    else:
+        row = (await session.execute(TOGGLE_LIKE_SQL, params)).one()
+    await session.commit()
+    if not row.post_exists:
+        return None
+    return LikeState(liked=row.liked, like_count=row.like_count)
@@ -0,0 +1,259 @@
+"""
+Realtime notification delivery across workers and nodes.
+
+Every worker process gets a worker id and subscribes to one Redis channel,
+`notifications:worker:<worker id>`: one pub/sub connection per worker, not
+one per socket. Which workers hold sockets for a user is kept in a sorted
+set per user:
+
+    presence:user:<user_id>    member = worker id, score = expiry (ms)
+
+A worker adds itself when it accepts a user's first socket, removes itself
+when the last one closes, and re-adds all of its users every
+REALTIME_HEARTBEAT_SECONDS. Entries expire REALTIME_PRESENCE_TTL_SECONDS
+after the last heartbeat, so a worker that dies without cleaning up stops
+being sent messages within one TTL. Expiry times come from the Redis clock
+(TIME), so hosts with skewed clocks agree on what has expired.
+
+Publishing runs one Lua script: it reads the live workers for the user and
+publishes only to their channels. Offline users cost no pub/sub traffic,
+and each worker only receives messages for users it holds. The scripts
+touch several presence keys at once, so this assumes a single Redis rather
+than a cluster.
+
+Inside a worker, ConnectionManager keeps every socket of every user, with a
+bounded send queue per socket. A slow reader loses its oldest undelivered
+messages instead of delaying other sockets.
+"""
+import asyncio
+import os
+import secrets
+import socket
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import WebSocket
+from redis.commands.core import AsyncScript
+
+from app.core.config import get_settings
+from app.core.logging import logger
+from app.core.metrics import WEBSOCKET_CONNECTIONS, WEBSOCKET_DROPPED, WEBSOCKET_OPENED
+from app.core.redis import get_redis_client
+
+settings = get_settings()
+
+ENDPOINT = "notifications"
+CHANNEL_PREFIX = "notifications:worker:"
+SUBSCRIBE_TIMEOUT = 5.0  # seconds a new socket waits for the worker's channel
+REFRESH_BATCH = 500  # presence keys per heartbeat script call
+
+_NOW_MS = "local t = redis.call('TIME') local now = t[1] * 1000 + math.floor(t[2] / 1000)\n"
+
+# KEYS: presence sets; ARGV: worker id, ttl (ms)
+REFRESH = AsyncScript(None, (_NOW_MS + """
+local ttl = tonumber(ARGV[2])
+for _, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now)
+    redis.call('ZADD', key, now + ttl, ARGV[1])
+    redis.call('PEXPIRE', key, ttl)
+end
+return #KEYS
+""").encode())
+
+# KEYS[1]: presence set; ARGV: channel prefix, message. Returns the subscribers reached.
+PUBLISH = AsyncScript(None, (_NOW_MS + """
+local receivers = 0
+for _, worker in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], now, '+inf')) do
+    receivers = receivers + redis.call('PUBLISH', ARGV[1] .. worker, ARGV[2])
+end
+return receivers
+""").encode())
+
+# KEYS[1]: presence set
+LIVE = AsyncScript(None, (_NOW_MS + """
+return redis.call('ZRANGEBYSCORE', KEYS[1], now, '+inf')
+""").encode())
+
+
+def new_worker_id() -> str:
+    # Random suffix: a restarted worker may reuse the pid while its old entries are still live
+    return f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(3)}"
+
+
+def presence_key(user_id: int) -> str:
+    return f"presence:user:{user_id}"
+
+
+class PresenceRegistry:
+    """Which workers hold notification sockets for which users, in Redis."""
+
+    def __init__(self, redis=None, ttl_seconds: Optional[float] = None):
+        self._redis = redis
+        self.ttl_ms = int((ttl_seconds or settings.REALTIME_PRESENCE_TTL_SECONDS) * 1000)
+
+    @property
+    def redis(self):
+        return self._redis or get_redis_client()
+
+    @staticmethod
+    def channel(worker_id: str) -> str:
+        return CHANNEL_PREFIX + worker_id
+
+    async def refresh(self, worker_id: str, user_ids: Iterable[int]):
+        """Mark `worker_id` as holding sockets for `user_ids` for another TTL."""
+        keys = [presence_key(user_id) for user_id in user_ids]
+        for i in range(0, len(keys), REFRESH_BATCH):
+            await REFRESH(keys[i:i + REFRESH_BATCH], [worker_id, self.ttl_ms], client=self.redis)
+
+    async def forget(self, worker_id: str, user_ids: Iterable[int]):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.zrem(presence_key(user_id), worker_id)
+            await pipe.execute()
+
+    async def workers(self, user_id: int) -> List[str]:
+        return await LIVE([presence_key(user_id)], client=self.redis)
+
+    async def publish(self, user_id: int, message: str) -> int:
+        """Send `message` to the workers holding the user's sockets; returns how many received it."""
+        return await PUBLISH([presence_key(user_id)], [CHANNEL_PREFIX, f"{user_id}\n{message}"], client=self.redis)
+
+
+class Connection:
+    def __init__(self, websocket: WebSocket, user_id: int, queue_size: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def deliver(self, message: str):
+        if self.queue.full():
+            # Drop the oldest: the client can catch up from /notifications
+            self.queue.get_nowait()
+            WEBSOCKET_DROPPED.inc(ENDPOINT)
+        self.queue.put_nowait(message)
+
+
+class ConnectionManager:
+    """This worker's notification sockets, fed from its Redis channel."""
+
+    def __init__(self, registry: PresenceRegistry):
+        self.registry = registry
+        self.worker_id = ""
+        self.active_connections: Dict[int, Set[Connection]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._subscribed = asyncio.Event()
+
+    async def start(self):
+        """Subscribe to this worker's channel (once) and start heartbeating."""
+        if not self._tasks:
+            self.worker_id = new_worker_id()
+            self._tasks = [asyncio.create_task(self._listen()), asyncio.create_task(self._heartbeat())]
+        await asyncio.wait_for(self._subscribed.wait(), SUBSCRIBE_TIMEOUT)
+
+    async def stop(self):
+        """Stop listening and drop this worker from every user's presence."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._subscribed.clear()
+        if tasks and self.active_connections:
+            try:
+                await self.registry.forget(self.worker_id, list(self.active_connections))
+            except Exception as e:
+                logger.warning("Could not clear websocket presence for %s: %s", self.worker_id, e)
+
+    async def connect(self, websocket: WebSocket, user_id: int) -> Connection:
+        await websocket.accept()
+        await self.start()
+        connection = Connection(websocket, user_id, settings.REALTIME_SEND_QUEUE_SIZE)
+        sockets = self.active_connections.setdefault(user_id, set())
+        sockets.add(connection)
+        WEBSOCKET_CONNECTIONS.inc(ENDPOINT)
+        WEBSOCKET_OPENED.inc(ENDPOINT)
+        if len(sockets) == 1:
+            try:
+                await self.registry.refresh(self.worker_id, [user_id])
+            except Exception:
+                await self.disconnect(connection)
+                raise
+        return connection
+
+    async def disconnect(self, connection: Connection):
+        sockets = self.active_connections.get(connection.user_id)
+        if not sockets or connection not in sockets:
+            return
+        sockets.discard(connection)
+        WEBSOCKET_CONNECTIONS.dec(ENDPOINT)
+        if sockets:
+            return
+        del self.active_connections[connection.user_id]
+        try:
+            await self.registry.forget(self.worker_id, [connection.user_id])
+            if connection.user_id in self.active_connections:
+                # Reconnected while the removal was in flight
+                await self.registry.refresh(self.worker_id, [connection.user_id])
+        except Exception as e:
+            # The entry expires after one TTL; messages meanwhile are dropped on arrival
+            logger.warning("Could not clear websocket presence for user %s: %s", connection.user_id, e)
+
+    def dispatch(self, raw: str):
+        """Hand a message from the worker channel to each of the user's sockets."""
+        user_id, _, message = raw.partition("\n")
+        for connection in self.active_connections.get(int(user_id), ()):
+            connection.deliver(message)
+
+    async def serve(self, connection: Connection):
+        """Send queued messages until the client goes away."""
+        async def send():
+            while True:
+                await connection.websocket.send_text(await connection.queue.get())
+
+        async def receive():
+            # Clients don't send anything; this only notices the disconnect
+            while (await connection.websocket.receive())["type"] != "websocket.disconnect":
+                pass
+
+        tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _listen(self):
+        channel = self.registry.channel(self.worker_id)
+        while True:
+            pubsub = self.registry.redis.pubsub()
+            try:
+                await pubsub.subscribe(channel)
+                self._subscribed.set()
+                # Presence may have expired while the channel was down
+                await self._refresh()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._subscribed.clear()
+                logger.warning("Lost notification channel %s, resubscribing: %s", channel, e)
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.REALTIME_HEARTBEAT_SECONDS)
+            try:
+                await self._refresh()
+            except Exception as e:
+                logger.warning("Websocket presence heartbeat failed: %s", e)
+
+    async def _refresh(self):
+        if self.active_connections:
+            await self.registry.refresh(self.worker_id, list(self.active_connections))
+
+
+presence = PresenceRegistry()
+manager = ConnectionManager(presence)
@@ -0,0 +1,50 @@
+"""
+Upload storage backends, selected with STORAGE_BACKEND:
+
+* "local": files under STORAGE_LOCAL_ROOT, served by the app's static mount
+  (single node, or nodes sharing that directory).
+* "s3": an S3-compatible bucket that browsers read from directly.
+"""
+import os
+from functools import lru_cache
+
+from app.core.config import get_settings
+from app.services.storage.base import StorageBackend
+from app.services.storage.local import LocalStorage
+from app.services.storage.s3 import S3Storage
+
+settings = get_settings()
+
+
+@lru_cache()
+def get_storage() -> StorageBackend:
+    staging_dir = os.path.join(settings.STORAGE_LOCAL_ROOT, ".staging")
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(
+            settings.STORAGE_LOCAL_ROOT,
+            settings.STORAGE_PUBLIC_URL or "/static/uploads",
+            staging_dir,
+        )
+    if settings.STORAGE_BACKEND == "s3":
+        client_options = {
+            "endpoint_url": settings.S3_ENDPOINT_URL,
+            "region_name": settings.S3_REGION,
+            "aws_access_key_id": settings.S3_ACCESS_KEY_ID,
+            "aws_secret_access_key": settings.S3_SECRET_ACCESS_KEY,
+        }
+        public_url = settings.STORAGE_PUBLIC_URL or (
+            f"{settings.S3_ENDPOINT_URL.rstrip('/')}/{settings.S3_BUCKET}" if settings.S3_ENDPOINT_URL
+            else f"https://{settings.S3_BUCKET}.s3.{settings.S3_REGION}.amazonaws.com"
+        )
+        return S3Storage(
+            settings.S3_BUCKET,
+            public_url,
+            staging_dir,
+            part_size=settings.S3_MULTIPART_CHUNK_SIZE,
+            concurrency=settings.S3_MULTIPART_CONCURRENCY,
+            client_options={k: v for k, v in client_options.items() if v},
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND {settings.STORAGE_BACKEND!r}")
+
+
+__all__ = ["StorageBackend", "LocalStorage", "S3Storage", "get_storage"]
@@ -0,0 +1,49 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class StorageBackend(ABC):
+    """
+    Where uploaded objects live. Keys are relative paths such as
+    "objects/ab/cd/<sha256>.png"; `public_url` is the prefix browsers fetch
+    them from.
+    """
+
+    def __init__(self, public_url: str, staging_dir: str):
+        self.public_url = public_url.rstrip("/")
+        # Uploads are spooled here first; always local disk
+        self.staging_dir = staging_dir
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{key}"
+
+    def key_from_url(self, url: Optional[str]) -> Optional[str]:
+        """Key of a URL this backend handed out, or None for anything else."""
+        if not url or not url.startswith(self.public_url + "/"):
+            return None
+        return url[len(self.public_url) + 1:]
+
+    @abstractmethod
+    async def put_file(self, local_path: str, key: str, content_type: str):
+        """Store a local staging file under `key` and remove the local copy.
+
+        Keys are content addressed, so an existing object is kept as-is.
+        A key must therefore name exactly one content: variant keys carry
+        the upload's hash, the image kind and the variant name.
+        """
+
+    @abstractmethod
+    async def fetch(self, key: str, workdir: str) -> str:
+        """Path of a local copy of the object; may live under `workdir`."""
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: str):
+        """Delete every object whose key starts with `prefix`."""
+
+    async def close(self):
+        pass
+
+    def workdir(self) -> str:
+        os.makedirs(self.staging_dir, exist_ok=True)
+        return self.staging_dir
@@ -0,0 +1,47 @@
+import asyncio
+import glob
+import os
+from urllib.parse import urlparse
+
+from app.services.storage.base import StorageBackend
+
+
+class LocalStorage(StorageBackend):
+    """Objects under a directory served by the app's own static mount."""
+
+    def __init__(self, root: str, public_url: str, staging_dir: str):
+        super().__init__(public_url, staging_dir)
+        self.root = root
+
+    @property
+    def mount_path(self) -> str:
+        """Where the app serves objects: the path of `public_url`, which may point at a CDN in front of the app."""
+        return urlparse(self.public_url).path.rstrip("/") + "/objects"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def _put(self, local_path: str, key: str):
+        path = self.path(key)
+        if os.path.exists(path):
+            os.unlink(local_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Staging shares the filesystem, so this is an atomic rename
+        os.replace(local_path, path)
+
+    def _delete_prefix(self, prefix: str):
+        for path in glob.glob(f"{glob.escape(self.path(prefix))}*"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    async def put_file(self, local_path: str, key: str, content_type: str):
+        await asyncio.to_thread(self._put, local_path, key)
+
+    async def fetch(self, key: str, workdir: str) -> str:
+        return self.path(key)
+
+    async def delete_prefix(self, prefix: str):
+        await asyncio.to_thread(self._delete_prefix, prefix)
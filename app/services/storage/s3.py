@@ -0,0 +1,147 @@
+"""
+S3-compatible object storage (AWS S3, MinIO, R2, ...).
+
+Browsers fetch objects straight from STORAGE_PUBLIC_URL (the bucket or a
+CDN in front of it), so app nodes share nothing on disk and never serve the
+bytes. Files above S3_MULTIPART_CHUNK_SIZE go up as a multipart upload with
+S3_MULTIPART_CONCURRENCY parts in flight.
+"""
+import asyncio
+import os
+import tempfile
+from contextlib import AsyncExitStack
+from typing import Optional
+
+from app.core.logging import logger
+from app.services.storage.base import StorageBackend
+from app.utils.static_files import IMMUTABLE
+
+
+class S3Storage(StorageBackend):
+    def __init__(
+        self,
+        bucket: str,
+        public_url: str,
+        staging_dir: str,
+        part_size: int = 8 * 1024 * 1024,
+        concurrency: int = 4,
+        client_options: Optional[dict] = None,
+        client=None,
+    ):
+        super().__init__(public_url, staging_dir)
+        self.bucket = bucket
+        # S3 rejects parts under 5 MB (except the last)
+        self.part_size = max(part_size, 5 * 1024 * 1024)
+        self.concurrency = concurrency
+        self.client_options = client_options or {}
+        self._client = client
+        self._exit_stack: Optional[AsyncExitStack] = None
+        self._lock = asyncio.Lock()
+
+    async def client(self):
+        if self._client is None:
+            async with self._lock:
+                if self._client is None:
+                    # Optional dependency: only needed with STORAGE_BACKEND=s3
+                    from aiobotocore.session import get_session
+
+                    self._exit_stack = AsyncExitStack()
+                    self._client = await self._exit_stack.enter_async_context(
+                        get_session().create_client("s3", **self.client_options)
+                    )
+        return self._client
+
+    async def close(self):
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+            self._exit_stack = None
+            self._client = None
+
+    async def exists(self, key: str) -> bool:
+        client = await self.client()
+        try:
+            await client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    async def put_file(self, local_path: str, key: str, content_type: str):
+        try:
+            if await self.exists(key):
+                return
+            size = os.path.getsize(local_path)
+            if size <= self.part_size:
+                body = await asyncio.to_thread(_read_range, local_path, 0, size)
+                client = await self.client()
+                await client.put_object(
+                    Bucket=self.bucket, Key=key, Body=body, ContentType=content_type, CacheControl=IMMUTABLE,
+                )
+            else:
+                await self._put_multipart(local_path, key, content_type, size)
+        finally:
+            await asyncio.to_thread(_unlink, local_path)
+
+    async def _put_multipart(self, local_path: str, key: str, content_type: str, size: int):
+        client = await self.client()
+        upload = await client.create_multipart_upload(
+            Bucket=self.bucket, Key=key, ContentType=content_type, CacheControl=IMMUTABLE,
+        )
+        upload_id = upload["UploadId"]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def put_part(number: int, offset: int) -> dict:
+            # Read inside the semaphore so at most `concurrency` parts are in memory
+            async with semaphore:
+                body = await asyncio.to_thread(_read_range, local_path, offset, self.part_size)
+                part = await client.upload_part(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body,
+                )
+            return {"PartNumber": number, "ETag": part["ETag"]}
+
+        try:
+            parts = await asyncio.gather(*(
+                put_part(number, offset)
+                for number, offset in enumerate(range(0, size, self.part_size), start=1)
+            ))
+            await client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": list(parts)},
+            )
+        except BaseException:
+            # Parts of an abandoned upload are billed until aborted
+            try:
+                await client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            except Exception as e:
+                logger.warning("Failed to abort multipart upload of %s: %s", key, e)
+            raise
+
+    async def fetch(self, key: str, workdir: str) -> str:
+        client = await self.client()
+        response = await client.get_object(Bucket=self.bucket, Key=key)
+        fd, path = tempfile.mkstemp(dir=workdir, suffix=os.path.splitext(key)[1])
+        with os.fdopen(fd, "wb") as out:
+            async with response["Body"] as stream:
+                while chunk := await stream.read(1024 * 1024):
+                    await asyncio.to_thread(out.write, chunk)
+        return path
+
+    async def delete_prefix(self, prefix: str):
+        client = await self.client()
+        listing = await client.list_objects_v2(Bucket=self.bucket, Prefix=prefix)
+        keys = [{"Key": item["Key"]} for item in listing.get("Contents", [])]
+        if keys:
+            await client.delete_objects(Bucket=self.bucket, Delete={"Objects": keys, "Quiet": True})
+
+
+def _read_range(path: str, offset: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
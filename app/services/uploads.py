@@ -0,0 +1,196 @@
+"""
+Streaming, content-addressed uploads for post images and avatars.
+
+The multipart parser has already spooled the file (to disk past 1 MB;
+UploadLimitMiddleware caps the whole body before that), so the copy runs in
+one worker thread: it reads fixed-size chunks, sniffs the
+type from the first one, hashes as it goes and stops as soon as the size
+limit is crossed. The staged file is then handed to the storage backend
+(app.services.storage) once per distinct content, keyed by its SHA-256 (see
+upload_helper.get_object_key), so a URL never changes meaning and identical
+uploads share one object.
+
+A StoredObject row counts the references to each object. Taking and
+releasing references happens in the caller's transaction, and the row lock
+taken by either statement orders them:
+
+* save_upload bumps the count first and only then stores the object, so a
+  concurrent release can't delete it out from under it.
+* release_upload only decrements the count; a row left at zero keeps the
+  object until purge_released runs after the caller's commit, so a rollback
+  never loses bytes. The purge deletes the row only if it is still at zero
+  and removes the object while holding that row lock, so a concurrent save
+  either revives the row first or blocks until it is gone and then stores
+  the object again.
+
+Rows stranded at zero by a crash between the commit and the purge are
+collected by sweep_released, which init_db runs on every deploy.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+from datetime import datetime
+from typing import BinaryIO, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db import dialect
+from app.models.upload import StoredObject
+from app.services.storage import get_storage
+from app.utils.upload_helper import get_object_key, sha256_from_key
+
+settings = get_settings()
+
+# (prefix, offset) pairs identifying each accepted type, with the extension we store it under
+IMAGE_SIGNATURES = {
+    "image/jpeg": ([(b"\xff\xd8\xff", 0)], ".jpg"),
+    "image/png": ([(b"\x89PNG\r\n\x1a\n", 0)], ".png"),
+    "image/gif": ([(b"GIF87a", 0), (b"GIF89a", 0)], ".gif"),
+    "image/webp": ([(b"RIFF", 0), (b"WEBP", 8)], ".webp"),
+}
+
+RELEASE_SQL = text("""
+UPDATE storedobject SET ref_count = ref_count - 1
+WHERE sha256 = :sha256
+RETURNING ref_count
+""")
+
+PURGE_SQL = text("""
+DELETE FROM storedobject
+WHERE sha256 = :sha256 AND ref_count <= 0
+RETURNING content_type
+""")
+
+# session.info key holding the hashes released in the current transaction
+RELEASED = "released_uploads"
+
+
+class StoredUpload(NamedTuple):
+    key: str
+    url: str
+    content_type: str
+    size: int
+    sha256: str
+
+
+def upload_limit(kind: str) -> int:
+    limits = {
+        "post_image": settings.UPLOAD_MAX_POST_IMAGE_BYTES,
+        "avatar": settings.UPLOAD_MAX_AVATAR_BYTES,
+    }
+    return limits[kind]
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Content type from the file's magic bytes; the client's header is not trusted."""
+    for content_type, (signatures, _) in IMAGE_SIGNATURES.items():
+        if all(head[offset:offset + len(magic)] == magic for magic, offset in signatures):
+            return content_type
+    return None
+
+
+def too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large (limit {limit // (1024 * 1024)} MB)",
+    )
+
+
+def _stream_to_staging(source: BinaryIO, staging_dir: str, limit: int, chunk_size: int) -> Tuple[str, str, int, str]:
+    """Copy the upload to a staging temp file. Returns (tmp_path, content_type, size, sha256)."""
+    source.seek(0)
+    chunk = source.read(chunk_size)
+    content_type = sniff_image_type(chunk)
+    if content_type is None:
+        raise HTTPException(
+            status_code=415,
+            detail="Unsupported file type; upload a JPEG, PNG, GIF or WebP image",
+        )
+
+    os.makedirs(staging_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=staging_dir, prefix="upload-")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk:
+                size += len(chunk)
+                if size > limit:
+                    raise too_large(limit)
+                digest.update(chunk)
+                out.write(chunk)
+                chunk = source.read(chunk_size)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path, content_type, size, digest.hexdigest()
+
+
+async def save_upload(session: AsyncSession, upload: UploadFile, kind: str) -> StoredUpload:
+    """
+    Validate and store an uploaded image without blocking the event loop,
+    taking a reference to it in the caller's transaction.
+    """
+    limit = upload_limit(kind)
+    # Reject from the parsed part size before touching the file
+    if upload.size is not None and upload.size > limit:
+        raise too_large(limit)
+    storage = get_storage()
+    tmp_path, content_type, size, sha256 = await asyncio.to_thread(
+        _stream_to_staging, upload.file, storage.staging_dir, limit, settings.UPLOAD_CHUNK_SIZE
+    )
+    key = get_object_key(sha256, IMAGE_SIGNATURES[content_type][1])
+    try:
+        stmt = dialect.insert(session, StoredObject).values(
+            sha256=sha256, content_type=content_type, size=size, ref_count=1, created_at=datetime.utcnow()
+        )
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[StoredObject.sha256],
+            set_={"ref_count": StoredObject.ref_count + 1},
+        ))
+        # Consumes the staging file
+        await storage.put_file(tmp_path, key, content_type)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return StoredUpload(key, storage.url(key), content_type, size, sha256)
+
+
+async def release_upload(session: AsyncSession, url: Optional[str]):
+    """
+    Drop one reference to an upload URL. The file itself is deleted by
+    purge_released once the caller has committed.
+    """
+    sha256 = sha256_from_key(get_storage().key_from_url(url))
+    if sha256 is None:
+        return
+    remaining = (await session.execute(RELEASE_SQL, {"sha256": sha256})).scalar_one_or_none()
+    if remaining is not None and remaining <= 0:
+        session.info.setdefault(RELEASED, set()).add(sha256)
+
+
+async def _purge(session: AsyncSession, sha256: str):
+    content_type = (await session.execute(PURGE_SQL, {"sha256": sha256})).scalar_one_or_none()
+    if content_type is not None:
+        key = get_object_key(sha256, IMAGE_SIGNATURES[content_type][1])
+        # The original and every variant generated from it share the hash prefix
+        await get_storage().delete_prefix(key.rsplit(".", 1)[0])
+    await session.commit()
+
+
+async def purge_released(session: AsyncSession):
+    """Delete the files whose last reference the committed transaction dropped."""
+    for sha256 in sorted(session.info.pop(RELEASED, ())):
+        await _purge(session, sha256)
+
+
+async def sweep_released(session: AsyncSession):
+    """Delete every file left unreferenced, e.g. by a crash before purge_released."""
+    result = await session.execute(select(StoredObject.sha256).where(StoredObject.ref_count <= 0))
+    for sha256 in result.scalars().all():
+        await _purge(session, sha256)
@@ -0,0 +1,94 @@
+"""
+Storage/ANN encoding for embeddings: optional PCA reduction followed by
+optional int8 quantization, plus the Vespa tensor encoding of the result.
+"""
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.models.embedding import Embedding, FLOAT32
+
+settings = get_settings()
+
+
+class PCAReducer:
+    """Linear projection onto the top principal components of a sample of embeddings."""
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray):
+        self.mean = np.ascontiguousarray(mean, dtype=FLOAT32)
+        self.components = np.ascontiguousarray(components, dtype=FLOAT32)
+
+    @classmethod
+    def fit(cls, samples: np.ndarray, n_components: int) -> "PCAReducer":
+        samples = np.asarray(samples, dtype=FLOAT32)
+        if n_components > min(samples.shape):
+            raise ValueError("n_components must not exceed min(n_samples, dim)")
+        mean = samples.mean(axis=0)
+        # Rows of vt are the principal axes, sorted by explained variance
+        _, _, vt = np.linalg.svd(samples - mean, full_matrices=False)
+        return cls(mean, vt[:n_components])
+
+    @classmethod
+    def load(cls, path: str) -> "PCAReducer":
+        with np.load(path) as data:
+            return cls(data["mean"], data["components"])
+
+    def save(self, path: str):
+        np.savez(path, mean=self.mean, components=self.components)
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def output_dim(self) -> int:
+        return self.components.shape[0]
+
+    def transform_many(self, vectors: np.ndarray) -> np.ndarray:
+        return (np.asarray(vectors, dtype=FLOAT32) - self.mean) @ self.components.T
+
+    def transform(self, embedding: Embedding) -> Embedding:
+        return Embedding.from_numpy(self.transform_many(embedding.to_numpy()))
+
+
+class VectorCodec:
+    """Turns full-size embeddings into the (possibly reduced, possibly int8) vectors we index."""
+
+    def __init__(self, reducer: Optional[PCAReducer] = None, quantization: str = "none", dim: int = 1536):
+        if quantization not in ("none", "int8"):
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        self.reducer = reducer
+        self.quantization = quantization
+        self.dim = reducer.output_dim if reducer else dim
+
+    @property
+    def cell_type(self) -> str:
+        return "int8" if self.quantization == "int8" else "float"
+
+    @property
+    def tensor_type(self) -> str:
+        return f"tensor<{self.cell_type}>(x[{self.dim}])"
+
+    def reduce(self, embedding: Embedding) -> Embedding:
+        return self.reducer.transform(embedding) if self.reducer else embedding
+
+    def to_hex(self, embedding: Embedding) -> str:
+        """Vespa's dense hex tensor form: big-endian cell values, no separators."""
+        reduced = self.reduce(embedding)
+        if self.quantization == "int8":
+            return reduced.quantize().codes.hex()
+        return reduced.to_numpy().astype(">f4").tobytes().hex()
+
+    def encode_document(self, embedding: Embedding) -> dict:
+        return {"values": self.to_hex(embedding)}
+
+    def encode_query(self, embedding: Embedding) -> str:
+        return self.to_hex(embedding)
+
+
+@lru_cache()
+def get_vector_codec() -> VectorCodec:
+    reducer = PCAReducer.load(settings.EMBEDDING_PCA_PATH) if settings.EMBEDDING_PCA_PATH else None
+    return VectorCodec(reducer, settings.EMBEDDING_QUANTIZATION, settings.EMBEDDING_DIM)
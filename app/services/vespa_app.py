@@ -1,8 +1,14 @@
-from vespa.application import Vespa
-from vespa.package import ApplicationPackage, Field, Schema, Document, HNSW, RankProfile
+from typing import TYPE_CHECKING
+from app.core import tracing
 from app.core.config import get_settings
+from app.core.metrics import VESPA_DURATION
+from app.models.embedding import Embedding
+from app.services.vector_codec import get_vector_codec
 import asyncio
 
+if TYPE_CHECKING:
+    from vespa.package import ApplicationPackage
+
 settings = get_settings()
 
 class VespaService:
@@ -11,37 +17,55 @@ class VespaService:
         # In a real scenario, we would initialize the Vespa client here.
         # For this demo, we assume the app is deployed or we use HTTP requests.
         # We can use the pyvespa Vespa class to interact if we have the endpoint.
-        self.client = Vespa(url=self.app_url)
+        self._client = None
+        self.codec = get_vector_codec()
+
+    @property
+    def client(self):
+        # pyvespa takes a noticeable share of worker startup to import; load it on first use
+        if self._client is None:
+            from vespa.application import Vespa
+            self._client = Vespa(url=self.app_url)
+        return self._client
+
+    def encode_embedding(self, embedding: Embedding) -> dict:
+        # Compact hex tensor (reduced / int8 when configured) instead of a JSON float list
+        return self.codec.encode_document(embedding)
 
     async def feed_content(self, content_id: str, fields: dict):
         # Async wrapper for synchronous pyvespa feed
         # response = self.client.feed_data_point(schema="content_item", data_id=content_id, fields=fields)
         # return response
         # For now, mocking the call as we might not have a running Vespa instance yet
-        print(f"Feeding content {content_id} to Vespa: {fields.keys()}")
-        return {"status": "success", "id": content_id}
+        with VESPA_DURATION.time("feed_content"), tracing.span("vespa.feed_content", tracing.CLIENT):
+            print(f"Feeding content {content_id} to Vespa: {fields.keys()}")
+            return {"status": "success", "id": content_id}
 
     async def feed_user_profile(self, user_id: str, fields: dict):
-        print(f"Feeding user {user_id} to Vespa: {fields.keys()}")
-        return {"status": "success", "id": user_id}
+        with VESPA_DURATION.time("feed_user_profile"), tracing.span("vespa.feed_user_profile", tracing.CLIENT):
+            print(f"Feeding user {user_id} to Vespa: {fields.keys()}")
+            return {"status": "success", "id": user_id}
 
-    async def query_content(self, user_embedding: list[float], top_k: int = 10):
+    async def query_content(self, user_embedding: Embedding, top_k: int = 10):
         # Construct YQL query for nearest neighbor search
         # yql = "select * from sources content_item where ({targetHits:10}nearestNeighbor(embedding,user_embedding))"
         # response = self.client.query(body={
         #     "yql": yql,
-        #     "ranking.features.query(user_embedding)": user_embedding,
+        #     "input.query(user_embedding)": self.codec.encode_query(user_embedding),
         #     "hits": top_k
         # })
         # return response.hits
-        print(f"Querying Vespa with embedding length {len(user_embedding)}")
-        return [
-            {"id": "doc1", "fields": {"title": "Gen-AI Trends", "body": "..."}},
-            {"id": "doc2", "fields": {"title": "FastAPI Guide", "body": "..."}}
-        ]
+        with VESPA_DURATION.time("query_content"), tracing.span("vespa.query_content", tracing.CLIENT):
+            print(f"Querying Vespa with embedding length {len(user_embedding)}")
+            return [
+                {"id": "doc1", "fields": {"title": "Gen-AI Trends", "body": "..."}},
+                {"id": "doc2", "fields": {"title": "FastAPI Guide", "body": "..."}}
+            ]
 
-    def create_package(self) -> ApplicationPackage:
+    def create_package(self) -> "ApplicationPackage":
         # Define the schema for deployment (utility function)
+        from vespa.package import ApplicationPackage, Field, Schema, Document, RankProfile
+
         return ApplicationPackage(
             name="insightblog",
             schema=[
@@ -52,13 +76,14 @@ class VespaService:
                             Field(name="id", type="string", indexing=["summary", "attribute"]),
                             Field(name="title", type="string", indexing=["summary", "index"]),
                             Field(name="body", type="string", indexing=["summary", "index"]),
-                            Field(name="embedding", type="tensor<float>(x[1536])", indexing=["attribute", "index", "summary"], attribute=["distance-metric: angular"])
+                            Field(name="embedding", type=self.codec.tensor_type, indexing=["attribute", "index", "summary"], attribute=["distance-metric: angular"])
                         ]
                     ),
                     rank_profiles=[
                         RankProfile(
                             name="default",
-                            first_phase="closeness(field, embedding)"
+                            first_phase="closeness(field, embedding)",
+                            inputs=[("query(user_embedding)", self.codec.tensor_type)]
                         )
                     ]
                 )
@@ -1,13 +1,24 @@
 import pytest
+import pytest_asyncio
+from contextlib import contextmanager
 from typing import AsyncGenerator, Generator
 from httpx import AsyncClient, ASGITransport
+import fakeredis
 import sys
 import os
 sys.path.append(os.getcwd())
 
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
 from app.main import app
-from app.db.session import get_session
+from app.db.session import create_engine_from_settings, get_session
+from app.db.replicas import get_read_session
+from app.core import rate_limit
+from app.core.rate_limit import parse_rules
 from app.core.config import get_settings
+from app.db.query_stats import QueryStats, query_stats, warn_repeated
+from app.services.auth import create_access_token, get_password_hash
 
 settings = get_settings()
 
@@ -15,6 +26,10 @@ settings = get_settings()
 
 from app.models.user import User, Role
 
+# In-memory SQLite by default; point at a scratch Postgres database to run
+# the same tests there (the schema is created in it and left behind)
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "sqlite+aiosqlite://")
+
 @pytest.fixture
 def anyio_backend():
     return "asyncio"
@@ -24,6 +39,21 @@ async def client() -> AsyncGenerator[AsyncClient, None]:
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
         yield c
 
+@pytest.fixture
+def fake_redis():
+    """An in-process Redis with Lua scripting, empty for every test."""
+    return fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True)
+
+@pytest.fixture(autouse=True)
+def rate_limiter(fake_redis, monkeypatch):
+    """
+    The app's rate limiter, on this test's fake Redis: buckets start full in
+    every test and never reach a Redis running on the machine.
+    """
+    limiter = rate_limit.TokenBucketLimiter(parse_rules(settings.RATE_LIMITS), redis=fake_redis)
+    monkeypatch.setattr(rate_limit, "limiter", limiter)
+    return limiter
+
 @pytest.fixture
 def mock_user():
     return User(
@@ -45,3 +75,71 @@ def mock_admin():
         role=Role.ADMIN,
         is_active=True
     )
+
+@pytest.fixture
+def query_budget():
+    """
+    Fails the test if a block runs more SQL statements than allowed:
+
+        with query_budget(4):
+            await client.get("/api/v1/posts/")
+
+    Statements repeated more than `repeat_limit` times are logged as N+1 candidates.
+    """
+    @contextmanager
+    def budget(max_queries: int, repeat_limit: int = 3):
+        stats = QueryStats(parent=query_stats.get())
+        token = query_stats.set(stats)
+        try:
+            yield stats
+        finally:
+            query_stats.reset(token)
+        warn_repeated(stats, "query_budget block", repeat_limit)
+        statements = "\n".join(f"  {count}x {shape}" for shape, count in stats.repeated(0))
+        assert stats.count <= max_queries, f"{stats.count} queries, budget {max_queries}:\n{statements}"
+    return budget
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def db_engine():
+    """Engine for TEST_DATABASE_URL with the schema created once per run."""
+    engine = create_engine_from_settings(TEST_DATABASE_URL, name="test")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def db_session(db_engine) -> AsyncGenerator[AsyncSession, None]:
+    """
+    A session inside a transaction that is rolled back after the test.
+
+    The app's get_session and get_read_session hand out this same session
+    while the fixture is active, so a test can set up rows, call endpoints
+    and inspect the results; commits in the endpoints only release savepoints.
+    """
+    async with db_engine.connect() as conn:
+        transaction = await conn.begin()
+        session = AsyncSession(bind=conn, expire_on_commit=False, join_transaction_mode="create_savepoint")
+
+        async def override():
+            yield session
+
+        app.dependency_overrides[get_session] = override
+        app.dependency_overrides[get_read_session] = override
+        try:
+            yield session
+        finally:
+            app.dependency_overrides.pop(get_session, None)
+            app.dependency_overrides.pop(get_read_session, None)
+            await session.close()
+            await transaction.rollback()
+
+@pytest.fixture
+def make_user(db_session):
+    """Inserts a user and returns (user, auth headers): `user, headers = await make_user("a@example.com")`."""
+    async def make(email: str = "author@example.com", role: Role = Role.USER, password: str = "password") -> tuple:
+        user = User(email=email, full_name=email.split("@")[0].title(), hashed_password=get_password_hash(password), role=role, is_active=True)
+        db_session.add(user)
+        await db_session.commit()
+        return user, {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+    return make
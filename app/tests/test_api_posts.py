@@ -0,0 +1,130 @@
+"""
+The posts API end to end against the test database (in-memory SQLite unless
+TEST_DATABASE_URL is set), each test inside a rolled-back transaction.
+"""
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+
+from app.models.blog import Category, Notification, Post, PostCategory, PostLike, PostTag, Tag
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+async def create_post(client: AsyncClient, headers: dict, title: str = "Hello", tags: str = "Python, async") -> int:
+    response = await client.post("/api/v1/posts/", headers=headers, data={
+        "title": title, "summary": "Body text", "category": "Engineering", "tags": tags,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+async def test_create_list_and_get_post(client: AsyncClient, make_user):
+    _, headers = await make_user()
+    post_id = await create_post(client, headers)
+
+    response = await client.get("/api/v1/posts/", headers=headers)
+    assert response.status_code == 200
+    listing = response.json()
+    assert listing["total"] == 1
+    assert listing["posts"][0]["categories"] == ["Engineering"]
+    assert sorted(listing["posts"][0]["tags"]) == ["Python", "async"]
+
+    response = await client.get(f"/api/v1/posts/{post_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["author_email"] == "author@example.com"
+
+    response = await client.get("/api/v1/posts/999999", headers=headers)
+    assert response.status_code == 404
+
+
+async def test_tags_are_upserted_by_slug(client: AsyncClient, make_user, db_session):
+    _, headers = await make_user()
+    await create_post(client, headers, "First", tags="Python, Web")
+    await create_post(client, headers, "Second", tags="python,  web , new")
+
+    slugs = (await db_session.execute(select(Tag.slug).order_by(Tag.slug))).scalars().all()
+    assert slugs == ["new", "python", "web"]
+
+
+async def count_rows(db_session, *models) -> list:
+    return [(await db_session.execute(select(func.count()).select_from(model))).scalar_one() for model in models]
+
+
+async def test_create_post_is_one_transaction(client: AsyncClient, make_user, db_session, query_budget):
+    _, headers = await make_user()
+    await create_post(client, headers, "First", tags="Python")
+
+    # User lookup, post, category and tag inserts (each followed by a read of
+    # the rows that already existed) and both links; the test session turns
+    # the endpoint's transaction into one savepoint
+    with query_budget(10) as stats:
+        await create_post(client, headers, "Second", tags="Python, new")
+    transactions = [shape for shape, _ in stats.repeated(0) if "SAVEPOINT" in shape]
+    assert [shape.split()[0] for shape in transactions] == ["SAVEPOINT", "RELEASE"]
+
+
+async def test_failed_create_post_leaves_no_rows(client: AsyncClient, make_user, db_session):
+    _, headers = await make_user()
+
+    # The image is rejected after the post, category and tags were inserted
+    response = await client.post("/api/v1/posts/", headers=headers, data={
+        "title": "Broken", "summary": "Body text", "category": "Engineering", "tags": "Python, async",
+    }, files={"image": ("photo.png", b"not an image", "image/png")})
+
+    assert response.status_code == 415
+    assert await count_rows(db_session, Post, Category, Tag, PostCategory, PostTag) == [0, 0, 0, 0, 0]
+
+
+async def test_toggle_like_notifies_author_once(client: AsyncClient, make_user, db_session):
+    _, author = await make_user("author@example.com")
+    _, reader = await make_user("reader@example.com")
+    post_id = await create_post(client, author)
+
+    response = await client.post(f"/api/v1/posts/{post_id}/like", headers=reader)
+    assert response.json() == {"liked": True, "like_count": 1}
+    response = await client.post(f"/api/v1/posts/{post_id}/like", headers=reader)
+    assert response.json() == {"liked": False, "like_count": 0}
+    response = await client.post(f"/api/v1/posts/{post_id}/like", headers=author)
+    assert response.json() == {"liked": True, "like_count": 1}
+
+    likes = (await db_session.execute(select(func.count()).select_from(PostLike))).scalar_one()
+    notifications = (await db_session.execute(select(Notification.type))).scalars().all()
+    assert likes == 1
+    # The reader's first like notified the author; liking your own post doesn't
+    assert notifications == ["like"]
+
+    response = await client.post("/api/v1/posts/999999/like", headers=reader)
+    assert response.status_code == 404
+
+
+async def test_comments_and_notifications(client: AsyncClient, make_user):
+    _, author = await make_user("author@example.com")
+    _, reader = await make_user("reader@example.com")
+    post_id = await create_post(client, author)
+
+    response = await client.post(f"/api/v1/posts/{post_id}/comments", headers=reader, json={"content": "Nice"})
+    comment_id = response.json()["comment_id"]
+    await client.post(f"/api/v1/posts/{post_id}/comments", headers=author, json={"content": "Thanks", "parent_id": comment_id})
+
+    post = (await client.get(f"/api/v1/posts/{post_id}", headers=reader)).json()
+    assert post["comment_count"] == 1
+    assert post["comments"][0]["author_username"] == "reader"
+    assert [r["content"] for r in post["comments"][0]["replies"]] == ["Thanks"]
+
+    notifications = (await client.get("/api/v1/posts/notifications/", headers=author)).json()["notifications"]
+    assert [n["type"] for n in notifications] == ["comment"]
+    response = await client.put(f"/api/v1/posts/notifications/{notifications[0]['id']}/read", headers=author)
+    assert response.status_code == 200
+    # Only the recipient can mark it read
+    response = await client.put(f"/api/v1/posts/notifications/{notifications[0]['id']}/read", headers=reader)
+    assert response.status_code == 404
+
+    response = await client.delete(f"/api/v1/posts/{post_id}/comments/{comment_id}", headers=author)
+    assert response.status_code == 403
+
+
+async def test_each_test_starts_empty(client: AsyncClient, make_user):
+    _, headers = await make_user()
+    response = await client.get("/api/v1/posts/", headers=headers)
+    assert response.json()["total"] == 0
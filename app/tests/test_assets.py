@@ -0,0 +1,80 @@
+import gzip
+
+import brotli
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.utils import assets
+from app.utils.static_files import IMMUTABLE, PrecompressedStaticFiles
+
+CSS = b"body { color: #333; }\n" * 200
+
+
+@pytest.fixture
+def static_root(tmp_path, monkeypatch):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "styles.css").write_bytes(CSS)
+    monkeypatch.setattr(assets, "MANIFEST_PATH", tmp_path / "dist" / "manifest.json")
+    yield tmp_path
+    assets.reload_manifest()
+
+
+def test_build_fingerprints_and_compresses(static_root):
+    manifest = assets.build_assets(static_root)
+
+    hashed = manifest["css/styles.css"]
+    assert hashed.startswith("css/styles.") and hashed.endswith(".css")
+    dist = static_root / "dist"
+    assert (dist / hashed).read_bytes() == CSS
+    assert gzip.decompress((dist / f"{hashed}.gz").read_bytes()) == CSS
+    assert brotli.decompress((dist / f"{hashed}.br").read_bytes()) == CSS
+    assert assets.asset_url("css/styles.css") == f"/static/dist/{hashed}"
+    assert assets.asset_url("js/missing.js") == "/static/js/missing.js"
+
+
+def test_rebuild_keeps_previous_build_only(static_root):
+    first = assets.build_assets(static_root)["css/styles.css"]
+    (static_root / "css" / "styles.css").write_bytes(CSS + b"a {}\n")
+    second = assets.build_assets(static_root)["css/styles.css"]
+    (static_root / "css" / "styles.css").write_bytes(CSS + b"b {}\n")
+    third = assets.build_assets(static_root)["css/styles.css"]
+
+    dist = static_root / "dist"
+    assert len({first, second, third}) == 3
+    assert not (dist / first).exists() and not (dist / f"{first}.gz").exists()
+    assert (dist / second).exists() and (dist / third).exists()
+
+
+def test_repeated_build_keeps_the_previous_build(static_root):
+    # Every worker of a deploy may run the same build; the second run must not
+    # treat the current build as the previous one and prune what old pages use
+    first = assets.build_assets(static_root)["css/styles.css"]
+    (static_root / "css" / "styles.css").write_bytes(CSS + b"a {}\n")
+    second = assets.build_assets(static_root)["css/styles.css"]
+    assets.build_assets(static_root)
+
+    dist = static_root / "dist"
+    assert (dist / first).exists() and (dist / second).exists()
+    assert not list(dist.rglob("*.tmp"))
+
+
+async def test_serves_precompressed_variant_by_accept_encoding(static_root):
+    hashed = assets.build_assets(static_root)["css/styles.css"]
+    app = FastAPI()
+    app.mount("/static/dist", PrecompressedStaticFiles(directory=static_root / "dist", cache_control=IMMUTABLE))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        br = await client.get(f"/static/dist/{hashed}", headers={"Accept-Encoding": "gzip, br"})
+        gz = await client.get(f"/static/dist/{hashed}", headers={"Accept-Encoding": "gzip, br;q=0"})
+        plain = await client.get(f"/static/dist/{hashed}", headers={"Accept-Encoding": "identity"})
+
+    assert br.headers["content-encoding"] == "br"
+    assert br.content == CSS  # httpx decodes it
+    assert br.headers["content-type"] == "text/css; charset=utf-8"
+    assert br.headers["cache-control"] == IMMUTABLE
+    assert br.headers["vary"] == "Accept-Encoding"
+    assert gz.headers["content-encoding"] == "gzip"
+    assert gz.content == CSS
+    assert "content-encoding" not in plain.headers
+    assert plain.content == CSS
@@ -1,13 +1,59 @@
 import pytest
 from httpx import AsyncClient
-from app.main import app
-from app.api.v1.endpoints.users import get_current_user
-from app.models.user import User
-
-@pytest.mark.asyncio
-async def test_login_endpoint(client: AsyncClient, mock_user: User):
-    # Mock the DB session or just test the endpoint logic if possible
-    # Since login requires DB access, we need to mock the session.exec result.
-    # This is getting complicated without a real test DB.
-    # Let's focus on `test_web.py` where we can mock `get_current_user` easily.
-    pass
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+async def test_register_then_login(client: AsyncClient, db_session):
+    response = await client.post("/api/v1/users/register", json={
+        "email": "new@example.com", "full_name": "New User", "password": "s3cret",
+    })
+    assert response.status_code == 200
+    assert response.json()["email"] == "new@example.com"
+
+    response = await client.post("/api/v1/users/register", json={
+        "email": "new@example.com", "full_name": "Again", "password": "other",
+    })
+    assert response.status_code == 400
+
+    response = await client.post("/api/v1/users/login", data={"username": "new@example.com", "password": "s3cret"})
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+
+    response = await client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["full_name"] == "New User"
+
+
+async def test_login_rejects_wrong_password(client: AsyncClient, make_user):
+    await make_user("reader@example.com", password="right")
+    response = await client.post("/api/v1/users/login", data={"username": "reader@example.com", "password": "wrong"})
+    assert response.status_code == 400
+
+
+async def test_refresh_issues_access_token(client: AsyncClient, make_user):
+    await make_user("reader@example.com", password="right")
+    login = await client.post("/api/v1/users/login", data={"username": "reader@example.com", "password": "right"})
+    response = await client.post("/api/v1/users/refresh", json={"refresh_token": login.json()["refresh_token"]})
+    assert response.status_code == 200
+    assert response.json()["access_token"]
+
+    # An access token is not a refresh token
+    response = await client.post("/api/v1/users/refresh", json={"refresh_token": login.json()["access_token"]})
+    assert response.status_code == 401
+
+
+async def test_change_password(client: AsyncClient, make_user):
+    _, headers = await make_user("reader@example.com", password="old")
+    response = await client.post("/api/v1/users/me/change-password", headers=headers, json={"old_password": "old", "new_password": "new"})
+    assert response.status_code == 200
+    response = await client.post("/api/v1/users/login", data={"username": "reader@example.com", "password": "new"})
+    assert response.status_code == 200
+
+
+async def test_unknown_token_subject_is_rejected(client: AsyncClient, db_session):
+    from app.services.auth import create_access_token
+
+    token = create_access_token({"sub": "nobody@example.com"})
+    response = await client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
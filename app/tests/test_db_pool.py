@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db import session as db_session
+from app.db.pool import InstrumentedAsyncQueuePool, PoolMetrics
+
+PG_URL = "postgresql+asyncpg://u:p@localhost/db"
+
+
+def test_engine_options_default_to_quiet_tuned_pool():
+    options = db_session.engine_options(PG_URL)
+
+    assert options["echo"] is False
+    assert options["poolclass"] is InstrumentedAsyncQueuePool
+    assert options["connect_args"]["server_settings"]["statement_timeout"] == str(
+        db_session.settings.DB_STATEMENT_TIMEOUT_MS
+    )
+
+
+def test_pgbouncer_mode_disables_statement_caching(monkeypatch):
+    monkeypatch.setattr(db_session.settings, "DB_PGBOUNCER", True)
+    connect_args = db_session.engine_options(PG_URL)["connect_args"]
+
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    assert "server_settings" not in connect_args
+    assert connect_args["prepared_statement_name_func"]() != connect_args["prepared_statement_name_func"]()
+
+
+async def test_pool_reports_saturation_and_timeouts(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    engine.sync_engine.pool.metrics = PoolMetrics("test")
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            stats = engine.sync_engine.pool.stats()
+            assert stats["checked_out"] == 1
+            assert stats["saturation"] == 1.0
+
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+
+        stats = engine.sync_engine.pool.stats()
+        assert stats["checkouts"] == 2
+        assert stats["timeouts"] == 1
+        assert stats["wait_seconds_max"] >= 0.05
+    finally:
+        await engine.dispose()
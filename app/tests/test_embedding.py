@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import get_settings
+from app.models.domain import ContentItem
+from app.models.embedding import Embedding, QuantizedEmbedding
+from app.services.vector_codec import PCAReducer, VectorCodec
+
+
+def test_embedding_roundtrips():
+    values = [0.25, -1.5, 3.0]
+    embedding = Embedding.from_list(values)
+
+    assert embedding.dim == 3
+    assert embedding.nbytes == 12
+    assert embedding.tolist() == values
+    assert Embedding.from_bytes(embedding.to_bytes()) == embedding
+    assert Embedding.from_base64(embedding.to_base64()) == embedding
+
+
+def test_numpy_conversion_is_zero_copy():
+    array = np.arange(8, dtype=np.float32)
+    embedding = Embedding.from_numpy(array)
+
+    assert np.shares_memory(embedding.to_numpy(), array)
+    assert not embedding.to_numpy().flags.writeable
+
+
+def test_int8_quantization_error_is_bounded():
+    values = np.random.default_rng(0).standard_normal(1536).astype(np.float32)
+    quantized = Embedding.from_numpy(values).quantize()
+
+    assert quantized.nbytes == 1536 + 4
+    restored = QuantizedEmbedding.from_bytes(quantized.to_bytes()).dequantize().to_numpy()
+    assert np.max(np.abs(restored - values)) <= quantized.scale / 2 + 1e-6
+
+
+@pytest.fixture
+def two_dims(monkeypatch):
+    monkeypatch.setattr(get_settings(), "EMBEDDING_DIM", 2)
+
+
+def test_content_item_accepts_list_and_base64_and_emits_base64(two_dims):
+    embedding = Embedding.from_list([1.0, 2.0])
+    from_list = ContentItem(content_id="1", title="t", body="b", tags=[], embedding=[1.0, 2.0])
+    from_b64 = ContentItem(content_id="1", title="t", body="b", tags=[], embedding=embedding.to_base64())
+
+    assert from_list.embedding == embedding
+    assert from_b64.embedding == embedding
+    assert from_list.model_dump(mode="json")["embedding"] == embedding.to_base64()
+
+
+@pytest.mark.parametrize("value", [5, {"x": 1.0}, [{"x": 1.0}, 2.0], [[1.0, 2.0]], "not base64!"])
+def test_content_item_rejects_unusable_embedding(two_dims, value):
+    with pytest.raises(ValidationError):
+        ContentItem(content_id="1", title="t", body="b", tags=[], embedding=value)
+
+
+def test_content_item_rejects_wrong_dimension(two_dims):
+    with pytest.raises(ValidationError, match="3 dimensions, expected 2"):
+        ContentItem(content_id="1", title="t", body="b", tags=[], embedding=[1.0, 2.0, 3.0])
+
+
+async def test_ingest_answers_422_for_a_bad_embedding(client):
+    response = await client.post("/api/v1/content/", json={
+        "content_id": "1", "title": "t", "body": "b", "tags": [], "embedding": 5,
+    })
+
+    assert response.status_code == 422
+
+
+def test_pca_codec_reduces_dimension():
+    rng = np.random.default_rng(1)
+    samples = rng.standard_normal((64, 32)).astype(np.float32)
+    codec = VectorCodec(PCAReducer.fit(samples, 8), quantization="int8")
+
+    assert codec.tensor_type == "tensor<int8>(x[8])"
+    assert len(codec.encode_query(Embedding.from_numpy(samples[0]))) == 8 * 2
+
+
+def test_codec_rejects_unknown_quantization():
+    with pytest.raises(ValueError):
+        VectorCodec(quantization="int4")
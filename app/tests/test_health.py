@@ -0,0 +1,110 @@
+import asyncio
+import signal
+
+import pytest
+
+from app.core.health import CachedProbe, Readiness, readiness
+from app.db.warmup import HOT_QUERIES, warm_engine
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+def counting_check(delay: float = 0.0, error: Exception = None):
+    calls = []
+
+    async def check():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+
+    return check, calls
+
+
+async def test_probe_is_cached_and_single_flight():
+    check, calls = counting_check(delay=0.01)
+    probe = CachedProbe("db", check, ttl=60, timeout=1)
+
+    results = await asyncio.gather(*(probe.run() for _ in range(20)))
+    await probe.run()
+
+    assert len(calls) == 1
+    assert all(result["ok"] for result in results)
+
+
+async def test_probe_reruns_after_ttl():
+    check, calls = counting_check()
+    probe = CachedProbe("db", check, ttl=0, timeout=1)
+    await probe.run()
+    await probe.run()
+    assert len(calls) == 2
+
+
+async def test_probe_reports_errors_and_timeouts():
+    check, _ = counting_check(error=ConnectionError("refused"))
+    failed = await CachedProbe("redis", check, ttl=60, timeout=1).run()
+    assert failed["ok"] is False and "refused" in failed["error"]
+
+    check, _ = counting_check(delay=1)
+    slow = await CachedProbe("redis", check, ttl=60, timeout=0.01).run()
+    assert slow["ok"] is False and "timed out" in slow["error"]
+
+
+async def test_readiness_follows_lifecycle():
+    state = Readiness()
+    check, calls = counting_check()
+    state.add("db", check)
+
+    assert await state.report() == (False, {"status": "starting"})
+    assert not calls  # no dependency traffic before the warmup is done
+
+    state.started = True
+    ready, body = await state.report()
+    assert ready and body["status"] == "ready" and body["checks"]["db"]["ok"]
+
+    state.draining = True
+    assert await state.report() == (False, {"status": "draining"})
+
+
+async def test_livez_and_readyz(client, monkeypatch):
+    assert (await client.get("/livez")).status_code == 200
+
+    monkeypatch.setattr(readiness, "started", False)
+    response = await client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+    check, _ = counting_check()
+    monkeypatch.setattr(readiness, "started", True)
+    monkeypatch.setattr(readiness, "probes", {"db": CachedProbe("db", check, ttl=60, timeout=1)})
+    response = await client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json()["checks"]["db"]["ok"] is True
+
+
+async def test_warm_engine_compiles_hot_queries(db_engine):
+    cache = db_engine.sync_engine._compiled_cache
+    cache.clear()
+    opened = await warm_engine(db_engine, connections=4)
+
+    # In-memory SQLite keeps a single connection; a Postgres pool opens all four
+    assert opened == min(4, db_engine.sync_engine.pool.size())
+    assert len(cache) >= len(HOT_QUERIES)
+
+
+async def test_sigterm_drains_before_the_server_stops():
+    stops = []
+    previous = signal.signal(signal.SIGTERM, lambda sig, frame: stops.append(sig))
+    try:
+        state = Readiness()
+        state.started = True
+        state.drain_on_sigterm(0.05)
+
+        signal.raise_signal(signal.SIGTERM)
+        assert await state.report() == (False, {"status": "draining"})
+        assert stops == []  # still serving while load balancers notice
+
+        await asyncio.sleep(0.1)
+        assert stops == [signal.SIGTERM]
+    finally:
+        signal.signal(signal.SIGTERM, previous)
@@ -0,0 +1,89 @@
+import os
+
+from PIL import Image
+
+from app.services import images
+
+
+def make_image(path, size, mode="RGB"):
+    Image.new(mode, size, (200, 30, 30) if mode == "RGB" else (200, 30, 30, 128)).save(path)
+    return str(path)
+
+
+def test_post_variants_keep_aspect_and_never_upscale(tmp_path):
+    source = make_image(tmp_path / "photo.png", (1000, 500))
+
+    variants = images.render_variants(source, str(tmp_path), "photo", "post_image", 80, 82)
+
+    assert variants["thumb"] == {"width": 320, "height": 160, "webp": "photo_post_image_thumb.webp", "jpeg": "photo_post_image_thumb.jpg"}
+    assert (variants["medium"]["width"], variants["medium"]["height"]) == (800, 400)
+    assert (variants["large"]["width"], variants["large"]["height"]) == (1000, 500)
+    with Image.open(tmp_path / "photo_post_image_thumb.webp") as thumb:
+        assert thumb.format == "WEBP"
+
+
+def test_avatar_variants_are_square(tmp_path):
+    source = make_image(tmp_path / "avatar.png", (300, 200), mode="RGBA")
+
+    variants = images.render_variants(source, str(tmp_path), "avatar", "avatar", 80, 82)
+
+    assert [(v["width"], v["height"]) for v in variants.values()] == [(64, 64), (160, 160)]
+    with Image.open(tmp_path / "avatar_avatar_small.jpg") as small:
+        assert small.mode == "RGB"
+
+
+async def test_generate_variants_runs_in_process_pool(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = images.get_storage()
+    key = "objects/ab/cd/photo.jpg"
+    os.makedirs(os.path.dirname(storage.path(key)))
+    make_image(storage.path(key), (400, 400))
+    try:
+        variants = await images.generate_variants(key, "post_image")
+    finally:
+        images.shutdown_pool()
+
+    assert variants["thumb"]["webp"] == "/static/uploads/objects/ab/cd/photo_post_image_thumb.webp"
+    assert os.path.exists(storage.path("objects/ab/cd/photo_post_image_large.jpg"))
+    assert os.listdir(storage.staging_dir) == []
+
+
+def test_post_image_and_avatar_variants_of_one_upload_do_not_collide(tmp_path):
+    source = make_image(tmp_path / "source.png", (1000, 500))
+
+    post = images.render_variants(source, str(tmp_path), "abc123", "post_image", 80, 82)
+    avatar = images.render_variants(source, str(tmp_path), "abc123", "avatar", 80, 82)
+
+    assert post["medium"]["webp"] != avatar["medium"]["webp"]
+    with Image.open(tmp_path / post["medium"]["webp"]) as medium:
+        assert medium.size == (800, 400)
+    with Image.open(tmp_path / avatar["medium"]["webp"]) as medium:
+        assert medium.size == (160, 160)
+
+
+async def test_avatar_from_a_post_image_upload_gets_its_own_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = images.get_storage()
+    key = "objects/ab/cd/photo.jpg"
+    os.makedirs(os.path.dirname(storage.path(key)))
+    make_image(storage.path(key), (1000, 500))
+    try:
+        post = await images.generate_variants(key, "post_image")
+        avatar = await images.generate_variants(key, "avatar")
+    finally:
+        images.shutdown_pool()
+
+    with Image.open(storage.path(storage.key_from_url(post["medium"]["jpeg"]))) as medium:
+        assert medium.size == (800, 400)
+    with Image.open(storage.path(storage.key_from_url(avatar["medium"]["jpeg"]))) as medium:
+        assert medium.size == (avatar["medium"]["width"], avatar["medium"]["height"]) == (160, 160)
+
+
+def test_pick_image_falls_back_to_original():
+    variants = {"thumb": {"webp": "/a_thumb.webp", "jpeg": "/a_thumb.jpg"}}
+
+    assert images.pick_image("/a.png", variants, "thumb") == "/a_thumb.webp"
+    assert images.pick_image("/a.png", variants, "thumb", fmt="jpeg") == "/a_thumb.jpg"
+    assert images.pick_image("/a.png", variants, "large") == "/a.png"
+    assert images.pick_image("/a.png", None, "thumb") == "/a.png"
+    assert images.pick_image("/a.png", variants, None) == "/a.png"
@@ -0,0 +1,72 @@
+import gzip
+import logging
+import queue
+
+import orjson
+
+from app.core import logging as app_logging
+from app.core.config import get_settings
+from app.core.logging import DroppingQueueHandler, JsonFormatter, SamplingFilter, parse_sampling
+
+settings = get_settings()
+
+
+def make_record(name="app", level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_sampling_applies_to_child_loggers_and_spares_warnings(monkeypatch):
+    sampler = SamplingFilter(parse_sampling("app.health=0, uvicorn.access=1"))
+    monkeypatch.setattr(app_logging.random, "random", lambda: 0.5)
+
+    assert not sampler.filter(make_record("app.health"))
+    assert not sampler.filter(make_record("app.health.probe"))
+    assert sampler.filter(make_record("app.health", logging.WARNING))
+    assert sampler.filter(make_record("uvicorn.access"))
+    assert sampler.filter(make_record("app"))
+
+
+def test_full_queue_drops_and_reports_the_count():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+    for i in range(5):
+        handler.handle(make_record(args=(i,)))
+    assert handler.dropped == 3
+
+    handler.queue.get_nowait()
+    handler.queue.get_nowait()
+    handler.handle(make_record(args=("again",)))
+
+    messages = [handler.queue.get_nowait().getMessage() for _ in range(2)]
+    assert messages == ["hello again", "Log queue full: dropped 3 records"]
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JsonFormatter().format(make_record(request_id="abc", post_id=7))
+
+    entry = orjson.loads(line)
+    assert entry["message"] == "hello world"
+    assert entry["request_id"] == "abc"
+    assert entry["post_id"] == 7
+
+
+def test_queued_file_logging_rotates_into_gzip(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "LOG_MAX_BYTES", 200)
+    monkeypatch.setattr(settings, "LOG_BACKUP_COUNT", 2)
+    root = logging.getLogger()
+    level, handlers = root.level, list(root.handlers)
+    try:
+        app_logging.setup_logging()
+        for i in range(10):
+            logging.getLogger("app").info("line %d", i)
+    finally:
+        app_logging.shutdown_logging()
+        root.setLevel(level)
+        root.handlers[:] = handlers
+
+    rotated = tmp_path / f"{settings.LOG_FILENAME}.1.gz"
+    assert rotated.exists()
+    assert b"line" in gzip.decompress(rotated.read_bytes())
+    assert "line 9" in (tmp_path / settings.LOG_FILENAME).read_text()
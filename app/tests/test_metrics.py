@@ -0,0 +1,113 @@
+import os
+
+import orjson
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core import metrics
+from app.core.metrics import Registry, generate_latest, merge, render, write_snapshot
+from app.middlwares.metrics import MetricsMiddleware
+
+DEAD_PID = 2 ** 22 + 12345  # above pid_max on default Linux configs
+
+
+def make_registry() -> Registry:
+    registry = Registry()
+    registry.counter("jobs_total", "Jobs.", ("kind",)).inc("a", amount=2)
+    registry.gauge("workers_busy", "Busy.").inc()
+    registry.histogram("job_seconds", "Latency.", buckets=(0.1, 1.0)).observe(0.5)
+    return registry
+
+
+def test_renders_prometheus_text():
+    text = render(merge([make_registry().snapshot()]))
+
+    assert '# TYPE jobs_total counter\njobs_total{kind="a"} 2' in text
+    assert "workers_busy 1" in text
+    assert 'job_seconds_bucket{le="0.1"} 0' in text
+    assert 'job_seconds_bucket{le="1"} 1' in text
+    assert 'job_seconds_bucket{le="+Inf"} 1' in text
+    assert "job_seconds_sum 0.5" in text
+    assert "job_seconds_count 1" in text
+
+
+def worker_file(tmp_path, own: dict, pid: int, start) -> str:
+    name = f"{pid}-{start}.json"
+    (tmp_path / name).write_bytes(orjson.dumps({**own, "pid": pid, "start": start}))
+    return name
+
+
+def test_exited_workers_counters_are_kept_and_gauges_dropped(tmp_path):
+    live = make_registry()
+    write_snapshot(live, str(tmp_path))
+    own = orjson.loads(open(metrics._snapshot_path(str(tmp_path)), "rb").read())
+    # A second live worker (our parent) and one that has exited
+    parent = worker_file(tmp_path, own, os.getppid(), metrics._process_start(os.getppid()))
+    worker_file(tmp_path, own, DEAD_PID, "1")
+
+    for _ in range(2):  # folded once, not again on the next scrape
+        text = generate_latest(live, str(tmp_path))
+        assert 'jobs_total{kind="a"} 6' in text
+        assert "workers_busy 2" in text
+        assert 'job_seconds_bucket{le="+Inf"} 3' in text
+
+    own_name = os.path.basename(metrics._snapshot_path(str(tmp_path)))
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".json")) == sorted([own_name, parent, metrics.RETIRED])
+
+
+def test_reused_pid_does_not_revive_a_stale_snapshot(tmp_path):
+    live = make_registry()
+    own = live.snapshot()
+    # Our parent's pid, but a start time that belonged to an earlier process
+    stale = worker_file(tmp_path, own, os.getppid(), "1")
+
+    text = generate_latest(live, str(tmp_path))
+
+    assert 'jobs_total{kind="a"} 4' in text
+    assert "workers_busy 1" in text
+    assert not (tmp_path / stale).exists()
+
+
+def test_snapshot_folded_before_a_crash_is_not_counted_twice(tmp_path):
+    live = make_registry()
+    dead = worker_file(tmp_path, live.snapshot(), DEAD_PID, "1")
+    generate_latest(live, str(tmp_path))
+    # As if the folding worker died after writing the aggregate but before deleting the file
+    worker_file(tmp_path, live.snapshot(), DEAD_PID, "1")
+    retired = orjson.loads((tmp_path / metrics.RETIRED).read_bytes())
+    (tmp_path / metrics.RETIRED).write_bytes(orjson.dumps({**retired, "folded": [dead]}))
+
+    text = generate_latest(live, str(tmp_path))
+
+    assert 'jobs_total{kind="a"} 4' in text
+    assert not (tmp_path / dead).exists()
+
+
+async def test_stopping_the_flusher_leaves_a_final_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics.settings, "METRICS_DIR", str(tmp_path))
+    metrics.start_flusher()
+    metrics.LOAD_SHED.inc("final")
+
+    await metrics.stop_flusher()
+    snapshot = orjson.loads(open(metrics._snapshot_path(str(tmp_path)), "rb").read())
+    assert [["final"], metrics.LOAD_SHED.values[("final",)]] in snapshot["metrics"]["load_shed_total"]["samples"]
+
+
+async def test_labels_requests_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/posts/{post_id}")
+    async def post(post_id: int):
+        return {"id": post_id}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/posts/1")
+        await client.get("/posts/2")
+        await client.get("/nope")
+        registry_text = generate_latest(directory="")
+
+    assert 'http_requests_total{method="GET",route="/posts/{post_id}",status="200"} 2' in registry_text
+    assert 'http_requests_total{method="GET",route="<unmatched>",status="404"} 1' in registry_text
+    assert "/posts/1" not in registry_text
+    assert "http_requests_in_flight 0" in registry_text
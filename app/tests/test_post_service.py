@@ -0,0 +1,13 @@
+from app.services.posts import parse_tags, slugify
+
+
+def test_slugify_keeps_the_stored_slug_rule():
+    # Must match the slugs already in the database
+    assert slugify("Machine Learning") == "machine-learning"
+    assert slugify("Machine  Learning") == "machine--learning"
+    assert slugify("FastAPI") == "fastapi"
+
+
+def test_parse_tags_drops_blanks():
+    assert parse_tags("python, ai,, ,web ") == ["python", "ai", "web"]
+    assert parse_tags(None) == []
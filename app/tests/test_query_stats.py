@@ -0,0 +1,72 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import get_settings
+from app.db.query_stats import statement_shape
+from app.middlwares.query_stats import QueryStatsMiddleware
+
+settings = get_settings()
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE post (id INTEGER PRIMARY KEY, title TEXT)"))
+        await conn.execute(text("INSERT INTO post (id, title) VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+    yield engine
+    await engine.dispose()
+
+
+def make_app(engine) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware, headers=True, detect_repeats=True)
+
+    @app.get("/posts")
+    async def posts():
+        async with engine.connect() as conn:
+            ids = (await conn.execute(text("SELECT id FROM post"))).scalars().all()
+            # One query per row: the pattern the detector is for
+            titles = [(await conn.execute(text("SELECT title FROM post WHERE id = :id"), {"id": i})).scalar() for i in ids]
+        return {"titles": titles}
+
+    return app
+
+
+async def test_counts_queries_per_request(engine, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "DB_N_PLUS_ONE_THRESHOLD", 2)
+    async with AsyncClient(transport=ASGITransport(app=make_app(engine)), base_url="http://test") as client:
+        with caplog.at_level(logging.WARNING, logger="app"):
+            response = await client.get("/posts")
+
+    assert response.headers["x-db-queries"] == "4"
+    assert float(response.headers["x-db-time"]) > 0
+    assert "Possible N+1 in GET /posts: statement ran 3 times: SELECT title FROM post WHERE id = ?" in caplog.text
+
+
+async def test_query_budget(engine, query_budget):
+    async with AsyncClient(transport=ASGITransport(app=make_app(engine)), base_url="http://test") as client:
+        with query_budget(4):
+            await client.get("/posts")
+        with pytest.raises(AssertionError, match="4 queries, budget 2"):
+            with query_budget(2):
+                await client.get("/posts")
+
+
+async def test_slow_queries_are_logged_with_their_plan(engine, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_MS", 1e-9)
+    with caplog.at_level(logging.WARNING, logger="app"):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT title FROM post WHERE title = 'a'"))
+
+    assert "Slow query" in caplog.text
+    assert "SCAN post" in caplog.text
+
+
+def test_statement_shape_collapses_in_lists():
+    assert statement_shape("SELECT *\n  FROM tag WHERE id IN ($1, $2, $3)") == "SELECT * FROM tag WHERE id IN (?, ...)"
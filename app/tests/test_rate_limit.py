@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import rate_limit
+from app.core.rate_limit import LoadShedder, Rule, TokenBucketLimiter, parse_rules
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+class CountingLimiter(TokenBucketLimiter):
+    """Runs the TOKEN_BUCKET script on fake Redis, counting the calls."""
+
+    def __init__(self, rules, redis, **kwargs):
+        super().__init__(rules, redis=redis, **kwargs)
+        self.calls = 0
+
+    async def _take(self, key, rule):
+        self.calls += 1
+        return await super()._take(key, rule)
+
+
+def test_parse_rules():
+    assert parse_rules("login=10/60, register=5/3600,") == {"login": Rule(10, 60.0), "register": Rule(5, 3600.0)}
+
+
+async def test_bucket_admits_its_capacity_then_denies_with_retry_after(fake_redis):
+    limiter = CountingLimiter({"login": Rule(10, 60)}, fake_redis, lease=4)
+    decisions = [await limiter.hit("login", "ip:1.2.3.4") for _ in range(15)]
+
+    assert sum(d.allowed for d in decisions) == 10
+    assert not decisions[-1].allowed and 0 < decisions[-1].retry_after <= 6  # one token every 6s
+    assert (await limiter.hit("login", "ip:5.6.7.8")).allowed  # buckets are per client
+    assert (await limiter.hit("register", "ip:1.2.3.4")).allowed  # and unlisted routes are free
+
+
+async def test_leases_and_denials_are_answered_locally(fake_redis):
+    limiter = CountingLimiter({"like": Rule(20, 60)}, fake_redis, lease=4)
+    for _ in range(20):
+        await limiter.hit("like", "user:a")
+    # Leases only come out of the top half of the bucket
+    assert limiter.calls < 20
+
+    calls = limiter.calls
+    for _ in range(50):
+        assert not (await limiter.hit("like", "user:a")).allowed
+    assert limiter.calls == calls + 1  # the first denial asks Redis, the rest are cached
+
+
+async def test_without_leases_every_request_asks_redis(fake_redis):
+    limiter = CountingLimiter({"like": Rule(20, 60)}, fake_redis, lease=0)
+    for _ in range(5):
+        await limiter.hit("like", "user:a")
+    assert limiter.calls == 5
+
+
+async def test_workers_share_one_bucket_in_redis(fake_redis):
+    rule = Rule(10, 3600)
+    workers = [CountingLimiter({"login": rule}, fake_redis, lease=4) for _ in range(3)]
+    decisions = await asyncio.gather(*(worker.hit("login", "ip:1.2.3.4") for _ in range(10) for worker in workers))
+
+    assert sum(d.allowed for d in decisions) <= rule.capacity  # leases never add tokens
+    bucket = await fake_redis.hgetall("ratelimit:login:ip:1.2.3.4")
+    assert float(bucket["tokens"]) < 1
+    assert 0 < await fake_redis.pttl("ratelimit:login:ip:1.2.3.4") <= 3600 * 1000 + 1000
+
+
+async def test_endpoint_returns_429_with_retry_after(client, db_session, rate_limiter, monkeypatch):
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limiter, "rules", {"forgot_password": Rule(2, 60)})
+
+    statuses = [(await client.post("/api/v1/users/forgot-password", json={"email": "nobody@example.com"})) for _ in range(3)]
+    assert [r.status_code for r in statuses] == [404, 404, 429]
+    assert 1 <= int(statuses[-1].headers["retry-after"]) <= 30
+
+
+async def test_limiter_fails_open_without_redis(client, db_session, monkeypatch):
+    class Broken(TokenBucketLimiter):
+        async def _take(self, key, rule):
+            raise ConnectionError("refused")
+
+    broken = Broken({"forgot_password": Rule(1, 60)}, redis=object())
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "limiter", broken)
+
+    for _ in range(3):
+        response = await client.post("/api/v1/users/forgot-password", json={"email": "nobody@example.com"})
+        assert response.status_code == 404
+    assert broken.unavailable_until > time.monotonic()
+
+
+async def test_load_shedder_rejects_beyond_queue():
+    shedder = LoadShedder("test", limit=1, queue=1)
+    release = asyncio.Event()
+
+    def work():
+        asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+        return "done"
+
+    loop = asyncio.get_running_loop()
+    running = asyncio.create_task(shedder.run(work))
+    await asyncio.sleep(0.05)
+    queued = asyncio.create_task(shedder.run(work))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(HTTPException) as rejected:
+        await shedder.run(work)
+    assert rejected.value.status_code == 503 and rejected.value.headers["Retry-After"] == "1"
+
+    release.set()
+    assert await asyncio.gather(running, queued) == ["done", "done"]
@@ -0,0 +1,112 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.responses import RedirectResponse
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.requests import Request
+
+from app.db import replicas
+from app.db.session import create_engine_from_settings, get_session
+from app.middlwares.read_your_writes import ReadYourWritesMiddleware
+from app.services.auth import create_access_token
+
+
+def make_request(email: str = "reader@example.com", cookie: str = "") -> Request:
+    headers = [(b"authorization", f"Bearer {create_access_token({'sub': email})}".encode())]
+    if cookie:
+        headers.append((b"cookie", cookie.encode()))
+    return Request({"type": "http", "headers": headers})
+
+
+async def whoami(router: replicas.ReadRouter, request: Request) -> str:
+    async with router.session(request) as session:
+        result = await session.execute(text("SELECT name FROM whoami"))
+        return result.scalar_one()
+
+
+@pytest.fixture
+async def databases(tmp_path):
+    """A primary and a replica database that answer differently."""
+    engines = {}
+    for name in ("primary", "replica"):
+        engine = create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / name}.db", name=name)
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE whoami (name TEXT)"))
+            await conn.execute(text("INSERT INTO whoami VALUES (:name)"), {"name": name})
+        engines[name] = engine
+    yield engines
+    for engine in engines.values():
+        await engine.dispose()
+
+
+def make_router(databases, urls=None) -> replicas.ReadRouter:
+    replica_set = replicas.ReplicaSet(urls or [])
+    if urls is None:
+        replica_set.engines = [databases["replica"]]
+    factory = async_sessionmaker(databases["primary"], class_=AsyncSession, expire_on_commit=False)
+    return replicas.ReadRouter(factory, replica_set, window=5.0)
+
+
+async def test_reads_go_to_replica(databases):
+    router = make_router(databases)
+
+    assert await whoami(router, make_request()) == "replica"
+
+
+async def test_reads_after_commit_stay_on_primary(databases, monkeypatch):
+    router = make_router(databases)
+    monkeypatch.setattr(replicas, "read_router", router)
+    request = make_request("writer@example.com")
+
+    async with router.primary_factory() as session:
+        session.info["request"] = request
+        await session.execute(text("UPDATE whoami SET name = 'primary'"))
+        await session.commit()
+
+    assert await whoami(router, make_request("writer@example.com")) == "primary"
+    assert await whoami(router, make_request("someone-else@example.com")) == "replica"
+
+    # Another worker only sees the cookie
+    until = getattr(request.state, replicas.WRITE_STATE)
+    fresh_router = make_router(databases)
+    cookie = f"{replicas.WRITE_COOKIE}={until:.3f}"
+    assert await whoami(fresh_router, make_request("writer@example.com", cookie=cookie)) == "primary"
+
+
+async def test_cookie_survives_an_endpoint_returning_its_own_response(databases, monkeypatch):
+    router = make_router(databases)
+    monkeypatch.setattr(replicas, "read_router", router)
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware, window=router.window)
+
+    @app.post("/write")
+    async def write(request: Request, session: AsyncSession = Depends(get_session)):
+        await session.execute(text("SELECT 1"))
+        await session.commit()
+        # Replaces the response FastAPI injected into the dependencies
+        return RedirectResponse("/done", status_code=303)
+
+    monkeypatch.setattr("app.db.session.async_session_factory", router.primary_factory)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/write")
+
+    assert response.status_code == 303
+    assert float(response.cookies[replicas.WRITE_COOKIE]) > 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_reads_set_no_cookie(client):
+    response = await client.get("/api/v1/posts/")
+
+    assert replicas.WRITE_COOKIE not in response.cookies
+
+
+async def test_unreachable_replica_falls_back_to_primary(databases, tmp_path):
+    router = make_router(databases, urls=[f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}"])
+    try:
+        assert await whoami(router, make_request()) == "primary"
+        assert router.replicas.candidates() == []
+    finally:
+        await router.replicas.dispose()
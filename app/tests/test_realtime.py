@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.core.metrics import WEBSOCKET_DROPPED
+from app.services.realtime import Connection, ConnectionManager, PresenceRegistry, presence_key
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+class CountingRegistry(PresenceRegistry):
+    """The real registry on fake Redis, recording the users of each refresh."""
+
+    def __init__(self, redis, ttl_seconds=30):
+        super().__init__(redis=redis, ttl_seconds=ttl_seconds)
+        self.refreshes = []
+
+    async def refresh(self, worker_id, user_ids):
+        user_ids = list(user_ids)
+        self.refreshes.append(user_ids)
+        await super().refresh(worker_id, user_ids)
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.incoming: asyncio.Queue = asyncio.Queue()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+    async def receive(self):
+        return await self.incoming.get()
+
+
+async def settle(condition, timeout: float = 1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.005)
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def realtime(fake_redis):
+    registry = CountingRegistry(fake_redis)
+    manager = ConnectionManager(registry)
+    yield registry, manager
+    await manager.stop()
+
+
+async def test_every_socket_of_a_user_receives_messages(realtime):
+    registry, manager = realtime
+    first, second, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    connections = [await manager.connect(first, 1), await manager.connect(second, 1), await manager.connect(other, 2)]
+    servers = [asyncio.create_task(manager.serve(connection)) for connection in connections]
+
+    assert await registry.workers(1) == [manager.worker_id]
+    assert await registry.publish(1, '{"id": 7}') == 1  # one worker, however many sockets it holds
+    await settle(lambda: first.sent and second.sent)
+    assert first.sent == second.sent == ['{"id": 7}']
+    assert other.sent == []
+
+    for ws in (first, second, other):
+        ws.incoming.put_nowait({"type": "websocket.disconnect"})
+    await asyncio.gather(*servers)
+    for connection in connections:
+        await manager.disconnect(connection)
+
+
+async def test_presence_follows_first_and_last_socket(realtime):
+    registry, manager = realtime
+    first = await manager.connect(FakeWebSocket(), 1)
+    second = await manager.connect(FakeWebSocket(), 1)
+    assert registry.refreshes == [[1]]  # the second tab doesn't touch Redis
+
+    await manager.disconnect(first)
+    assert await registry.workers(1) == [manager.worker_id]
+    await manager.disconnect(second)
+    assert await registry.workers(1) == []
+    assert await registry.publish(1, "nobody home") == 0
+    assert manager.active_connections == {}
+
+
+async def test_stop_removes_worker_from_presence(realtime):
+    registry, manager = realtime
+    await manager.connect(FakeWebSocket(), 1)
+    await manager.connect(FakeWebSocket(), 2)
+    await manager.stop()
+    assert await registry.workers(1) == [] and await registry.workers(2) == []
+
+
+async def test_presence_expires_without_heartbeat(fake_redis):
+    registry = PresenceRegistry(redis=fake_redis, ttl_seconds=0.2)
+    await registry.refresh("worker-a", [1, 2])
+    assert await registry.workers(1) == ["worker-a"]
+    assert 0 < await fake_redis.pttl(presence_key(1)) <= 200
+
+    await asyncio.sleep(0.3)  # a worker that died without cleaning up
+    assert await registry.workers(1) == []
+    assert await registry.publish(1, "lost") == 0
+
+
+async def test_publish_reaches_only_the_workers_holding_the_user(fake_redis):
+    registry = PresenceRegistry(redis=fake_redis, ttl_seconds=30)
+    channels = {}
+    for worker_id in ("worker-a", "worker-b", "worker-c"):
+        channels[worker_id] = fake_redis.pubsub()
+        await channels[worker_id].subscribe(registry.channel(worker_id))
+    await registry.refresh("worker-a", [1])
+    await registry.refresh("worker-b", [1, 2])
+    await registry.forget("worker-b", [1])
+
+    assert await registry.publish(1, "for one") == 1
+    assert await registry.publish(2, "for two") == 1
+    assert await registry.publish(3, "for nobody") == 0
+
+    async def received(worker_id):
+        messages = []
+        for _ in range(5):  # subscribe confirmations come back as None
+            message = await channels[worker_id].get_message(ignore_subscribe_messages=True, timeout=0.05)
+            if message:
+                messages.append(message["data"])
+        await channels[worker_id].aclose()
+        return messages
+
+    assert await received("worker-a") == ["1\nfor one"]
+    assert await received("worker-b") == ["2\nfor two"]
+    assert await received("worker-c") == []
+
+
+async def test_slow_socket_drops_oldest_messages():
+    connection = Connection(FakeWebSocket(), 1, queue_size=2)
+    dropped = WEBSOCKET_DROPPED.values.get(("notifications",), 0)
+    for message in ("a", "b", "c"):
+        connection.deliver(message)
+
+    assert [connection.queue.get_nowait() for _ in range(2)] == ["b", "c"]
+    assert WEBSOCKET_DROPPED.values.get(("notifications",), 0) == dropped + 1
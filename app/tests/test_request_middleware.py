@@ -0,0 +1,60 @@
+from fastapi import FastAPI, WebSocket
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+
+from app.core.context import request_id_context
+from app.middlwares.logger import RequestMiddleware
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestMiddleware)
+
+    @app.get("/id")
+    async def current_id():
+        return {"request_id": request_id_context.get()}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(5):
+                yield f"{i}".encode()
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.websocket("/ws")
+    async def ws(websocket: WebSocket):
+        await websocket.accept()
+        await websocket.send_text(request_id_context.get())
+        await websocket.close()
+
+    return app
+
+
+async def get(path: str):
+    async with AsyncClient(transport=ASGITransport(app=make_app()), base_url="http://test") as client:
+        return await client.get(path)
+
+
+async def test_request_id_header_matches_context_and_is_reset():
+    before = request_id_context.get()
+    response = await get("/id")
+
+    assert response.headers["x-request-id"] == response.json()["request_id"]
+    assert float(response.headers["x-process-time"]) >= 0
+    assert request_id_context.get() == before
+
+
+async def test_streaming_body_passes_through():
+    response = await get("/stream")
+
+    assert response.text == "01234"
+    assert "x-request-id" in response.headers
+
+
+def test_websocket_accept_carries_request_id():
+    with TestClient(make_app()).websocket_connect("/ws") as websocket:
+        request_id = websocket.receive_text()
+        headers = dict(websocket.extra_headers)
+
+    assert headers[b"x-request-id"].decode() == request_id
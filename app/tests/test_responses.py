@@ -0,0 +1,102 @@
+from datetime import datetime
+
+import msgpack
+import orjson
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.core.responses import APIResponse
+from app.middlwares.compression import CompressionMiddleware
+from app.middlwares.negotiation import ContentNegotiationMiddleware
+from app.models.user import Role
+
+BIG = {"items": [{"id": i, "text": "hello world " * 5} for i in range(100)]}
+
+
+def make_app() -> FastAPI:
+    app = FastAPI(default_response_class=APIResponse)
+    app.add_middleware(ContentNegotiationMiddleware)
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/small")
+    async def small():
+        return {"at": datetime(2026, 1, 2, 3, 4, 5), "role": Role.ADMIN}
+
+    @app.get("/big")
+    async def big():
+        return APIResponse(BIG)
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(10):
+                yield b"x" * 1000
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/tagged")
+    async def tagged():
+        return PlainTextResponse("x" * 1000, headers={"ETag": '"v1"'})
+
+    return app
+
+
+async def get(path: str, **headers):
+    async with AsyncClient(transport=ASGITransport(app=make_app()), base_url="http://test") as client:
+        return await client.get(path, headers=headers)
+
+
+def test_renders_datetimes_and_enums_like_the_stdlib_encoder():
+    body = APIResponse({"at": datetime(2026, 1, 2, 3, 4, 5, 6), "role": Role.USER}).body
+
+    assert orjson.loads(body) == {"at": "2026-01-02T03:04:05.000006", "role": "user"}
+
+
+async def test_small_responses_are_not_compressed():
+    response = await get("/small", **{"accept-encoding": "br, gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"at": "2026-01-02T03:04:05", "role": "admin"}
+
+
+async def test_prefers_brotli_then_gzip():
+    br = await get("/big", **{"accept-encoding": "gzip, br"})
+    gz = await get("/big", **{"accept-encoding": "gzip"})
+    plain = await get("/big", **{"accept-encoding": "identity"})
+
+    assert br.headers["content-encoding"] == "br"
+    assert gz.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in plain.headers
+    assert br.json() == gz.json() == plain.json() == BIG
+    assert int(br.headers["content-length"]) < int(plain.headers["content-length"])
+    assert br.headers["vary"] == "Accept, Accept-Encoding"
+
+
+async def test_streaming_responses_are_compressed_incrementally():
+    response = await get("/stream", **{"accept-encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content == b"x" * 10000
+
+
+async def test_msgpack_is_negotiated_from_accept():
+    response = await get("/small", accept="application/msgpack")
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == {"at": "2026-01-02T03:04:05", "role": "admin"}
+
+
+async def test_both_renderings_vary_on_accept():
+    json_response = await get("/small")
+    msgpack_response = await get("/small", accept="application/msgpack")
+
+    assert json_response.headers["vary"] == msgpack_response.headers["vary"] == "Accept"
+
+
+async def test_compression_weakens_a_strong_etag():
+    compressed = await get("/tagged", **{"accept-encoding": "gzip"})
+    plain = await get("/tagged", **{"accept-encoding": "identity"})
+
+    assert compressed.headers["etag"] == 'W/"v1"'
+    assert plain.headers["etag"] == '"v1"'
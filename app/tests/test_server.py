@@ -0,0 +1,53 @@
+import builtins
+import io
+
+from app import server
+from app.core.config import get_settings
+
+
+def test_options_come_from_settings(monkeypatch):
+    settings = get_settings().model_copy(update={
+        "SERVER_WORKERS": 0, "SERVER_KEEPALIVE_SECONDS": 75, "SERVER_BACKLOG": 4096,
+        "SERVER_MAX_REQUESTS": 10000, "SERVER_MAX_REQUESTS_JITTER": 500, "SERVER_GRACEFUL_TIMEOUT": 20,
+    })
+    monkeypatch.setattr(server, "available_cpus", lambda: 3)
+    options = server.server_options(settings)
+
+    assert options["workers"] == 3
+    assert options["timeout_keep_alive"] == 75
+    assert options["backlog"] == 4096
+    assert (options["limit_max_requests"], options["limit_max_requests_jitter"]) == (10000, 500)
+    assert options["timeout_graceful_shutdown"] == 20
+    assert server.server_options(settings.model_copy(update={"SERVER_MAX_REQUESTS": 0}))["limit_max_requests"] is None
+
+
+def test_auto_prefers_uvloop_and_httptools_when_installed(monkeypatch):
+    settings = get_settings().model_copy(update={"SERVER_LOOP": "auto", "SERVER_HTTP": "auto"})
+    monkeypatch.setattr(server.importlib.util, "find_spec", lambda name: object())
+    assert (server.server_options(settings)["loop"], server.server_options(settings)["http"]) == ("uvloop", "httptools")
+
+    monkeypatch.setattr(server.importlib.util, "find_spec", lambda name: None)
+    assert (server.server_options(settings)["loop"], server.server_options(settings)["http"]) == ("asyncio", "h11")
+    assert server.server_options(settings, loop="uvloop", workers=2)["loop"] == "uvloop"
+
+
+def test_available_cpus_respects_cgroup_quota(monkeypatch):
+    real_open = builtins.open
+
+    def fake_open(path, *args, **kwargs):
+        if path == "/sys/fs/cgroup/cpu.max":
+            return io.StringIO("150000 100000\n")
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(server.os, "sched_getaffinity", lambda pid: set(range(64)), raising=False)
+    monkeypatch.setattr(builtins, "open", fake_open)
+    assert server.available_cpus() == 2
+
+
+def test_workers_skip_one_shot_startup_steps():
+    settings = get_settings().model_copy(update={"DB_INIT_ON_STARTUP": True, "ASSETS_BUILD_ON_STARTUP": False})
+    environ = {"DB_INIT_ON_STARTUP": "true"}
+
+    server.disable_one_shot_steps(settings, environ)
+
+    assert environ == {"DB_INIT_ON_STARTUP": "false", "ASSETS_BUILD_ON_STARTUP": "false"}
@@ -0,0 +1,93 @@
+"""
+Worker startup cost: what importing the app pulls in, measured with
+`python -X importtime` in a fresh interpreter.
+
+IMPORT_TIME_BUDGET_MS overrides the budget on slow CI machines.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import func, inspect, select, text
+
+from app.core.config import get_settings
+from app.db import init_db
+from app.db.seed import seed_admin_user
+from app.db.session import create_engine_from_settings
+from app.models.user import Role, User
+
+# Loaded on first use by the feed/embedding services, never at import
+LAZY_MODULES = ("openai", "vespa")
+IMPORT_TIME_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 3000))
+
+
+def import_times(module: str) -> dict:
+    """Cumulative import time in microseconds for every module `module` imports."""
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-placeholder")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            times[name.strip()] = int(cumulative)
+        except ValueError:  # the header line
+            continue
+    return times
+
+
+@pytest.fixture(scope="module")
+def app_import_times():
+    return import_times("app.main")
+
+
+def test_heavy_clients_are_not_imported_at_startup(app_import_times):
+    loaded = sorted(name for name in app_import_times if name.split(".")[0] in LAZY_MODULES)
+    assert not loaded, f"imported at startup: {loaded}"
+
+
+def test_import_time_budget(app_import_times):
+    total_ms = app_import_times["app.main"] / 1000
+    slowest = sorted(
+        ((us, name) for name, us in app_import_times.items() if name.startswith("app.")), reverse=True
+    )[:10]
+    report = "\n".join(f"  {us / 1000:8.1f} ms  {name}" for us, name in slowest)
+    assert total_ms <= IMPORT_TIME_BUDGET_MS, f"importing app.main took {total_ms:.0f} ms:\n{report}"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_seed_admin_user_is_idempotent(db_session):
+    settings = get_settings()
+    await seed_admin_user(db_session)
+    await seed_admin_user(db_session)
+
+    admins = (await db_session.execute(
+        select(func.count()).select_from(User).where(User.email == settings.ADMIN_EMAIL, User.role == Role.ADMIN)
+    )).scalar_one()
+    assert admins == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_migrate_creates_and_stamps_an_empty_database(tmp_path):
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    head = ScriptDirectory.from_config(Config(str(init_db.ALEMBIC_INI))).get_current_head()
+    engine = create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / 'fresh.db'}", name="migrate")
+    try:
+        await init_db.migrate(engine)
+        # Running it again finds the schema at head and changes nothing
+        await init_db.migrate(engine)
+        async with engine.connect() as conn:
+            tables = await conn.run_sync(lambda sync_conn: set(inspect(sync_conn).get_table_names()))
+            version = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar_one()
+    finally:
+        await engine.dispose()
+
+    assert {"user", "post", "storedobject"} <= tables
+    assert version == head
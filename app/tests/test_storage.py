@@ -0,0 +1,158 @@
+import asyncio
+
+import pytest
+
+from app.services.storage import LocalStorage, S3Storage
+
+PART = 5 * 1024 * 1024
+
+
+class ClientError(Exception):
+    def __init__(self, code):
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeBody:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def read(self, n):
+        chunk, self.data = self.data[:n], self.data[n:]
+        return chunk
+
+
+class FakeS3:
+    """In-memory stand-in for the aiobotocore S3 client calls S3Storage makes."""
+
+    class exceptions:
+        ClientError = ClientError
+
+    def __init__(self, fail_part=None):
+        self.objects = {}
+        self.uploads = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_part = fail_part
+        self.aborted = []
+
+    async def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError("404")
+        return {}
+
+    async def put_object(self, Bucket, Key, Body, ContentType, CacheControl):
+        self.objects[Key] = Body
+
+    async def create_multipart_upload(self, Bucket, Key, ContentType, CacheControl):
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    async def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if PartNumber == self.fail_part:
+            raise ClientError("500")
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    async def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        assert numbers == sorted(parts)
+        self.objects[Key] = b"".join(parts[n] for n in numbers)
+
+    async def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(UploadId)
+        self.uploads.pop(UploadId, None)
+
+    async def get_object(self, Bucket, Key):
+        return {"Body": FakeBody(self.objects[Key])}
+
+    async def list_objects_v2(self, Bucket, Prefix):
+        return {"Contents": [{"Key": key} for key in self.objects if key.startswith(Prefix)]}
+
+    async def delete_objects(self, Bucket, Delete):
+        for item in Delete["Objects"]:
+            self.objects.pop(item["Key"], None)
+
+
+def staged(tmp_path, name: str, data: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def make_s3(tmp_path, client, concurrency=2) -> S3Storage:
+    return S3Storage("bucket", "https://cdn.example.com/", str(tmp_path), part_size=PART, concurrency=concurrency, client=client)
+
+
+async def test_s3_multipart_upload_runs_parts_concurrently(tmp_path):
+    client = FakeS3()
+    storage = make_s3(tmp_path, client)
+    data = bytes(range(256)) * (3 * PART // 256) + b"tail"
+    path = staged(tmp_path, "big", data)
+
+    await storage.put_file(path, "objects/ab/cd/big.png", "image/png")
+
+    assert client.objects["objects/ab/cd/big.png"] == data
+    assert client.max_in_flight == 2
+    assert not (tmp_path / "big").exists()
+    assert storage.url("objects/ab/cd/big.png") == "https://cdn.example.com/objects/ab/cd/big.png"
+
+
+async def test_s3_failed_part_aborts_upload(tmp_path):
+    client = FakeS3(fail_part=2)
+    storage = make_s3(tmp_path, client)
+
+    with pytest.raises(ClientError):
+        await storage.put_file(staged(tmp_path, "big", b"x" * (2 * PART + 1)), "objects/big.png", "image/png")
+
+    assert client.aborted == ["upload-0"]
+    assert "objects/big.png" not in client.objects
+    assert not (tmp_path / "big").exists()
+
+
+async def test_s3_small_object_roundtrip_and_prefix_delete(tmp_path):
+    client = FakeS3()
+    storage = make_s3(tmp_path, client)
+    await storage.put_file(staged(tmp_path, "a", b"original"), "objects/ab/cd/abc.png", "image/png")
+    await storage.put_file(staged(tmp_path, "b", b"variant"), "objects/ab/cd/abc_post_image_thumb.webp", "image/webp")
+    await storage.put_file(staged(tmp_path, "c", b"other"), "objects/ab/cd/abd.png", "image/png")
+
+    fetched = await storage.fetch("objects/ab/cd/abc.png", str(tmp_path))
+    assert open(fetched, "rb").read() == b"original"
+
+    await storage.delete_prefix("objects/ab/cd/abc")
+    assert list(client.objects) == ["objects/ab/cd/abd.png"]
+
+
+async def test_local_storage_keeps_existing_object(tmp_path):
+    storage = LocalStorage(str(tmp_path / "uploads"), "/static/uploads", str(tmp_path / "staging"))
+    await storage.put_file(staged(tmp_path, "first", b"same"), "objects/ab/cd/abc.png", "image/png")
+    await storage.put_file(staged(tmp_path, "second", b"same"), "objects/ab/cd/abc.png", "image/png")
+
+    assert open(storage.path("objects/ab/cd/abc.png"), "rb").read() == b"same"
+    assert not (tmp_path / "first").exists() and not (tmp_path / "second").exists()
+    assert storage.key_from_url("/static/uploads/objects/ab/cd/abc.png") == "objects/ab/cd/abc.png"
+    assert storage.key_from_url("https://elsewhere.example.com/a.png") is None
+
+    await storage.delete_prefix("objects/ab/cd/abc")
+    assert not (tmp_path / "uploads" / "objects" / "ab" / "cd" / "abc.png").exists()
+
+
+def test_local_mount_path_ignores_cdn_origin(tmp_path):
+    def mount_path(public_url):
+        return LocalStorage(str(tmp_path), public_url, str(tmp_path / "staging")).mount_path
+
+    assert mount_path("/static/uploads") == "/static/uploads/objects"
+    assert mount_path("https://cdn.example.com/static/uploads/") == "/static/uploads/objects"
+    assert mount_path("https://cdn.example.com") == "/objects"
@@ -0,0 +1,107 @@
+import orjson
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import tracing
+from app.core.config import get_settings
+from app.middlwares.logger import RequestMiddleware
+from app.middlwares.tracing import TracingMiddleware
+
+settings = get_settings()
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+class MemoryExporter:
+    def __init__(self):
+        self.payloads = []
+
+    def export(self, payload: bytes):
+        self.payloads.append(orjson.loads(payload))
+
+    def close(self):
+        pass
+
+    def spans(self):
+        return [
+            span
+            for payload in self.payloads
+            for resource in payload["resourceSpans"]
+            for scope in resource["scopeSpans"]
+            for span in scope["spans"]
+        ]
+
+
+@pytest.fixture
+def exporter():
+    exporter = MemoryExporter()
+    tracing.setup_tracing(exporter)
+    yield exporter
+    tracing.shutdown_tracing()
+
+
+def make_app() -> FastAPI:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+    app.add_middleware(RequestMiddleware)
+
+    @app.get("/posts/{post_id}")
+    async def post(post_id: int):
+        with tracing.span("render", post_id=post_id):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        return {"traceparent": tracing.traceparent()}
+
+    return app
+
+
+async def get(path: str, **headers):
+    async with AsyncClient(transport=ASGITransport(app=make_app()), base_url="http://test") as client:
+        return await client.get(path, headers=headers)
+
+
+async def test_continues_incoming_trace_with_child_spans(exporter):
+    response = await get("/posts/7", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01")
+    tracing.shutdown_tracing()
+
+    spans = {span["name"]: span for span in exporter.spans()}
+    server, render, query = spans["GET /posts/{post_id}"], spans["render"], spans["db.query"]
+    assert {span["traceId"] for span in spans.values()} == {TRACE_ID}
+    assert server["parentSpanId"] == PARENT_ID
+    assert render["parentSpanId"] == server["spanId"]
+    assert query["parentSpanId"] == render["spanId"]
+    attributes = {a["key"]: a["value"] for a in server["attributes"]}
+    assert attributes["http.status_code"] == {"intValue": "200"}
+    assert attributes["request.id"] == {"stringValue": response.headers["x-request-id"]}
+    assert response.json()["traceparent"].startswith(f"00-{TRACE_ID}-")
+
+
+async def test_unsampled_requests_record_nothing_but_propagate(exporter, monkeypatch):
+    monkeypatch.setattr(settings, "TRACING_SAMPLE_RATE", 0.0)
+    response = await get("/posts/7")
+    tracing.shutdown_tracing()
+
+    assert exporter.spans() == []
+    assert response.json()["traceparent"].endswith("-00")
+
+
+@pytest.mark.parametrize("header", [None, "", "00-xyz-00f067aa0ba902b7-01", f"00-{'0' * 32}-{PARENT_ID}-01", f"ff-{TRACE_ID}-{PARENT_ID}-01"])
+def test_rejects_invalid_traceparent(header):
+    assert tracing.parse_traceparent(header) is None
+
+
+def test_file_exporter_writes_otlp_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TRACING_SAMPLE_RATE", 1.0)
+    path = tmp_path / "traces.jsonl"
+    tracing.setup_tracing(tracing.FileExporter(str(path)))
+    with tracing.span("job", root=True):
+        pass
+    tracing.shutdown_tracing()
+
+    [line] = path.read_text().splitlines()
+    assert orjson.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["name"] == "job"
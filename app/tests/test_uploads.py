@@ -0,0 +1,199 @@
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.middlwares.upload_limit import UploadLimitMiddleware
+from app.models.upload import StoredObject
+from app.services import uploads
+from app.services.storage import get_storage
+from app.utils.upload_helper import get_object_key, sha256_from_key
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 1000
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+SCHEMA = "upload_tests"
+
+
+@pytest.fixture(autouse=True)
+def upload_root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / "static" / "uploads"
+
+
+def make_upload(data: bytes, size=None) -> UploadFile:
+    return UploadFile(io.BytesIO(data), size=size, filename="photo.bin")
+
+
+def test_object_keys_are_sharded_by_hash():
+    sha = hashlib.sha256(PNG).hexdigest()
+
+    key = get_object_key(sha, ".png")
+
+    assert key == f"objects/{sha[:2]}/{sha[2:4]}/{sha}.png"
+    assert sha256_from_key(key) == sha
+    assert sha256_from_key(f"objects/{sha[:2]}/{sha[2:4]}/{sha}_thumb.webp") is None
+    assert sha256_from_key("user_1/profile/objects/avatar.png") is None
+    assert sha256_from_key(None) is None
+
+
+def test_streams_to_staging_with_sniffed_type_and_hash(upload_root):
+    tmp_path, content_type, size, sha = uploads._stream_to_staging(io.BytesIO(PNG), str(upload_root / ".staging"), limit=4096, chunk_size=64)
+
+    assert content_type == "image/png"
+    assert size == len(PNG)
+    assert sha == hashlib.sha256(PNG).hexdigest()
+    assert open(tmp_path, "rb").read() == PNG
+
+
+async def test_rejects_unknown_type(upload_root):
+    with pytest.raises(HTTPException) as e:
+        await uploads.save_upload(None, make_upload(b"<script>alert(1)</script>"), "avatar")
+
+    assert e.value.status_code == 415
+    assert not (upload_root / "objects").exists()
+
+
+async def test_size_limit_applies_while_streaming(upload_root, monkeypatch):
+    monkeypatch.setattr(uploads.settings, "UPLOAD_MAX_AVATAR_BYTES", 512)
+    monkeypatch.setattr(uploads.settings, "UPLOAD_CHUNK_SIZE", 64)
+
+    # Declared size is unknown, so only the streaming check can catch it
+    with pytest.raises(HTTPException) as e:
+        await uploads.save_upload(None, make_upload(PNG), "avatar")
+
+    assert e.value.status_code == 413
+    assert list((upload_root / ".staging").iterdir()) == []
+
+
+async def test_declared_size_rejected_before_reading(monkeypatch):
+    monkeypatch.setattr(uploads.settings, "UPLOAD_MAX_POST_IMAGE_BYTES", 10)
+
+    with pytest.raises(HTTPException) as e:
+        await uploads.save_upload(None, make_upload(PNG, size=len(PNG)), "post_image")
+
+    assert e.value.status_code == 413
+
+
+def limited_app(received: list) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, max_body=4096)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        received.append(file.size)
+        return {"size": file.size}
+
+    return app
+
+
+async def post_upload(app: FastAPI, **kwargs):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        return await client.post("/upload", **kwargs)
+
+
+async def test_upload_body_limit_uses_content_length():
+    received = []
+
+    small = await post_upload(limited_app(received), files={"file": ("a.png", PNG)})
+    large = await post_upload(limited_app(received), files={"file": ("a.png", PNG * 8)})
+
+    assert small.status_code == 200
+    assert large.status_code == 413
+    assert received == [len(PNG)]
+
+
+async def test_upload_body_limit_cuts_off_chunked_bodies():
+    received = []
+    boundary = "limit-test"
+
+    async def body():
+        yield f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="a.png"\r\n\r\n'.encode()
+        for _ in range(8):
+            yield PNG
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    # No Content-Length: only counting the stream catches it
+    response = await post_upload(
+        limited_app(received), content=body(),
+        headers={"content-type": f"multipart/form-data; boundary={boundary}"},
+    )
+
+    assert response.status_code == 413
+    assert received == []
+
+
+@pytest.fixture
+async def pg_session():
+    if not POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    engine = create_async_engine(POSTGRES_URL, connect_args={"server_settings": {"search_path": SCHEMA}})
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.run_sync(SQLModel.metadata.create_all, tables=[StoredObject.__table__])
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+async def test_identical_uploads_share_one_counted_file(pg_session, upload_root):
+    first = await uploads.save_upload(pg_session, make_upload(PNG), "post_image")
+    second = await uploads.save_upload(pg_session, make_upload(PNG), "post_image")
+    await pg_session.commit()
+
+    path = get_storage().path(first.key)
+    assert first.url == second.url == f"/static/uploads/{first.key}"
+    assert (await pg_session.get(StoredObject, first.sha256)).ref_count == 2
+    assert open(path, "rb").read() == PNG
+    assert list((upload_root / ".staging").iterdir()) == []
+
+    # A variant generated from it goes with the last reference
+    open(path.replace(".png", "_thumb.webp"), "wb").close()
+    await uploads.release_upload(pg_session, first.url)
+    await pg_session.commit()
+    await uploads.purge_released(pg_session)
+    assert os.path.exists(path)
+
+    await uploads.release_upload(pg_session, first.url)
+    await pg_session.commit()
+    await uploads.purge_released(pg_session)
+    assert await pg_session.get(StoredObject, first.sha256) is None
+    assert os.listdir(os.path.dirname(path)) == []
+
+
+async def test_rolled_back_release_keeps_the_file(pg_session):
+    stored = await uploads.save_upload(pg_session, make_upload(PNG), "avatar")
+    await pg_session.commit()
+
+    await uploads.release_upload(pg_session, stored.url)
+    await pg_session.rollback()
+    await uploads.purge_released(pg_session)
+
+    assert (await pg_session.get(StoredObject, stored.sha256)).ref_count == 1
+    assert os.path.exists(get_storage().path(stored.key))
+
+
+async def test_sweep_collects_releases_never_purged(pg_session):
+    stored = await uploads.save_upload(pg_session, make_upload(PNG), "avatar")
+    await pg_session.commit()
+    await uploads.release_upload(pg_session, stored.url)
+    await pg_session.commit()
+    # The worker died before purging
+    pg_session.info.clear()
+    assert os.path.exists(get_storage().path(stored.key))
+
+    await uploads.sweep_released(pg_session)
+
+    assert await pg_session.get(StoredObject, stored.sha256) is None
+    assert not os.path.exists(get_storage().path(stored.key))
@@ -0,0 +1,123 @@
+"""
+Fingerprinted, precompressed static assets.
+
+`build_assets` copies every file under static/{css,js,img,fonts} to
+static/dist/ with a content hash in its name (css/styles.css ->
+css/styles.3f2a9c1d0b7e.css), writes .gz and .br siblings for text formats
+and records the mapping in static/dist/manifest.json. Templates call
+`asset_url("css/styles.css")`, which resolves through the manifest, so a
+changed file gets a new URL and everything under /static/dist can be cached
+forever.
+
+Run it once per deploy, before the workers start:
+
+    python build_assets.py
+
+ASSETS_BUILD_ON_STARTUP builds in the app's lifespan instead, which is only
+meant for a single development process. Concurrent builds are still safe:
+temporary files are per process, and a build that finds the manifest
+already current changes nothing.
+"""
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import brotli
+
+from app.core.logging import logger
+
+STATIC_ROOT = Path("static")
+DIST_DIR = STATIC_ROOT / "dist"
+MANIFEST_PATH = DIST_DIR / "manifest.json"
+SOURCE_DIRS = ("css", "js", "img", "fonts")
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".map", ".ico"}
+
+_manifest: Optional[Dict[str, str]] = None
+
+
+def fingerprint(relative: str, data: bytes) -> str:
+    stem, ext = os.path.splitext(relative)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _write(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def build_assets(static_root: Path = STATIC_ROOT, dist_dir: Optional[Path] = None) -> Dict[str, str]:
+    """Write fingerprinted copies plus compressed variants; returns the manifest."""
+    dist_dir = dist_dir or static_root / "dist"
+    manifest = {}
+    for source_dir in SOURCE_DIRS:
+        for source in sorted((static_root / source_dir).rglob("*")):
+            if not source.is_file() or source.name.startswith("."):
+                continue
+            relative = source.relative_to(static_root).as_posix()
+            data = source.read_bytes()
+            hashed = fingerprint(relative, data)
+            manifest[relative] = hashed
+
+            target = dist_dir / hashed
+            if target.exists():
+                continue  # same name, same bytes
+            _write(target, data)
+            if source.suffix in COMPRESSIBLE:
+                # mtime=0 keeps the .gz output reproducible across builds
+                gz = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(gz) < len(data):
+                    _write(target.with_name(target.name + ".gz"), gz)
+                br = brotli.compress(data, quality=11)
+                if len(br) < len(data):
+                    _write(target.with_name(target.name + ".br"), br)
+
+    manifest_path = dist_dir / "manifest.json"
+    previous = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    if previous != manifest:
+        _write(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode())
+        _prune(dist_dir, set(manifest.values()), set(previous.values()))
+    reload_manifest()
+    logger.info("Built %d static assets into %s", len(manifest), dist_dir)
+    return manifest
+
+
+def _prune(dist_dir: Path, current: set, previous: set):
+    # Keep only the current build and the one before it, so pages rendered
+    # just before a deploy can still load their assets
+    keep = current | previous
+    for path in dist_dir.rglob("*"):
+        if not path.is_file() or path.name == "manifest.json" or path.name.endswith(".tmp"):
+            continue
+        name = path.relative_to(dist_dir).as_posix()
+        base = name.removesuffix(".gz").removesuffix(".br")
+        if base not in keep:
+            path.unlink(missing_ok=True)
+
+
+def reload_manifest():
+    global _manifest
+    _manifest = None
+
+
+def load_manifest() -> Dict[str, str]:
+    global _manifest
+    if _manifest is None:
+        try:
+            _manifest = json.loads(MANIFEST_PATH.read_text())
+        except FileNotFoundError:
+            _manifest = {}
+    return _manifest
+
+
+def asset_url(path: str) -> str:
+    """Template helper: hashed URL for a static asset, or the plain one if it wasn't built."""
+    path = path.lstrip("/")
+    hashed = load_manifest().get(path)
+    if hashed is None:
+        return f"/static/{path}"
+    return f"/static/dist/{hashed}"
@@ -0,0 +1,71 @@
+import mimetypes
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from starlette.types import Scope
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Preferred first
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that sends a fixed Cache-Control header with every file."""
+
+    def __init__(self, *args, cache_control: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = self.cache_control
+        return response
+
+
+def accepted_encodings(scope: Scope) -> set:
+    """Codings the client accepts (q > 0) from its Accept-Encoding header."""
+    accepted = set()
+    for item in Headers(scope=scope).get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            if params and float(q) == 0:
+                continue
+        except ValueError:
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(CachedStaticFiles):
+    """
+    Serves `file.br` / `file.gz` written next to `file` at build time when
+    the client accepts that encoding, so nothing is compressed per request.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        accepted = accepted_encodings(scope)
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in accepted and "*" not in accepted:
+                continue
+            try:
+                response = await super().get_response(path + suffix, scope)
+            except HTTPException:
+                continue
+            if response.status_code in (200, 304):
+                media_type, _ = mimetypes.guess_type(path)
+                if media_type:
+                    if media_type.startswith("text/") or media_type == "application/javascript":
+                        media_type += "; charset=utf-8"
+                    response.headers["Content-Type"] = media_type
+                response.headers["Content-Encoding"] = encoding
+                response.headers["Vary"] = "Accept-Encoding"
+                return response
+
+        response = await super().get_response(path, scope)
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
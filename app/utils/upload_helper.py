@@ -1,54 +1,42 @@
-import os
+import re
 from pathlib import Path
 from typing import Optional
 
+from app.core.config import get_settings
 
-def get_user_post_upload_path(user_id: int, post_id: int, filename: str) -> tuple[str, str]:
+settings = get_settings()
+
+_OBJECT_KEY = re.compile(r"^objects/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.\w+$")
+
+
+def get_object_key(sha256: str, extension: str) -> str:
     """
-    Get the file path and URL for a post upload.
-    
+    Get the storage key for a content-addressed upload.
+
     Args:
-        user_id: The user's ID
-        post_id: The post's ID
-        filename: The original filename with extension
-        
+        sha256: Hex digest of the file contents
+        extension: Extension including the dot, e.g. ".png"
+
     Returns:
-        tuple: (file_path, url_path)
+        str: key such as "objects/ab/cd/abcd....png"
     """
-    # Create directory structure: user_{id}/post/{post_id}/objects
-    upload_dir = Path("static") / "uploads" / f"user_{user_id}" / "post" / str(post_id) / "objects"
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    file_path = upload_dir / filename
-    url_path = f"/static/uploads/user_{user_id}/post/{post_id}/objects/{filename}"
-    
-    return str(file_path), url_path
+    # Two levels of 256-way sharding keep directories and listings small
+    return f"objects/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
 
 
-def get_user_profile_upload_path(user_id: int, filename: str) -> tuple[str, str]:
+def sha256_from_key(key: Optional[str]) -> Optional[str]:
     """
-    Get the file path and URL for a profile upload.
-    
-    Args:
-        user_id: The user's ID
-        filename: The original filename with extension
-        
-    Returns:
-        tuple: (file_path, url_path)
+    SHA-256 of a content-addressed key, or None for anything else (such as
+    files stored before uploads were content-addressed).
     """
-    # Create directory structure: user_{id}/profile/objects
-    upload_dir = Path("static") / "uploads" / f"user_{user_id}" / "profile" / "objects"
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    file_path = upload_dir / filename
-    url_path = f"/static/uploads/user_{user_id}/profile/objects/{filename}"
-    
-    return str(file_path), url_path
+    match = _OBJECT_KEY.match(key or "")
+    return match.group(1) if match else None
 
 
 def ensure_upload_directories():
     """
-    Ensure the base uploads directory exists.
+    Ensure the local uploads and staging directories exist.
     """
-    upload_dir = Path("static") / "uploads"
-    upload_dir.mkdir(parents=True, exist_ok=True)
+    root = Path(settings.STORAGE_LOCAL_ROOT)
+    for directory in (root / "objects", root / ".staging"):
+        directory.mkdir(parents=True, exist_ok=True)
@@ -1,17 +1,20 @@
 from fastapi import APIRouter, Request, Depends, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
+from app.utils.assets import asset_url
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import Optional
 
 from app.db.session import get_session
+from app.db.replicas import get_read_session
 from app.models.user import User
 from app.models.blog import Notification
 from app.web.routes import get_current_user_from_cookie
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = asset_url
 
 # Notification routes
 
@@ -19,7 +22,7 @@ templates = Jinja2Templates(directory="templates")
 async def notifications_page(
     request: Request,
     user: Optional[User] = Depends(get_current_user_from_cookie),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     if not user:
         return RedirectResponse(url="/login")
@@ -1,17 +1,23 @@
 from fastapi import APIRouter, Request, Depends, HTTPException, status, Body
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
+from app.utils.assets import asset_url
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import Optional
 
+from app.core.rate_limit import rate_limit
 from app.db.session import get_session
+from app.db.replicas import get_read_session
 from app.models.user import User
 from app.models.blog import Post, Category, Tag, PostCategory, PostTag, PostComment, PostLike, PostShare, Notification
 from app.web.routes import get_current_user_from_cookie
+from app.services import posts as post_service
+from app.services.uploads import purge_released, release_upload
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = asset_url
 
 # Post view and social interaction routes
 
@@ -20,7 +26,7 @@ async def view_post(
     post_id: int,
     request: Request,
     user: Optional[User] = Depends(get_current_user_from_cookie),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     # Get post
     post = await session.get(Post, post_id)
@@ -102,7 +108,7 @@ async def view_post(
         "user_liked": user_liked
     })
 
-@router.post("/posts/{post_id}/like")
+@router.post("/posts/{post_id}/like", dependencies=[rate_limit("toggle_like")])
 async def toggle_like(
     post_id: int,
     user: Optional[User] = Depends(get_current_user_from_cookie),
@@ -111,45 +117,11 @@ async def toggle_like(
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Check if already liked
-    like_query = select(PostLike).where(
-        PostLike.post_id == post_id,
-        PostLike.user_id == user.id
-    )
-    result = await session.execute(like_query)
-    existing_like = result.scalars().first()
-    
-    if existing_like:
-        # Unlike
-        await session.delete(existing_like)
-        await session.commit()
-        liked = False
-    else:
-        # Like
-        new_like = PostLike(post_id=post_id, user_id=user.id)
-        session.add(new_like)
-        await session.commit()
-        liked = True
-        
-        # Create notification for post author
-        post = await session.get(Post, post_id)
-        if post and post.author_id != user.id:
-            notification = Notification(
-                user_id=post.author_id,
-                actor_id=user.id,
-                type="like",
-                content=f"{user.full_name} liked your post",
-                post_id=post_id
-            )
-            session.add(notification)
-            await session.commit()
-    
-    # Get updated like count
-    count_query = select(PostLike).where(PostLike.post_id == post_id)
-    count_result = await session.execute(count_query)
-    like_count = len(count_result.scalars().all())
+    state = await post_service.toggle_like(session, post_id, user.id, user.full_name)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Post not found")
     
-    return {"liked": liked, "like_count": like_count}
+    return {"liked": state.liked, "like_count": state.like_count}
 
 @router.post("/posts/{post_id}/share")
 async def share_post(
@@ -179,7 +151,7 @@ async def share_post(
     await session.commit()
     return {"message": "Post shared successfully"}
 
-@router.post("/posts/{post_id}/comment")
+@router.post("/posts/{post_id}/comment", dependencies=[rate_limit("add_comment")])
 async def add_comment(
     post_id: int,
     data: dict = Body(...),
@@ -262,7 +234,9 @@ async def delete_post(
     if user.role != "admin" and post.author_id != user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    await release_upload(session, post.image_url)
     await session.delete(post)
     await session.commit()
+    await purge_released(session)
     
     return {"message": "Post deleted successfully"}
@@ -1,14 +1,14 @@
-from fastapi import APIRouter, Request, Depends, Form, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Request, Depends, Form, HTTPException, status, UploadFile, File
 from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-import os
 
 from app.db.session import get_session
 from app.models.user import User
 from app.web.routes import get_current_user_from_cookie
-from app.services.auth import get_password_hash, verify_password
-from app.utils.upload_helper import get_user_profile_upload_path
+from app.services.auth import get_password_hash_async, verify_password_async
+from app.services import images
+from app.services.uploads import purge_released, release_upload, save_upload
 
 router = APIRouter()
 
@@ -37,6 +37,7 @@ async def update_profile_web(
 @router.post("/profile/avatar")
 async def upload_avatar_web(
     request: Request,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     user: Optional[User] = Depends(get_current_user_from_cookie),
     session: AsyncSession = Depends(get_session)
@@ -44,20 +45,19 @@ async def upload_avatar_web(
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Save file with structured path
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"avatar{file_extension}"
+    # Take the new reference before dropping the old one: re-uploading the
+    # same image must not delete it
+    stored = await save_upload(session, file, "avatar")
+    await release_upload(session, user.profile_image_url)
     
-    # Use structured upload path
-    file_path, url_path = get_user_profile_upload_path(user.id, unique_filename)
-    
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
-    
-    user.profile_image_url = url_path
+    if stored.url != user.profile_image_url:
+        user.profile_image_url = stored.url
+        user.profile_image_variants = None
     session.add(user)
     await session.commit()
+    await purge_released(session)
+    if not user.profile_image_variants:
+        background_tasks.add_task(images.process_avatar, user.id, stored.key, stored.url)
     
     return {"profile_image_url": user.profile_image_url}
 
@@ -73,11 +73,11 @@ async def change_password_web(
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     # Verify old password
-    if not verify_password(old_password, user.hashed_password):
+    if not await verify_password_async(old_password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect old password")
     
     # Update password
-    user.hashed_password = get_password_hash(new_password)
+    user.hashed_password = await get_password_hash_async(new_password)
     session.add(user)
     await session.commit()
     
@@ -0,0 +1,112 @@
+"""
+Recall vs. size for the embedding storage encodings.
+
+Builds a synthetic corpus with low-rank cluster structure (similar to real text
+embeddings), computes exact cosine top-k with float32 vectors, and measures how
+much of that top-k survives int8 quantization and PCA reduction.
+
+    python -m benchmarks.embedding_recall --docs 20000 --queries 200 --dim 1536
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.models.embedding import Embedding, FLOAT32
+from app.services.vector_codec import PCAReducer
+
+
+def make_corpus(n_docs: int, n_queries: int, dim: int, rank: int, seed: int):
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((rank, dim)).astype(FLOAT32)
+    weights = rng.standard_normal((n_docs + n_queries, rank)).astype(FLOAT32)
+    noise = 0.05 * rng.standard_normal((n_docs + n_queries, dim)).astype(FLOAT32)
+    vectors = weights @ basis + noise
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors[:n_docs], vectors[n_docs:]
+
+
+def top_k(docs: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    docs = docs / np.linalg.norm(docs, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ docs.T
+    return np.argpartition(-scores, k, axis=1)[:, :k]
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def int8_roundtrip(vectors: np.ndarray) -> np.ndarray:
+    # Per-vector scale does not change cosine ranking, so score on the raw codes
+    return np.stack([
+        Embedding.from_numpy(v).quantize().to_numpy().astype(FLOAT32) for v in vectors
+    ])
+
+
+def run(n_docs: int, n_queries: int, dim: int, rank: int, k: int, pca_dims: list[int], seed: int) -> list[dict]:
+    docs, queries = make_corpus(n_docs, n_queries, dim, rank, seed)
+    truth = top_k(docs, queries, k)
+    results = []
+
+    def record(name: str, bytes_per_vector: int, found: np.ndarray, elapsed: float):
+        results.append({
+            "encoding": name,
+            "bytes_per_vector": bytes_per_vector,
+            "compression": round(dim * 4 / bytes_per_vector, 2),
+            f"recall@{k}": round(recall(found, truth), 4),
+            "encode_seconds": round(elapsed, 3),
+        })
+
+    json_size = len(json.dumps(docs[0].tolist()))
+    record("json list[float]", json_size, truth, 0.0)
+    record("float32", dim * 4, truth, 0.0)
+
+    start = time.perf_counter()
+    found = top_k(int8_roundtrip(docs), int8_roundtrip(queries), k)
+    record("int8", dim + 4, found, time.perf_counter() - start)
+
+    for n_components in pca_dims:
+        start = time.perf_counter()
+        sample = docs[np.random.default_rng(seed).choice(n_docs, min(n_docs, 4 * n_components + 1000), replace=False)]
+        reducer = PCAReducer.fit(sample, n_components)
+        reduced_docs = reducer.transform_many(docs)
+        reduced_queries = reducer.transform_many(queries)
+        elapsed = time.perf_counter() - start
+        record(f"pca{n_components}/float32", n_components * 4, top_k(reduced_docs, reduced_queries, k), elapsed)
+
+        start = time.perf_counter()
+        found = top_k(int8_roundtrip(reduced_docs), int8_roundtrip(reduced_queries), k)
+        record(f"pca{n_components}/int8", n_components + 4, found, elapsed + time.perf_counter() - start)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--rank", type=int, default=96, help="intrinsic dimensionality of the synthetic corpus")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--pca", type=int, nargs="*", default=[512, 256, 128])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.docs, args.queries, args.dim, args.rank, args.k, args.pca, args.seed)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    recall_key = f"recall@{args.k}"
+    print(f"{'encoding':<20} {'bytes/vec':>10} {'x smaller':>10} {recall_key:>10} {'encode s':>9}")
+    for row in results:
+        print(f"{row['encoding']:<20} {row['bytes_per_vector']:>10} {row['compression']:>10} "
+              f"{row[recall_key]:>10} {row['encode_seconds']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Load tests against a running server.
+
+1. Generate a dataset (bulk inserted into the configured database):
+
+       python -m benchmarks.loadtest.dataset --users 2000 --posts 10000 --manifest loadtest.json
+
+2. Drive the API and record throughput and latency percentiles per scenario
+   (the server must run with RATE_LIMIT_ENABLED=false):
+
+       python -m benchmarks.loadtest.run --manifest loadtest.json --base-url http://localhost:8000 \\
+           --duration 30 --concurrency 50 --out results.json
+
+3. Compare with the results of an earlier run, e.g. on the main branch
+   (exit status 1 on regression):
+
+       python -m benchmarks.loadtest.run ... --baseline results.json --tolerance 0.1
+
+4. Hold thousands of notification websockets open and measure delivery
+   latency, memory per connection, CPU per worker and Redis connections
+   (needs `pip install websockets`):
+
+       python -m benchmarks.loadtest.websocket --manifest loadtest.json --connections 5000 \\
+           --rate 500 --server-pid <worker pids> --out ws.json
+
+5. Compare event loops: start `python -m app.server` once per loop (asyncio,
+   uvloop) and run the scenarios against each:
+
+       python -m benchmarks.loadtest.loops --manifest loadtest.json --loops asyncio,uvloop --out loops.json
+
+The dataset is deterministic for a given --seed, and the runner draws its
+requests from a seeded generator, so two runs on the same build issue the
+same requests.
+"""
@@ -0,0 +1,241 @@
+"""
+Synthetic dataset for the load tests.
+
+Generates users, tags, posts, likes, comments and notifications with the
+skew real blogs have: a few authors write most posts, and likes and
+comments follow a Zipf distribution over posts, so a handful of posts are
+hot and most get little traffic. Rows are appended after the existing ids
+and bulk loaded with COPY on asyncpg (executemany elsewhere), then the id
+sequences are moved past them.
+
+Every generated user shares one password (hashed once), recorded with the
+id ranges in the manifest the load runner reads:
+
+    python -m benchmarks.loadtest.dataset --users 2000 --posts 10000 --seed 1 --manifest loadtest.json
+"""
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import DateTime, func, insert, select, text
+
+from app.models.blog import Notification, Post, PostComment, PostLike, PostTag, Tag
+from app.models.user import User
+
+PASSWORD = "loadtest-password"
+EMAIL_DOMAIN = "loadtest.invalid"
+WORDS = (
+    "vector search embeddings latency python fastapi postgres index cache redis "
+    "queue worker async feed ranking model prompt tokens deploy scale shard replica "
+    "benchmark profile trace metric design api schema query plan"
+).split()
+
+# Table -> (columns, rows), in insert order
+Tables = Dict[str, Tuple[List[str], List[tuple]]]
+
+
+@dataclass
+class DatasetSpec:
+    users: int = 1000
+    posts: int = 5000
+    tags: int = 200
+    seed: int = 1
+    like_skew: float = 1.7  # Zipf exponent over posts; lower = heavier tail of hot posts
+    comment_skew: float = 2.0
+    max_likes_per_post: int = 500
+    max_comments_per_post: int = 200
+    reply_fraction: float = 0.3
+    notify_fraction: float = 0.5  # share of likes/comments that produce a notification
+    days: int = 365
+
+
+@dataclass
+class IdOffsets:
+    user: int = 0
+    tag: int = 0
+    post: int = 0
+    postlike: int = 0
+    postcomment: int = 0
+    notification: int = 0
+
+
+def _sentence(rng: np.random.Generator, words: int) -> str:
+    return " ".join(rng.choice(WORDS, size=words))
+
+
+def _zipf_counts(rng: np.random.Generator, n: int, exponent: float, cap: int) -> np.ndarray:
+    # Random popularity order, so hot posts aren't simply the newest ones
+    return np.minimum(rng.zipf(exponent, size=n) - 1, cap)
+
+
+def generate(spec: DatasetSpec, offsets: IdOffsets, hashed_password: str, now: datetime) -> Tables:
+    """All rows for the dataset; deterministic for a given spec, offsets and `now`."""
+    rng = np.random.default_rng(spec.seed)
+    run = f"lt{offsets.user}"
+    user_ids = np.arange(offsets.user + 1, offsets.user + spec.users + 1)
+
+    users = [
+        (int(uid), f"{run}-user{i}@{EMAIL_DOMAIN}", f"Load User {i}", "USER", True, hashed_password)
+        for i, uid in enumerate(user_ids)
+    ]
+    tags = [
+        (offsets.tag + i + 1, f"Tag {i}", f"{run}-tag-{i}")
+        for i in range(spec.tags)
+    ]
+
+    # A few prolific authors: author popularity is Zipf too
+    author_weights = 1.0 / np.arange(1, spec.users + 1) ** 1.1
+    author_weights /= author_weights.sum()
+    authors = rng.choice(user_ids, size=spec.posts, p=author_weights)
+    ages = rng.uniform(0, spec.days * 86400, size=spec.posts)
+    published = rng.random(spec.posts) < 0.9
+
+    posts, post_tags = [], []
+    for i in range(spec.posts):
+        post_id = offsets.post + i + 1
+        created = now - timedelta(seconds=float(ages[i]))
+        posts.append((
+            post_id, int(authors[i]), _sentence(rng, 6).capitalize(), _sentence(rng, 40),
+            bool(published[i]), created, created, created if published[i] else None,
+        ))
+        for tag_index in rng.choice(spec.tags, size=int(rng.integers(1, 6)), replace=False):
+            post_tags.append((post_id, offsets.tag + int(tag_index) + 1))
+
+    likes, comments, notifications = [], [], []
+    like_counts = _zipf_counts(rng, spec.posts, spec.like_skew, min(spec.max_likes_per_post, spec.users))
+    comment_counts = _zipf_counts(rng, spec.posts, spec.comment_skew, spec.max_comments_per_post)
+
+    def notify(recipient: int, actor: int, kind: str, post_id: int, comment_id, created: datetime):
+        if recipient != actor and rng.random() < spec.notify_fraction:
+            content = f"Load User {actor - offsets.user - 1} {'liked' if kind == 'like' else 'commented on'} your post"
+            notifications.append((
+                offsets.notification + len(notifications) + 1, recipient, actor, kind, content,
+                post_id, comment_id, bool(rng.random() < 0.5), created,
+            ))
+
+    for i in range(spec.posts):
+        post_id, author = posts[i][0], posts[i][1]
+        created = posts[i][5]
+        for liker in rng.choice(user_ids, size=int(like_counts[i]), replace=False):
+            at = created + timedelta(seconds=float(rng.uniform(0, 7 * 86400)))
+            likes.append((offsets.postlike + len(likes) + 1, post_id, int(liker), at))
+            notify(author, int(liker), "like", post_id, None, at)
+
+        top_level = []
+        for _ in range(int(comment_counts[i])):
+            comment_id = offsets.postcomment + len(comments) + 1
+            commenter = int(rng.choice(user_ids))
+            parent = int(rng.choice(top_level)) if top_level and rng.random() < spec.reply_fraction else None
+            at = created + timedelta(seconds=float(rng.uniform(0, 7 * 86400)))
+            comments.append((comment_id, post_id, commenter, parent, _sentence(rng, 12), at, at))
+            if parent is None:
+                top_level.append(comment_id)
+            notify(author, commenter, "comment", post_id, comment_id, at)
+
+    return {
+        "user": (["id", "email", "full_name", "role", "is_active", "hashed_password"], users),
+        "tag": (["id", "title", "slug"], tags),
+        "post": (["id", "author_id", "title", "summary", "published", "created_at", "updated_at", "published_at"], posts),
+        "posttag": (["post_id", "tag_id"], post_tags),
+        "postlike": (["id", "post_id", "user_id", "created_at"], likes),
+        "postcomment": (["id", "post_id", "user_id", "parent_id", "content", "created_at", "updated_at"], comments),
+        "notification": (["id", "user_id", "actor_id", "type", "content", "post_id", "comment_id", "read", "created_at"], notifications),
+    }
+
+
+MODELS = {
+    "user": User, "tag": Tag, "post": Post, "posttag": PostTag,
+    "postlike": PostLike, "postcomment": PostComment, "notification": Notification,
+}
+
+
+async def current_offsets(conn) -> IdOffsets:
+    offsets = {}
+    for name in ("user", "tag", "post", "postlike", "postcomment", "notification"):
+        model = MODELS[name]
+        offsets[name] = (await conn.execute(select(func.coalesce(func.max(model.id), 0)))).scalar()
+    return IdOffsets(**offsets)
+
+
+def _is_naive_timestamp(column) -> bool:
+    column_type = getattr(column.type, "impl", column.type)
+    return isinstance(column_type, DateTime) and not column_type.timezone
+
+
+async def bulk_insert(conn, table: str, columns: List[str], rows: List[tuple], batch_size: int = 5000):
+    if not rows:
+        return
+    if conn.dialect.driver == "asyncpg":
+        # COPY skips SQLAlchemy's bind processing: naive UTC for timestamp columns
+        naive = {i for i, name in enumerate(columns) if _is_naive_timestamp(MODELS[table].__table__.c[name])}
+        if naive:
+            rows = [
+                tuple(value.replace(tzinfo=None) if i in naive and value is not None else value for i, value in enumerate(row))
+                for row in rows
+            ]
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(table, records=rows, columns=columns)
+        return
+    statement = insert(MODELS[table].__table__)
+    for start in range(0, len(rows), batch_size):
+        await conn.execute(statement, [dict(zip(columns, row)) for row in rows[start:start + batch_size]])
+
+
+async def reset_sequences(conn):
+    if conn.dialect.name != "postgresql":
+        return
+    for name in ("user", "tag", "post", "postlike", "postcomment", "notification"):
+        await conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{name}\"', 'id'), (SELECT coalesce(max(id), 1) FROM \"{name}\"))"
+        ))
+
+
+async def build(spec: DatasetSpec, manifest_path: str):
+    from app.db.session import engine
+    from app.services.auth import get_password_hash
+
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        offsets = await current_offsets(conn)
+        tables = generate(spec, offsets, get_password_hash(PASSWORD), datetime.now(timezone.utc))
+        generated = time.perf_counter()
+        for table, (columns, rows) in tables.items():
+            await bulk_insert(conn, table, columns, rows)
+        await reset_sequences(conn)
+    await engine.dispose()
+
+    counts = {table: len(rows) for table, (_, rows) in tables.items()}
+    manifest = {
+        "spec": asdict(spec),
+        "password": PASSWORD,
+        "emails": [row[1] for row in tables["user"][1]],
+        "user_ids": [row[0] for row in tables["user"][1]],
+        "post_ids": [row[0] for row in tables["post"][1] if row[4]],
+        "counts": counts,
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    print(f"Generated in {generated - started:.1f}s, loaded in {time.perf_counter() - generated:.1f}s: {counts}")
+    print(f"Manifest written to {manifest_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--tags", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--manifest", default="loadtest.json", help="where to write ids and credentials for the runner")
+    args = parser.parse_args()
+
+    spec = DatasetSpec(users=args.users, posts=args.posts, tags=args.tags, seed=args.seed)
+    asyncio.run(build(spec, args.manifest))
+
+
+if __name__ == "__main__":
+    main()
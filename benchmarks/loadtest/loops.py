@@ -0,0 +1,170 @@
+"""
+asyncio vs uvloop (and h11 vs httptools) on the API endpoints.
+
+For each --loops entry this starts `python -m app.server` with one worker on
+--port and waits for its warmup to finish. It then runs the benchmarks.loadtest.run
+scenarios against it with the same seed, so every server gets the same
+requests, and stops it. Besides throughput and latency it reads the server's
+CPU time from /proc. CPU ms per request is the number to compare when the
+client, not the server, saturates first.
+
+The server uses the configured database (DATABASE_URL), loaded with
+benchmarks.loadtest.dataset:
+
+    python -m benchmarks.loadtest.loops --manifest loadtest.json --loops asyncio,uvloop \\
+        --duration 20 --concurrency 32 --out loops.json
+
+Each server gets a single worker, so this measures one core. On a shared host,
+pin the client elsewhere (e.g. `taskset -c 1 python -m benchmarks.loadtest.loops
+--server-cpus 0 ...`). uvloop and httptools come with `pip install
+insightblog[server]`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.loadtest.run import MIX, Workload, git_revision, run_scenario
+from benchmarks.loadtest.websocket import process_sample
+
+# "feed" needs OpenAI and Vespa, which would dominate the timings
+DEFAULT_SCENARIOS = [name for name in MIX if name != "feed"]
+
+
+def start_server(loop: str, http: str, port: int, cpus: Optional[List[int]]) -> subprocess.Popen:
+    command = [sys.executable, "-m", "app.server", "--workers", "1", "--host", "127.0.0.1", "--port", str(port), "--loop", loop, "--http", http]
+    preexec = (lambda: os.sched_setaffinity(0, cpus)) if cpus else None
+    # One client IP issues every request; rate limits would turn the writes into 429s
+    env = {**os.environ, "RATE_LIMIT_ENABLED": "false"}
+    return subprocess.Popen(command, env=env, preexec_fn=preexec, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+
+async def wait_until_warm(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float):
+    """Until /readyz stops saying "starting" (it may stay 503 if Redis is down)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with {server.returncode}:\n{server.stderr.read()}")
+        try:
+            if (await client.get("/readyz")).json().get("status") != "starting":
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"server not warm after {timeout:.0f}s")
+
+
+async def bench_loop(args, manifest: dict, loop: str) -> Dict[str, dict]:
+    server = start_server(loop, args.http, args.port, args.server_cpus)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=args.timeout) as client:
+            await wait_until_warm(client, server, args.startup_timeout)
+            workload = Workload(manifest, args.seed)
+            for email in manifest["emails"][:args.sessions]:
+                response = await workload.login(client, email)
+                response.raise_for_status()
+                workload.tokens.append(response.json()["access_token"])
+
+            results = {}
+            for name in args.scenarios.split(","):
+                print(f"{loop}: running {name} for {args.duration:.0f}s with {args.concurrency} workers...", file=sys.stderr)
+                cpu_before = process_sample(server.pid)["cpu_seconds"]
+                summary = (await run_scenario(client, name, workload, args.concurrency, args.duration, args.warmup))[name]
+                cpu = process_sample(server.pid)["cpu_seconds"] - cpu_before
+                # The CPU delta includes the unmeasured warmup requests; close enough when warmup << duration
+                summary["server_cpu_ms_per_request"] = round(cpu * 1000 / max(summary["requests"], 1), 3)
+                results[name] = summary
+            return results
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=args.startup_timeout)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def speedups(loops: Dict[str, Dict[str, dict]], baseline: str) -> Dict[str, Dict[str, float]]:
+    """Throughput of each loop relative to `baseline`, per scenario."""
+    table = {}
+    for loop, scenarios in loops.items():
+        if loop == baseline:
+            continue
+        table[loop] = {
+            name: round(row["rps"] / loops[baseline][name]["rps"], 3)
+            for name, row in scenarios.items()
+            if loops[baseline].get(name, {}).get("rps")
+        }
+    return table
+
+
+async def run(args) -> dict:
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    loops = {}
+    for loop in args.loops.split(","):
+        loops[loop] = await bench_loop(args, manifest, loop)
+    baseline = args.loops.split(",")[0]
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "http": args.http,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "seed": args.seed,
+            "dataset": manifest["counts"],
+        },
+        "loops": loops,
+        "speedup_vs_" + baseline: speedups(loops, baseline),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", default="loadtest.json", help="written by benchmarks.loadtest.dataset")
+    parser.add_argument("--loops", default="asyncio,uvloop", help="comma-separated; the first is the baseline")
+    parser.add_argument("--http", default="auto", choices=["auto", "httptools", "h11"])
+    parser.add_argument("--scenarios", default=",".join(DEFAULT_SCENARIOS), help="comma-separated: " + ", ".join(MIX))
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before each scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--sessions", type=int, default=50, help="users logged in up front for authenticated scenarios")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--server-cpus", type=lambda value: [int(cpu) for cpu in value.split(",")], help="pin the server to these CPUs, e.g. 0 or 0,1")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'loop':<9} {'scenario':<14} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'cpu ms/req':>11} {'errors':>7}")
+    for loop, scenarios in results["loops"].items():
+        for name, row in scenarios.items():
+            print(f"{loop:<9} {name:<14} {row['rps']:>9} {row['p50_ms']:>9} {row['p99_ms']:>9} {row['server_cpu_ms_per_request']:>11} {row['errors']:>7}")
+    for key, table in results.items():
+        if key.startswith("speedup_vs_"):
+            for loop, ratios in table.items():
+                print(f"{loop} throughput {key.replace('_', ' ')}: " + ", ".join(f"{name} {ratio:.2f}x" for name, ratio in ratios.items()))
+
+
+if __name__ == "__main__":
+    main()
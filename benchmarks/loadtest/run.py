@@ -0,0 +1,245 @@
+"""
+Closed-loop asyncio load generator for the main API endpoints.
+
+Each scenario runs on its own for --duration seconds (after --warmup) with
+--concurrency workers issuing requests back to back; "mixed" interleaves
+the others with production-like weights. Post ids are drawn with a Zipf
+skew, so hot posts get most reads, as they would in production.
+
+Results are written as JSON and can be compared against a previous results
+file; the run exits with status 1 when any scenario regressed by more than
+--tolerance (throughput down, or p95/p99 up):
+
+    python -m benchmarks.loadtest.run --manifest loadtest.json --out results.json
+    python -m benchmarks.loadtest.run --manifest loadtest.json --baseline results.json --tolerance 0.1
+
+Start the server with RATE_LIMIT_ENABLED=false. All requests come from one
+IP, so the per-route limits (login=10/60, toggle_like, add_comment) would
+stop the session logins after ten and turn most writes into 429s. The run
+aborts if a login is rate limited.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+API = "/api/v1"
+INTERESTS = ["python async", "vector search", "postgres tuning", "llm prompts", "fastapi deploys"]
+# Relative weights of the "mixed" scenario
+MIX = {"list_posts": 40, "get_post": 35, "feed": 10, "toggle_like": 8, "add_comment": 5, "login": 2}
+
+
+@dataclass
+class Stats:
+    latencies: List[float] = field(default_factory=list)  # seconds
+    errors: int = 0
+    statuses: Dict[int, int] = field(default_factory=dict)
+
+    def record(self, seconds: float, status: int):
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> dict:
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "rps": round(len(self.latencies) / elapsed, 1),
+            "mean_ms": round(float(latencies.mean()), 2),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(latencies.max()), 2),
+            "statuses": {str(code): count for code, count in sorted(self.statuses.items())},
+        }
+
+
+class Workload:
+    """Request builders for each scenario, drawing ids and users from the manifest."""
+
+    def __init__(self, manifest: dict, seed: int, zipf: float = 1.3):
+        self.manifest = manifest
+        self.rng = np.random.default_rng(seed)
+        self.post_ids = manifest["post_ids"]
+        # Popularity rank -> post; a fixed shuffle so the hot set is stable across runs
+        self.post_order = np.random.default_rng(manifest["spec"]["seed"]).permutation(len(self.post_ids))
+        self.zipf = zipf
+        self.tokens: List[str] = []
+
+    def post_id(self) -> int:
+        rank = min(int(self.rng.zipf(self.zipf)) - 1, len(self.post_ids) - 1)
+        return self.post_ids[int(self.post_order[rank])]
+
+    def token(self) -> str:
+        return self.tokens[int(self.rng.integers(len(self.tokens)))]
+
+    def email(self) -> str:
+        emails = self.manifest["emails"]
+        return emails[int(self.rng.integers(len(emails)))]
+
+    async def login(self, client: httpx.AsyncClient, email: Optional[str] = None) -> httpx.Response:
+        return await client.post(f"{API}/users/login", data={"username": email or self.email(), "password": self.manifest["password"]})
+
+    def scenarios(self) -> Dict[str, Callable]:
+        def auth() -> dict:
+            return {"Authorization": f"Bearer {self.token()}"}
+
+        return {
+            "list_posts": lambda c: c.get(f"{API}/posts/", params={"skip": int(self.rng.integers(0, 5)) * 20, "limit": 20}, headers=auth()),
+            "get_post": lambda c: c.get(f"{API}/posts/{self.post_id()}", headers=auth()),
+            "toggle_like": lambda c: c.post(f"{API}/posts/{self.post_id()}/like", headers=auth()),
+            "add_comment": lambda c: c.post(f"{API}/posts/{self.post_id()}/comments", headers=auth(), json={"content": "load test comment"}),
+            "feed": lambda c: c.get(f"{API}/feed/", params={"user_id": str(int(self.rng.integers(1000))), "interests": INTERESTS[int(self.rng.integers(len(INTERESTS)))]}),
+            "login": lambda c: self.login(c),
+        }
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, workload: Workload, concurrency: int, duration: float, warmup: float) -> Dict[str, dict]:
+    scenarios = workload.scenarios()
+    names, weights = list(MIX), np.array(list(MIX.values()), dtype=float)
+    weights /= weights.sum()
+    stats: Dict[str, Stats] = {}
+    recording = False
+    deadline = time.perf_counter() + warmup + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            op = names[workload.rng.choice(len(names), p=weights)] if name == "mixed" else name
+            start = time.perf_counter()
+            try:
+                status = (await scenarios[op](client)).status_code
+            except httpx.HTTPError:
+                status = 599
+            if recording:
+                stats.setdefault(op, Stats()).record(time.perf_counter() - start, status)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    await asyncio.sleep(warmup)
+    recording = True
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    results = {op: s.summary(elapsed) for op, s in sorted(stats.items())}
+    if name == "mixed":
+        total = Stats()
+        for s in stats.values():
+            total.latencies.extend(s.latencies)
+            total.errors += s.errors
+            for code, count in s.statuses.items():
+                total.statuses[code] = total.statuses.get(code, 0) + count
+        return {"mixed": total.summary(elapsed), **{f"mixed.{op}": summary for op, summary in results.items()}}
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Human-readable regressions of `results` against `baseline`."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous or not previous["requests"]:
+            continue
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['rps']} -> {current['rps']} req/s")
+        for key in ("p95_ms", "p99_ms"):
+            if current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {previous[key]} -> {current[key]}")
+        if current["errors"] > previous["errors"] and current["errors"] > current["requests"] * 0.01:
+            regressions.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    workload = Workload(manifest, args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        # A pool of sessions for the authenticated scenarios
+        for email in manifest["emails"][:args.sessions]:
+            response = await workload.login(client, email)
+            if response.status_code == 429:
+                raise SystemExit("Login was rate limited: start the server with RATE_LIMIT_ENABLED=false")
+            response.raise_for_status()
+            workload.tokens.append(response.json()["access_token"])
+
+        scenarios = {}
+        for name in args.scenarios.split(","):
+            print(f"Running {name} for {args.duration:.0f}s with {args.concurrency} workers...", file=sys.stderr)
+            scenarios.update(await run_scenario(client, name, workload, args.concurrency, args.duration, args.warmup))
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "seed": args.seed,
+            "dataset": manifest["counts"],
+        },
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", default="loadtest.json", help="written by benchmarks.loadtest.dataset")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenarios", default=",".join([*MIX, "mixed"]), help="comma-separated: " + ", ".join([*MIX, "mixed"]))
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before each scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--sessions", type=int, default=50, help="users logged in up front for authenticated scenarios")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative regression")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'scenario':<24} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for name, row in results["scenarios"].items():
+            print(f"{name:<24} {row['rps']:>9} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} {row['errors']:>7}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Load harness for realtime notification delivery over /api/v1/ws/notifications.
+
+Opens --connections authenticated websockets (tokens are minted locally with
+the server's SECRET_KEY for users from the dataset manifest; users are reused
+round-robin when there are more connections than users), then publishes
+notifications at --rate per second through the presence registry, as the
+app does (app.services.realtime: only the workers holding the user's
+sockets receive each message).
+Every payload carries its send time, so each client measures delivery
+latency as it reads.
+
+Scenarios:
+
+    steady          every client reads as fast as it can
+    slow_consumer   --slow-fraction of the clients sleep --slow-delay after each
+                    message; latency is reported separately for the fast and
+                    slow clients, to show whether slow readers hold up others
+
+Alongside latency the run records, for each --server-pid (one per worker):
+resident memory before and after connecting, which gives memory per
+connection, and CPU seconds used while publishing. Redis `INFO clients` is
+sampled at the same points for the connection count. Run it on the same host
+as the server and Redis:
+
+    python -m benchmarks.loadtest.websocket --manifest loadtest.json --connections 5000 \\
+        --rate 500 --server-pid $(pgrep -d, -f "uvicorn main:app") --out ws.json
+
+Needs the `websockets` client library (pip install websockets) and, for
+thousands of sockets, a file descriptor limit to match on both sides.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+import redis.asyncio as redis
+
+from app.core.config import get_settings
+from app.services.realtime import PresenceRegistry
+from benchmarks.loadtest.run import git_revision
+
+API = "/api/v1"
+SCENARIOS = ("steady", "slow_consumer")
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+@dataclass
+class Client:
+    user_id: int
+    slow: bool = False
+    latencies: List[float] = field(default_factory=list)  # seconds
+    received: int = 0
+    closed: Optional[str] = None
+
+
+def latency_summary(latencies: List[float]) -> dict:
+    if not latencies:
+        return {"messages": 0}
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "messages": len(values),
+        "mean_ms": round(float(values.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(values.max()), 2),
+    }
+
+
+def process_sample(pid: int) -> dict:
+    """Resident memory and CPU seconds used so far, from /proc (Linux only)."""
+    with open(f"/proc/{pid}/stat") as f:
+        # Fields after the parenthesised command name; utime and stime are 14th and 15th overall
+        fields = f.read().rpartition(")")[2].split()
+    rss_kb = 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss_kb = int(line.split()[1])
+                break
+    return {"rss_bytes": rss_kb * 1024, "cpu_seconds": (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS}
+
+
+def sample_processes(pids: List[int]) -> Dict[int, dict]:
+    return {pid: process_sample(pid) for pid in pids}
+
+
+async def redis_clients(client: redis.Redis) -> dict:
+    info = await client.info("clients")
+    return {key: value for key, value in info.items() if key in ("connected_clients", "blocked_clients", "pubsub_clients", "client_recent_max_output_buffer")}
+
+
+def raise_fd_limit(wanted: int):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < wanted:
+        target = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        if target < wanted:
+            print(f"File descriptor limit is {target}; fewer than {wanted} sockets may open", file=sys.stderr)
+
+
+async def consume(ws, client: Client, slow_delay: float):
+    try:
+        async for raw in ws:
+            received = time.time()
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                continue
+            if "sent_at" in message:
+                client.latencies.append(received - message["sent_at"])
+                client.received += 1
+            if client.slow:
+                await asyncio.sleep(slow_delay)
+    except Exception as e:
+        client.closed = type(e).__name__
+
+
+async def open_connections(args, manifest: dict, slow_every: int) -> tuple:
+    from websockets.asyncio.client import connect  # optional dependency: only the harness needs it
+
+    from app.services.auth import create_access_token
+
+    emails, user_ids = manifest["emails"], manifest["user_ids"]
+    clients, sockets, readers, failures, connect_times = [], [], [], 0, []
+    base = args.base_url.rstrip("/")
+    interval = 1.0 / args.ramp if args.ramp else 0.0
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+
+    async def open_one(i: int):
+        nonlocal failures
+        index = i % len(emails)
+        client = Client(user_ids[index], slow=bool(slow_every) and i % slow_every == 0)
+        token = create_access_token({"sub": emails[index]})
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ws = await connect(f"{base}{API}/ws/notifications?token={token}", open_timeout=args.timeout, max_queue=None)
+            except Exception:
+                failures += 1
+                return
+        connect_times.append(time.perf_counter() - started)
+        clients.append(client)
+        sockets.append(ws)
+        readers.append(asyncio.create_task(consume(ws, client, args.slow_delay)))
+
+    started = time.perf_counter()
+    tasks = []
+    for i in range(args.connections):
+        tasks.append(asyncio.create_task(open_one(i)))
+        if interval:
+            await asyncio.sleep(interval)
+    await asyncio.gather(*tasks)
+    return clients, sockets, readers, failures, connect_times, time.perf_counter() - started
+
+
+async def publish(publisher: redis.Redis, sockets_per_user: Dict[int, int], rate: float, duration: float, seed: int) -> tuple:
+    """
+    Publish to random connected users at `rate` per second.
+
+    Returns (published, worker channels reached, socket deliveries expected):
+    a message that reaches a worker goes to every socket of the user there.
+    """
+    registry = PresenceRegistry(redis=publisher)
+    user_ids = sorted(sockets_per_user)
+    rng = np.random.default_rng(seed)
+    reached, expected, seq = 0, 0, 0
+    interval = 1.0 / rate
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        # Catch up in bursts if a publish fell behind the schedule
+        due = int((time.perf_counter() - started) * rate) + 1
+        while seq < due:
+            user_id = user_ids[int(rng.integers(len(user_ids)))]
+            payload = json.dumps({"type": "loadtest", "seq": seq, "sent_at": time.time()})
+            workers = await registry.publish(user_id, payload)
+            reached += workers
+            if workers:
+                expected += sockets_per_user[user_id]
+            seq += 1
+        await asyncio.sleep(max(0.0, started + seq * interval - time.perf_counter()))
+    return seq, reached, expected
+
+
+async def run_scenario(args, manifest: dict, name: str, pids: List[int], redis_client: redis.Redis) -> dict:
+    slow_every = round(1 / args.slow_fraction) if name == "slow_consumer" and args.slow_fraction > 0 else 0
+    before_connect = sample_processes(pids)
+    redis_before = await redis_clients(redis_client)
+
+    print(f"{name}: opening {args.connections} connections...", file=sys.stderr)
+    clients, sockets, readers, failures, connect_times, ramp_seconds = await open_connections(args, manifest, slow_every)
+    # Give the server a moment to register every socket's presence before publishing
+    await asyncio.sleep(args.settle)
+    connected = sample_processes(pids)
+    redis_connected = await redis_clients(redis_client)
+
+    print(f"{name}: publishing {args.rate:g}/s for {args.duration:.0f}s to {len(clients)} sockets...", file=sys.stderr)
+    sockets_per_user = Counter(c.user_id for c in clients)
+    published_count, reached, expected = await publish(redis_client, sockets_per_user, args.rate, args.duration, args.seed)
+    published = sample_processes(pids)
+    redis_published = await redis_clients(redis_client)
+    # Let in-flight messages arrive before counting losses (slow readers may never catch up)
+    await asyncio.sleep(args.drain)
+
+    for ws in sockets:
+        await ws.close()
+    await asyncio.gather(*readers, return_exceptions=True)
+
+    workers = {}
+    for pid in pids:
+        added = connected[pid]["rss_bytes"] - before_connect[pid]["rss_bytes"]
+        workers[str(pid)] = {
+            "rss_before_mb": round(before_connect[pid]["rss_bytes"] / 2**20, 1),
+            "rss_connected_mb": round(connected[pid]["rss_bytes"] / 2**20, 1),
+            "rss_after_publish_mb": round(published[pid]["rss_bytes"] / 2**20, 1),
+            "cpu_percent_publishing": round((published[pid]["cpu_seconds"] - connected[pid]["cpu_seconds"]) / args.duration * 100, 1),
+            "added_mb": round(added / 2**20, 1),
+        }
+    added_total = sum(connected[pid]["rss_bytes"] - before_connect[pid]["rss_bytes"] for pid in pids)
+    received = sum(c.received for c in clients)
+    fast = [latency for c in clients if not c.slow for latency in c.latencies]
+    slow = [latency for c in clients if c.slow for latency in c.latencies]
+
+    result = {
+        "connections": {
+            "requested": args.connections,
+            "open": len(clients),
+            "failed": failures,
+            "closed_early": sum(1 for c in clients if c.closed),
+            "ramp_seconds": round(ramp_seconds, 2),
+            "connect": latency_summary(connect_times),
+        },
+        "messages": {
+            "published": published_count,
+            "worker_channels_reached": reached,
+            "expected": expected,
+            "received": received,
+            "lost": max(expected - received, 0),
+        },
+        "latency": latency_summary(fast),
+        "workers": workers,
+        "memory_per_connection_kb": round(added_total / len(clients) / 1024, 1) if clients and pids else None,
+        "redis": {"before": redis_before, "connected": redis_connected, "after_publish": redis_published},
+    }
+    if slow_every:
+        result["slow_consumers"] = sum(1 for c in clients if c.slow)
+        result["slow_latency"] = latency_summary(slow)
+    return result
+
+
+async def run(args) -> dict:
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    if "user_ids" not in manifest:
+        sys.exit(f"{args.manifest} has no user_ids; regenerate it with benchmarks.loadtest.dataset")
+    pids = [int(pid) for value in args.server_pid for pid in value.split(",") if pid]
+    raise_fd_limit(args.connections + 256)
+
+    redis_client = redis.Redis.from_url(args.redis_url, decode_responses=True)
+    scenarios = {}
+    try:
+        for name in args.scenarios.split(","):
+            scenarios[name] = await run_scenario(args, manifest, name, pids, redis_client)
+    finally:
+        await redis_client.aclose()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "base_url": args.base_url,
+            "connections": args.connections,
+            "rate": args.rate,
+            "duration": args.duration,
+            "slow_fraction": args.slow_fraction,
+            "slow_delay": args.slow_delay,
+            "server_pids": pids,
+            "seed": args.seed,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", default="loadtest.json", help="written by benchmarks.loadtest.dataset")
+    parser.add_argument("--base-url", default="ws://localhost:8000")
+    parser.add_argument("--redis-url", default=get_settings().REDIS_URL)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated: " + ", ".join(SCENARIOS))
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--ramp", type=float, default=500.0, help="new connections per second (0 = all at once)")
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="handshakes in flight at once")
+    parser.add_argument("--rate", type=float, default=200.0, help="notifications published per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of publishing per scenario")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds between connecting and publishing")
+    parser.add_argument("--drain", type=float, default=3.0, help="seconds to wait for in-flight messages")
+    parser.add_argument("--slow-fraction", type=float, default=0.05, help="share of slow clients in slow_consumer")
+    parser.add_argument("--slow-delay", type=float, default=1.0, help="seconds a slow client sleeps per message")
+    parser.add_argument("--server-pid", action="append", default=[], help="server worker pid(s) to sample; repeat or comma-separate")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, row in results["scenarios"].items():
+        conns, messages, latency = row["connections"], row["messages"], row["latency"]
+        print(f"{name}: {conns['open']}/{conns['requested']} sockets open ({conns['failed']} failed, {conns['closed_early']} dropped)")
+        print(f"  delivered {messages['received']}/{messages['expected']} ({messages['lost']} lost)"
+              f"  latency p50 {latency.get('p50_ms')} ms  p95 {latency.get('p95_ms')} ms  p99 {latency.get('p99_ms')} ms")
+        if "slow_latency" in row:
+            slow = row["slow_latency"]
+            print(f"  {row['slow_consumers']} slow clients: p50 {slow.get('p50_ms')} ms  p99 {slow.get('p99_ms')} ms")
+        if row["memory_per_connection_kb"] is not None:
+            print(f"  memory per connection {row['memory_per_connection_kb']} KB")
+        for pid, worker in row["workers"].items():
+            print(f"  worker {pid}: rss {worker['rss_connected_mb']} MB, cpu {worker['cpu_percent_publishing']}% while publishing")
+        print(f"  redis clients {row['redis']['before'].get('connected_clients')} -> {row['redis']['connected'].get('connected_clients')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Per-request overhead of the request middleware.
+
+Drives a bare ASGI app (one small JSON body) directly, without a server or
+HTTP client, so the difference between rows is the middleware alone:
+
+* no middleware
+* the previous BaseHTTPMiddleware implementation (time.time, f-string log)
+* the pure ASGI RequestMiddleware
+* RequestMiddleware + MetricsMiddleware (route histogram, in-flight gauge)
+
+    python -m benchmarks.middleware_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+
+from app.core.context import request_id_context
+from app.core.logging import logger
+from app.middlwares.logger import RequestMiddleware
+from app.middlwares.metrics import MetricsMiddleware
+
+
+class BaseHTTPRequestMiddleware(BaseHTTPMiddleware):
+    """The implementation RequestMiddleware replaced, kept as the baseline."""
+
+    async def dispatch(self, request, call_next):
+        request_id = str(uuid.uuid4())
+        request_id_context.set(request_id)
+        start_time = time.time()
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-Process-Time"] = str(process_time)
+        logger.info(f"Request: {request.method} {request.url.path} | Status: {response.status_code} | Time: {process_time:.4f}s")
+        return response
+
+
+async def endpoint(scope, receive, send):
+    await JSONResponse({"status": "ok"})(scope, receive, send)
+
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/health",
+    "raw_path": b"/health",
+    "query_string": b"",
+    "root_path": "",
+    "headers": [(b"host", b"test")],
+    "client": ("127.0.0.1", 1234),
+    "server": ("test", 80),
+}
+
+
+async def drive(app, n: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):  # warm up
+        await app(dict(SCOPE), receive, send)
+    start = time.perf_counter_ns()
+    for _ in range(n):
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter_ns() - start) / n / 1000
+
+
+async def run(n: int) -> list[dict]:
+    apps = {
+        "none": endpoint,
+        "BaseHTTPMiddleware (before)": BaseHTTPRequestMiddleware(endpoint),
+        "pure ASGI RequestMiddleware": RequestMiddleware(endpoint),
+        "+ MetricsMiddleware": RequestMiddleware(MetricsMiddleware(endpoint)),
+    }
+    results = []
+    baseline = None
+    for name, app in apps.items():
+        us = await drive(app, n)
+        baseline = us if baseline is None else baseline
+        results.append({"middleware": name, "us_per_request": round(us, 2), "overhead_us": round(us - baseline, 2)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--log", action="store_true", help="keep INFO logging enabled (measures the log line too)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    # Without handlers the log call is still made, just not emitted
+    logger.setLevel(logging.INFO if args.log else logging.WARNING)
+    results = asyncio.run(run(args.requests))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'middleware':<30} {'us/request':>11} {'overhead us':>12}")
+    for row in results:
+        print(f"{row['middleware']:<30} {row['us_per_request']:>11} {row['overhead_us']:>12}")
+
+
+if __name__ == "__main__":
+    main()
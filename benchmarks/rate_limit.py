@@ -0,0 +1,131 @@
+"""
+Token-bucket limiter under load against a real Redis.
+
+Simulates --workers app workers (each a TokenBucketLimiter with its own
+local leases and denial cache) sharing one Redis. --concurrency tasks per
+worker hammer one route for --duration seconds on behalf of --clients
+clients. Reports:
+
+* admitted requests against the most the buckets allow (burst + refill over
+  the run). Admitting more than that would be a correctness bug: the
+  local shortcuts may only make the limit stricter.
+* how many decisions needed a Redis round trip, and decision latency.
+
+Runs with leases off and on, to show what the local pre-check saves. Flat
+out, buckets empty quickly and the denial cache answers most requests; with
+--think the traffic stays under the limit, which is where leases help:
+
+    python -m benchmarks.rate_limit --redis-url redis://localhost:6379/15 --workers 4 --clients 50
+    python -m benchmarks.rate_limit --redis-url redis://localhost:6379/15 --think 0.05
+
+Use a scratch database: the run deletes the ratelimit:bench:* keys.
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+import numpy as np
+import redis.asyncio as redis
+
+from app.core.rate_limit import Rule, TokenBucketLimiter
+
+ROUTE = "bench"
+
+
+class CountingLimiter(TokenBucketLimiter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.redis_calls = 0
+
+    async def _take(self, key, rule):
+        self.redis_calls += 1
+        return await super()._take(key, rule)
+
+
+async def hammer(limiter: TokenBucketLimiter, clients: int, think: float, deadline: float, rng: np.random.Generator, latencies: List[float], counts: dict):
+    while time.perf_counter() < deadline:
+        client = f"ip:10.0.0.{int(rng.integers(clients))}"
+        start = time.perf_counter()
+        decision = await limiter.hit(ROUTE, client)
+        latencies.append(time.perf_counter() - start)
+        counts["allowed" if decision.allowed else "denied"] += 1
+        if think:
+            await asyncio.sleep(think)
+
+
+async def run_case(client: redis.Redis, args, lease: int) -> dict:
+    async for key in client.scan_iter(f"ratelimit:{ROUTE}:*"):
+        await client.delete(key)
+    rule = Rule(args.capacity, args.period)
+    limiters = [CountingLimiter({ROUTE: rule}, redis=client, lease=lease, lease_seconds=args.lease_seconds) for _ in range(args.workers)]
+    latencies: List[float] = []
+    counts = {"allowed": 0, "denied": 0}
+    rng = np.random.default_rng(args.seed)
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        hammer(limiter, args.clients, args.think, deadline, rng, latencies, counts)
+        for limiter in limiters for _ in range(args.concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    ceiling = args.clients * (rule.capacity + rule.capacity * elapsed / rule.period)
+    redis_calls = sum(limiter.redis_calls for limiter in limiters)
+    total = counts["allowed"] + counts["denied"]
+    values = np.array(latencies) * 1e6
+    return {
+        "lease": lease,
+        "decisions": total,
+        "decisions_per_s": round(total / elapsed),
+        "allowed": counts["allowed"],
+        "allowed_ceiling": int(ceiling),
+        "within_limit": counts["allowed"] <= ceiling,
+        "redis_calls": redis_calls,
+        "redis_calls_per_decision": round(redis_calls / max(total, 1), 3),
+        "p50_us": round(float(np.percentile(values, 50)), 1),
+        "p99_us": round(float(np.percentile(values, 99)), 1),
+    }
+
+
+async def run(args) -> List[dict]:
+    client = redis.Redis.from_url(args.redis_url, decode_responses=True)
+    try:
+        return [await run_case(client, args, lease) for lease in (0, args.lease)]
+    finally:
+        async for key in client.scan_iter(f"ratelimit:{ROUTE}:*"):
+            await client.delete(key)
+        await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--workers", type=int, default=4, help="simulated app workers, each with its own local state")
+    parser.add_argument("--concurrency", type=int, default=16, help="tasks per worker")
+    parser.add_argument("--clients", type=int, default=50, help="distinct client IPs")
+    parser.add_argument("--capacity", type=int, default=100, help="bucket size")
+    parser.add_argument("--period", type=float, default=10.0, help="seconds to refill an empty bucket")
+    parser.add_argument("--lease", type=int, default=8)
+    parser.add_argument("--lease-seconds", type=float, default=1.0)
+    parser.add_argument("--think", type=float, default=0.0, help="seconds each task pauses between requests")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'lease':>5} {'decisions/s':>12} {'allowed':>9} {'ceiling':>9} {'redis/decision':>15} {'p50 us':>8} {'p99 us':>8}")
+    for row in results:
+        flag = "" if row["within_limit"] else "  OVER LIMIT"
+        print(f"{row['lease']:>5} {row['decisions_per_s']:>12} {row['allowed']:>9} {row['allowed_ceiling']:>9} "
+              f"{row['redis_calls_per_decision']:>15} {row['p50_us']:>8} {row['p99_us']:>8}{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Serialization and compression cost of the two largest API payloads.
+
+Builds the same dicts the posts endpoints return (a post with a 200-comment
+tree, a 100-post listing) and times each way of putting them on the wire:
+
+* before: FastAPI's default path, jsonable_encoder + stdlib JSONResponse
+* jsonable_encoder + APIResponse (endpoints that return plain dicts)
+* APIResponse directly (list_posts / get_post)
+* msgpack via APIResponse
+* gzip / brotli of the JSON body at the CompressionMiddleware settings
+
+    python -m benchmarks.serialization --comments 200 --posts 100
+"""
+import argparse
+import gzip
+import json
+import time
+from datetime import datetime, timedelta
+
+import brotli
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.responses import JSON, MSGPACK, APIResponse, response_format
+
+LOREM = (
+    "Retrieval-augmented feeds rank posts by embedding similarity, then rerank "
+    "with engagement signals so fresh posts still surface. "
+)
+
+
+def make_comment(i: int, now: datetime, replies: list) -> dict:
+    return {
+        "id": i,
+        "content": LOREM * (1 + i % 3),
+        "created_at": (now - timedelta(minutes=i)).isoformat(),
+        "user_id": 1 + i % 50,
+        "author_id": 1 + i % 50,
+        "author_name": f"User {1 + i % 50}",
+        "author_username": f"user{1 + i % 50}",
+        "replies": replies,
+    }
+
+
+def post_with_comments(n_comments: int) -> dict:
+    now = datetime(2026, 1, 1)
+    # One reply per top-level comment, as the post view renders them
+    top_level = n_comments // 2
+    comments = [
+        make_comment(i, now, [make_comment(top_level + i, now, [])])
+        for i in range(top_level)
+    ]
+    return {
+        "id": 1,
+        "title": "Vector search in production",
+        "summary": LOREM * 20,
+        "image_url": "/static/uploads/objects/ab/cd/abcd_large.webp",
+        "author_id": 1,
+        "author_name": "Author",
+        "author_email": "author@example.com",
+        "author_username": "author",
+        "published": True,
+        "created_at": now.isoformat(),
+        "published_at": now.isoformat(),
+        "categories": [{"id": 1, "title": "Engineering"}],
+        "tags": [{"id": i, "title": f"tag-{i}"} for i in range(5)],
+        "comments": comments,
+        "like_count": 42,
+        "user_liked": False,
+        "comment_count": n_comments,
+    }
+
+
+def post_listing(n_posts: int) -> dict:
+    now = datetime(2026, 1, 1)
+    posts = [{
+        "id": i,
+        "title": f"Post {i}",
+        "summary": LOREM * 3,
+        "image_url": f"/static/uploads/objects/ab/cd/{i:064x}_medium.webp",
+        "original_image_url": f"/static/uploads/objects/ab/cd/{i:064x}.png",
+        "image_variants": {
+            name: {"webp": f"/{i}_{name}.webp", "jpeg": f"/{i}_{name}.jpg", "width": w, "height": w // 2}
+            for name, w in (("thumb", 320), ("medium", 800), ("large", 1600))
+        },
+        "author_id": 1 + i % 20,
+        "published": True,
+        "created_at": (now - timedelta(hours=i)).isoformat(),
+        "published_at": (now - timedelta(hours=i)).isoformat(),
+        "like_count": i * 3,
+        "comment_count": i % 17,
+        "categories": ["Engineering"],
+        "tags": ["python", "search"],
+    } for i in range(n_posts)]
+    return {"total": 5000, "skip": 0, "limit": n_posts, "posts": posts}
+
+
+def timed(fn, repeat: int) -> tuple[float, bytes]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, body
+
+
+def run(name: str, payload: dict, repeat: int) -> list[dict]:
+    def encode_with(fmt, fn):
+        def call():
+            token = response_format.set(fmt)
+            try:
+                return fn()
+            finally:
+                response_format.reset(token)
+        return call
+
+    strategies = {
+        "jsonable_encoder + JSONResponse (before)": lambda: JSONResponse(jsonable_encoder(payload)).body,
+        "jsonable_encoder + APIResponse": encode_with(JSON, lambda: APIResponse(jsonable_encoder(payload)).body),
+        "APIResponse": encode_with(JSON, lambda: APIResponse(payload).body),
+        "APIResponse msgpack": encode_with(MSGPACK, lambda: APIResponse(payload).body),
+    }
+    rows = []
+    for strategy, fn in strategies.items():
+        ms, body = timed(fn, repeat)
+        rows.append({"payload": name, "strategy": strategy, "ms": round(ms, 3), "bytes": len(body)})
+
+    json_body = APIResponse(payload).body
+    compressors = {
+        "gzip -6": lambda: gzip.compress(json_body, compresslevel=6, mtime=0),
+        "brotli q4": lambda: brotli.compress(json_body, quality=4),
+    }
+    for strategy, fn in compressors.items():
+        ms, body = timed(fn, repeat)
+        rows.append({"payload": name, "strategy": f"+ {strategy}", "ms": round(ms, 3), "bytes": len(body)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--comments", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50, help="best of N")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = (
+        run(f"post with {args.comments} comments", post_with_comments(args.comments), args.repeat)
+        + run(f"listing of {args.posts} posts", post_listing(args.posts), args.repeat)
+    )
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'payload':<28} {'strategy':<42} {'ms':>8} {'bytes':>9}")
+    for row in results:
+        print(f"{row['payload']:<28} {row['strategy']:<42} {row['ms']:>8} {row['bytes']:>9}")
+
+
+if __name__ == "__main__":
+    main()
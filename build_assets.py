@@ -0,0 +1,13 @@
+"""
+Static Asset Build Script
+
+Writes fingerprinted, gzip/brotli-compressed copies of static/css and
+static/js to static/dist and the manifest templates use to link them.
+Run from the project root once per deploy, before the workers start.
+"""
+
+from app.utils.assets import build_assets
+
+if __name__ == "__main__":
+    for source, hashed in build_assets().items():
+        print(f"{source} -> dist/{hashed}")
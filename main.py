@@ -1,5 +1,6 @@
 import uvicorn
 from app import app
 
+# Development server (auto-reload, one worker); production runs `python -m app.server`
 if __name__ == "__main__":
     uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
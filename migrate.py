@@ -1,10 +1,11 @@
+import argparse
 import os
 import sys
 from alembic import command
 from alembic.config import Config
 from app.core.config import get_settings
 
-def run_migrations():
+def run_migrations(autogenerate_message=None):
     # Ensure we are in the project root
     if not os.path.exists("alembic.ini"):
         print("Error: alembic.ini not found. Please run this script from the project root.")
@@ -12,7 +13,7 @@ def run_migrations():
 
     # Create Alembic configuration object
     alembic_cfg = Config("alembic.ini")
-    
+
     # Override the database URL in the config with the one from our settings
     # This ensures we use the same DB as the app, even if alembic.ini has a placeholder
     settings = get_settings()
@@ -21,21 +22,30 @@ def run_migrations():
     print(f"Using Database URL: {settings.DATABASE_URL}")
 
     try:
-        # Generate a new migration revision
-        print("Detecting changes and generating migration...")
-        # We use a generic message, or we could ask for input
-        command.revision(alembic_cfg, autogenerate=True, message="Auto-generated migration")
-        
-        # Apply the migration
+        if autogenerate_message:
+            # Autogenerated revisions are a starting point: review them (e.g. make
+            # index builds CONCURRENTLY) before committing and applying
+            print("Detecting changes and generating migration...")
+            command.revision(alembic_cfg, autogenerate=True, message=autogenerate_message)
+            print("Migration generated in alembic/versions - review it, then run this script again to apply.")
+            return
+
+        # Apply the committed migrations
         print("Applying migrations...")
         command.upgrade(alembic_cfg, "head")
-        
+
         print("Migrations applied successfully!")
-        
+
     except Exception as e:
         print(f"An error occurred during migration: {e}")
-        # If revision is empty (no changes), it might throw an error or just create an empty file.
-        # In a real script we might want to catch "Target database is not up to date" etc.
+        sys.exit(1)
 
 if __name__ == "__main__":
-    run_migrations()
+    parser = argparse.ArgumentParser(description="Apply database migrations (alembic upgrade head).")
+    parser.add_argument(
+        "--autogenerate",
+        metavar="MESSAGE",
+        help="generate a new revision from model changes instead of applying migrations",
+    )
+    args = parser.parse_args()
+    run_migrations(args.autogenerate)